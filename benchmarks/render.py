@@ -0,0 +1,248 @@
+"""
+Rendering benchmarks on synthetic CVs.
+
+Each scenario renders one synthetic config (see synthetic.py) several times
+in a fresh process and reports the latency per document, the output size
+and page count, and the peak memory of the process. The batch benchmarks
+render a directory of configs with `build` and report documents per second.
+
+    uv run python benchmarks/render.py --output results.json
+    uv run python benchmarks/render.py --compare results.json
+
+With --compare, every metric is checked against the stored results and the
+run exits with status 1 if one got worse by more than its tolerance.
+Peak memory is read with the resource module and needs a Unix system.
+"""
+
+from dataclasses import asdict
+import argparse
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from synthetic import Shape, make_config, write_configs
+
+SCENARIOS = {
+    "small": Shape(experiences=3, bullets=2, paragraphs=2),
+    "typical": Shape(experiences=6, bullets=4, image_px=400),
+    "300_bullets": Shape(experiences=30, bullets=10),
+    "long_bullets": Shape(experiences=6, bullets=4, words=120),
+    "large_image": Shape(image_px=3000),
+    "long_letter": Shape(paragraphs=30),
+}
+
+# Configs of the batch benchmarks
+BATCH_SHAPE = Shape(experiences=6, bullets=4, image_px=400)
+
+# Metrics compared against a baseline: whether higher values are better, and
+# the relative change that counts as a regression (None for --tolerance)
+METRICS = {
+    "median_ms": (False, None),
+    "p95_ms": (False, None),
+    "docs_per_sec": (True, None),
+    "bytes": (False, 0.01),
+    "pages": (False, 0.0),
+    "peak_rss_mb": (False, 0.1),
+    "worker_peak_rss_mb": (False, 0.1),
+}
+
+_PAGE = re.compile(rb"/Type /Page\n")
+
+
+def _peak_rss_mb(children: bool = False) -> float:
+    import resource
+
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    # Linux reports kilobytes, macOS bytes
+    scale = 1 if sys.platform == "darwin" else 1024
+    return round(resource.getrusage(who).ru_maxrss * scale / 2**20, 1)
+
+
+def run_scenario(name: str, runs: int, directory: str) -> dict:
+    from vita_gen.api import render_document
+    from vita_gen.models import CV
+
+    cv = CV(**make_config(SCENARIOS[name], directory))
+    result = {}
+    for doc_type in ("cv", "cover_letter"):
+        if doc_type == "cover_letter" and not cv.cover_letter:
+            continue
+        # The first render also parses the fonts and images
+        pdf = render_document(cv, doc_type)
+        times = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            render_document(cv, doc_type)
+            times.append((time.perf_counter() - start) * 1000)
+        times.sort()
+        result[doc_type] = {
+            "median_ms": round(statistics.median(times), 2),
+            "p95_ms": round(times[min(len(times) - 1, int(len(times) * 0.95))], 2),
+            "bytes": len(pdf),
+            "pages": len(_PAGE.findall(pdf)),
+        }
+    result["peak_rss_mb"] = _peak_rss_mb()
+    return result
+
+
+def run_batch(workers: int, size: int, directory: str) -> dict:
+    from vita_gen.jobs import Overrides, build
+
+    configs = write_configs(BATCH_SHAPE, os.path.join(directory, "configs"), size)
+    output = os.path.join(directory, "out")
+    os.makedirs(output, exist_ok=True)
+    report = build(configs, output, "both", Overrides(), True, workers, force=True)
+    written = sum(result.written for result in report.results)
+    return {
+        "documents": written,
+        "seconds": round(report.elapsed, 3),
+        "docs_per_sec": round(written / report.elapsed, 2),
+        "peak_rss_mb": _peak_rss_mb(),
+        "worker_peak_rss_mb": _peak_rss_mb(children=True),
+    }
+
+
+def _in_child(args: list[str]) -> dict:
+    # A fresh process per measurement keeps caches and peak memory separate
+    completed = subprocess.run(
+        [sys.executable, __file__, "--child", *args],
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode:
+        raise RuntimeError(f"Benchmark {args[0]} failed:\n{completed.stderr}")
+    return json.loads(completed.stdout.splitlines()[-1])
+
+
+def _flatten(results: dict, prefix: str = "") -> dict[str, float]:
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{prefix}{key}."))
+        elif key in METRICS:
+            flat[prefix + key] = value
+    return flat
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Return a description of every metric that regressed against `baseline`."""
+    current, previous = _flatten(results), _flatten(baseline)
+    regressions = []
+    for name, old in previous.items():
+        new = current.get(name)
+        if new is None or not old:
+            continue
+        higher_is_better, allowed = METRICS[name.rsplit(".", 1)[1]]
+        allowed = tolerance if allowed is None else allowed
+        change = (new - old) / old
+        if (-change if higher_is_better else change) > allowed:
+            regressions.append(f"{name}: {old} -> {new} ({change:+.1%})")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--runs", type=int, default=5, help="Timed renders per document"
+    )
+    parser.add_argument(
+        "--scenario",
+        action="append",
+        choices=sorted(SCENARIOS),
+        help="Only run these scenarios (default: all)",
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=40, help="Configs per batch run"
+    )
+    parser.add_argument(
+        "--workers",
+        default=f"1,{os.cpu_count() or 1}",
+        help="Comma-separated worker counts for the batch runs, 0 to skip them",
+    )
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument(
+        "--compare", help="Results JSON of an earlier run to compare with"
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.15,
+        help="Relative slowdown that counts as a timing regression",
+    )
+    parser.add_argument("--child", nargs="+", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        kind, value, directory = args.child
+        if kind == "batch":
+            result = run_batch(int(value), args.batch_size, directory)
+        else:
+            result = run_scenario(value, args.runs, directory)
+        print(json.dumps(result))
+        return 0
+
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "runs": args.runs,
+            "batch_size": args.batch_size,
+            "shapes": {name: asdict(shape) for name, shape in SCENARIOS.items()},
+        },
+        "documents": {},
+        "batch": {},
+    }
+    print(
+        f"{'scenario':<14} {'document':<13} {'median':>9} {'p95':>9} {'pages':>5} "
+        f"{'size':>9} {'peak':>8}"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in args.scenario or SCENARIOS:
+            result = _in_child(["scenario", name, tmp, "--runs", str(args.runs)])
+            results["documents"][name] = result
+            for doc_type in ("cv", "cover_letter"):
+                if doc_type in result:
+                    doc = result[doc_type]
+                    print(
+                        f"{name:<14} {doc_type:<13} {doc['median_ms']:>7.1f}ms "
+                        f"{doc['p95_ms']:>7.1f}ms {doc['pages']:>5} "
+                        f"{doc['bytes'] / 1024:>7.0f}KB {result['peak_rss_mb']:>6.0f}MB"
+                    )
+
+        for workers in sorted({int(w) for w in args.workers.split(",") if int(w) > 0}):
+            batch_dir = os.path.join(tmp, f"batch_{workers}")
+            result = _in_child(
+                ["batch", str(workers), batch_dir, "--batch-size", str(args.batch_size)]
+            )
+            results["batch"][f"workers_{workers}"] = result
+            print(
+                f"batch of {result['documents']} documents with {workers} worker(s): "
+                f"{result['docs_per_sec']:.1f} docs/s, peak {result['peak_rss_mb']:.0f}MB "
+                f"(workers {result['worker_peak_rss_mb']:.0f}MB)"
+            )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote results to {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        if regressions:
+            return 1
+        print(f"No regressions against {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+"""
+Startup time of the vita-gen CLI.
+
+Every command runs several times in a fresh interpreter and the median wall
+time is compared with a budget. Each command is also run once with
+`-X importtime` to check that it does not load modules it has no use for,
+which catches import regressions regardless of how fast the machine is.
+
+    uv run python benchmarks/startup.py
+    uv run python benchmarks/startup.py --runs 20 --budget-factor 2
+
+Exits with status 1 when a command is over budget or imports a forbidden
+module.
+"""
+
+from dataclasses import dataclass
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SAMPLE_CONFIG = """\
+person:
+  name: "JOHN DOE"
+  title: "Software Engineer"
+  address: "123 Tech Street, 12345 Innovation City"
+  phone: "+49 123 4567890"
+  email: john.doe@example.com
+  linkedin: linkedin.com/in/johndoe/
+  birth_date: "01. January 1990"
+education:
+  - degree: "COMPUTER SCIENCE (M.Sc.)"
+    institution: "Tech University"
+    start_date: "10/2018"
+    end_date: "09/2020"
+    details: ["Focus on Distributed Systems"]
+experiences:
+  - title: "SOFTWARE ENGINEER"
+    company: "Tech Solutions GmbH"
+    start_date: "01/2021"
+    end_date: "Present"
+    description: ["Built things."]
+skills:
+  - name: "Languages"
+    skills: "Python, TypeScript"
+languages: "English (Native), German (Fluent)"
+"""
+
+# Modules that only rendering needs
+PDF_STACK = ["fpdf", "fontTools", "PIL"]
+
+
+@dataclass
+class Case:
+    name: str
+    args: list[str]
+    # Median wall time in seconds
+    budget: float
+    forbidden: list[str]
+
+
+def cases(config: str) -> list[Case]:
+    cli = ["-m", "vita_gen.main"]
+    return [
+        Case(
+            "import vita_gen",
+            ["-c", "import vita_gen"],
+            0.15,
+            PDF_STACK + ["pydantic", "yaml"],
+        ),
+        Case(
+            "vita-gen --help", cli + ["--help"], 0.4, PDF_STACK + ["pydantic", "yaml"]
+        ),
+        Case(
+            "vita-gen validate", cli + ["validate", "--config", config], 0.6, PDF_STACK
+        ),
+    ]
+
+
+def imported_modules(args: list[str]) -> set[str]:
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = set()
+    for line in completed.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            modules.add(line.rsplit("|", 1)[1].strip())
+    return modules
+
+
+def wall_time(args: list[str]) -> float:
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, *args],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        check=True,
+    )
+    return time.perf_counter() - start
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument(
+        "--config", help="Config to validate (default: a bundled sample)"
+    )
+    parser.add_argument(
+        "--budget-factor",
+        type=float,
+        default=1.0,
+        help="Multiply all time budgets, e.g. for slow CI machines",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config = args.config
+        if not config:
+            config = os.path.join(tmp, "cv.yaml")
+            with open(config, "w", encoding="utf-8") as f:
+                f.write(SAMPLE_CONFIG)
+
+        failures = []
+        print(f"{'command':<20} {'median':>8} {'min':>8} {'budget':>8}")
+        for case in cases(config):
+            loaded = imported_modules(case.args)
+            for module in case.forbidden:
+                if module in loaded:
+                    failures.append(f"{case.name} imports {module}")
+
+            wall_time(case.args)  # warm the file system cache
+            times = [wall_time(case.args) for _ in range(args.runs)]
+            median = statistics.median(times)
+            budget = case.budget * args.budget_factor
+            print(
+                f"{case.name:<20} {median * 1000:>6.0f}ms {min(times) * 1000:>6.0f}ms "
+                f"{budget * 1000:>6.0f}ms"
+            )
+            if median > budget:
+                failures.append(f"{case.name} took {median * 1000:.0f} ms")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+"""
+Synthetic CV configs for benchmarks.
+
+Every knob that changes how much work the renderers do can be set
+separately: the number of experiences, bullets per entry, words per bullet,
+the pixel size of the profile image and the number of cover letter
+paragraphs. The same parameters and seed always give the same config.
+
+    uv run python benchmarks/synthetic.py out/ --count 50 --experiences 20
+"""
+
+from dataclasses import asdict, dataclass
+import argparse
+import os
+import random
+
+import yaml
+
+WORDS = (
+    "design build scale deliver platform service pipeline latency throughput "
+    "customer team review architecture migration cloud data model api "
+    "reliability observability automation release quality security cost "
+    "performance feature roadmap stakeholder integration testing deployment"
+).split()
+
+
+@dataclass
+class Shape:
+    experiences: int = 5
+    bullets: int = 4
+    # Words per bullet point; longer bullets wrap onto more lines
+    words: int = 14
+    # Edge length of the square profile image in pixels, 0 for none
+    image_px: int = 0
+    # Cover letter paragraphs, 0 for no cover letter
+    paragraphs: int = 4
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    text = " ".join(rng.choice(WORDS) for _ in range(words))
+    return text[0].upper() + text[1:] + "."
+
+
+def _image(path: str, size: int, rng: random.Random) -> None:
+    # Imported here so that generating configs without images needs no Pillow
+    from PIL import Image
+
+    # Noise does not compress, so the file size scales with the pixel count
+    Image.frombytes("RGB", (size, size), rng.randbytes(size * size * 3)).save(path)
+
+
+def make_config(shape: Shape, directory: str, seed: int = 0) -> dict:
+    """Return a config of the given shape; images are written to `directory`."""
+    rng = random.Random(seed)
+    person = {
+        "name": f"CANDIDATE {seed}",
+        "title": "Software Engineer",
+        "address": "123 Tech Street, 12345 Innovation City",
+        "phone": "+49 123 4567890",
+        "email": f"candidate{seed}@example.com",
+        "linkedin": f"linkedin.com/in/candidate{seed}/",
+        "birth_date": "01. January 1990",
+        "signature_date": "City, 05. February 2026",
+    }
+    if shape.image_px:
+        image_path = os.path.join(directory, f"image_{shape.image_px}_{seed}.png")
+        if not os.path.exists(image_path):
+            _image(image_path, shape.image_px, rng)
+        person["image_path"] = image_path
+
+    config = {
+        "person": person,
+        "experiences": [
+            {
+                "title": f"ENGINEER {index}",
+                # Consecutive roles at the same company share a header
+                "company": f"Company {index // 2}",
+                "start_date": "01/2020",
+                "end_date": "12/2021",
+                "description": [
+                    _sentence(rng, shape.words) for _ in range(shape.bullets)
+                ],
+            }
+            for index in range(shape.experiences)
+        ],
+        "education": [
+            {
+                "degree": "COMPUTER SCIENCE (M.Sc.)",
+                "institution": "Tech University",
+                "start_date": "10/2018",
+                "end_date": "09/2020",
+                "details": [_sentence(rng, shape.words)],
+            }
+        ],
+        "skills": [
+            {"name": f"Skills {index}", "skills": _sentence(rng, 12)}
+            for index in range(3)
+        ],
+        "languages": "English (Native), German (Fluent)",
+    }
+    if shape.paragraphs:
+        config["cover_letter"] = {
+            "company": {"name": "Acme Corp", "address": "Road 1, 12345 City"},
+            "title": "Application as Software Engineer",
+            "text": "\n\n".join(
+                " ".join(_sentence(rng, 12) for _ in range(5))
+                for _ in range(shape.paragraphs)
+            ),
+        }
+    return config
+
+
+def write_configs(shape: Shape, directory: str, count: int, seed: int = 0) -> list[str]:
+    """Write `count` configs of one shape and return their paths."""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for index in range(count):
+        path = os.path.join(directory, f"synthetic_{seed + index:05d}.yaml")
+        with open(path, "w", encoding="utf-8") as f:
+            yaml.safe_dump(
+                make_config(shape, directory, seed + index), f, sort_keys=False
+            )
+        paths.append(path)
+    return paths
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("directory")
+    parser.add_argument("--count", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    for name, value in asdict(Shape()).items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, default=value)
+    args = parser.parse_args()
+
+    shape = Shape(**{name: getattr(args, name) for name in asdict(Shape())})
+    paths = write_configs(shape, args.directory, args.count, args.seed)
+    print(f"Wrote {len(paths)} configs to {args.directory}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,2 +1,21 @@
+# The render API is imported on first use so that `import vita_gen` and the
+# CLI stay fast for commands that never render
+_API = {
+    "render_application",
+    "render_cover_letter",
+    "render_cv",
+    "render_document",
+    "render_formats",
+}
+
+
+def __getattr__(name: str):
+    if name in _API:
+        from . import api
+
+        return getattr(api, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 def main() -> None:
     print("Hello from cv-generator!")
@@ -0,0 +1,161 @@
+from typing import BinaryIO, Dict, Optional, Sequence, Union
+import json
+import os
+
+from .models import CV
+from .output_options import OutputOptions
+
+# A file path, a writable binary file object, or None to get the bytes back
+Output = Union[str, os.PathLike, BinaryIO, None]
+
+
+def render_cv(
+    cv: CV, output: Output = None, options: Optional[OutputOptions] = None
+) -> Optional[bytes]:
+    """
+    Render a CV.
+
+    Returns the PDF as bytes when no `output` is given, otherwise writes it
+    to the path or file object and returns None. Every call renders on its
+    own document, so the function can be called from several threads at once.
+    `options` select the compression profile and a fixed creation date.
+    """
+    from .renderer import CVRenderer
+
+    pdf = CVRenderer(cv, options).render(output)
+    return None if pdf is None else bytes(pdf)
+
+
+def render_cover_letter(
+    cv: CV, output: Output = None, options: Optional[OutputOptions] = None
+) -> Optional[bytes]:
+    """Render the cover letter of a CV, like `render_cv`."""
+    if not cv.cover_letter:
+        raise ValueError("No cover letter data found in CV configuration.")
+
+    from .cover_letter_renderer import CoverLetterRenderer
+
+    pdf = CoverLetterRenderer(cv, options).render(output)
+    return None if pdf is None else bytes(pdf)
+
+
+def render_application(
+    cv: CV, output: Output = None, options: Optional[OutputOptions] = None
+) -> Optional[bytes]:
+    """Render the cover letter (if any) and the CV into one PDF, like `render_cv`."""
+    from .application_renderer import ApplicationRenderer
+
+    pdf = ApplicationRenderer(cv, options).render(output)
+    return None if pdf is None else bytes(pdf)
+
+
+_RENDERERS = {
+    "cv": render_cv,
+    "cover_letter": render_cover_letter,
+    "application": render_application,
+}
+
+
+def _render_within(
+    cv: CV, render, options: OutputOptions, pdf: Optional[bytes] = None
+) -> bytes:
+    # Documents only shrink noticeably with their images, so those are
+    # re-encoded at lower quality until the PDF fits
+    limit = options.max_kb * 1024
+    if pdf is None:
+        pdf = render(cv, None, options)
+    if len(pdf) <= limit:
+        return pdf
+    if not (cv.person.image_path or cv.person.signature_path):
+        raise ValueError(
+            f"Document is {len(pdf) / 1024:.1f} KB, more than the maximum of "
+            f"{options.max_kb:g} KB, and has no images to shrink"
+        )
+    for smaller in options.smaller_images():
+        pdf = render(cv, None, smaller)
+        if len(pdf) <= limit:
+            return pdf
+    raise ValueError(
+        f"Document is {len(pdf) / 1024:.1f} KB even at the lowest image quality, "
+        f"more than the maximum of {options.max_kb:g} KB"
+    )
+
+
+def render_document(
+    cv: CV,
+    doc_type: str,
+    output: Output = None,
+    options: Optional[OutputOptions] = None,
+) -> Optional[bytes]:
+    """Render the "cv", "cover_letter" or "application" document of a CV."""
+    render = _RENDERERS.get(doc_type)
+    if render is None:
+        raise ValueError(f"Unknown document type: {doc_type}")
+    if options is None or not options.max_kb:
+        return render(cv, output, options)
+
+    pdf = _render_within(cv, render, options)
+    if output is None:
+        return pdf
+    if isinstance(output, (str, os.PathLike)):
+        with open(output, "wb") as f:
+            f.write(pdf)
+    else:
+        output.write(pdf)
+    return None
+
+
+def _laid_out(cv: CV, doc_type: str, options: OutputOptions):
+    # The renderer that draws the PDF and the documents it consists of
+    from .application_renderer import ApplicationRenderer
+    from .cover_letter_renderer import CoverLetterRenderer
+    from .renderer import CVRenderer
+    from .targets import Part
+
+    if doc_type == "application":
+        renderer = ApplicationRenderer(cv, options)
+        return renderer, renderer.parts()
+    if doc_type == "cv":
+        renderer = CVRenderer(cv, options)
+        return renderer, [Part("CV", "cv", renderer, renderer.layout())]
+    if doc_type == "cover_letter":
+        if not cv.cover_letter:
+            raise ValueError("No cover letter data found in CV configuration.")
+        renderer = CoverLetterRenderer(cv, options)
+        part = Part("Cover Letter", "cover_letter", renderer, renderer.layout())
+        return renderer, [part]
+    raise ValueError(f"Unknown document type: {doc_type}")
+
+
+def render_formats(
+    cv: CV,
+    doc_type: str,
+    formats: Sequence[str] = ("pdf",),
+    options: Optional[OutputOptions] = None,
+) -> Dict[str, bytes]:
+    """
+    Render a document in several formats, see output_options.FORMATS.
+
+    "txt" is the text in reading order and "json" the page and position of
+    every block. Both are written from the layout the PDF is drawn from, so
+    each format only adds the time to serialize it.
+    """
+    from .targets import layout_json, plain_text
+
+    options = options or OutputOptions()
+    renderer, parts = _laid_out(cv, doc_type, options)
+    outputs = {}
+    if "pdf" in formats:
+        if doc_type == "application":
+            pdf = bytes(renderer.render(None, parts))
+        else:
+            pdf = bytes(renderer.render(None, parts[0].layout))
+        if options.max_kb:
+            pdf = _render_within(cv, _RENDERERS[doc_type], options, pdf)
+        outputs["pdf"] = pdf
+    if "txt" in formats:
+        outputs["txt"] = plain_text(parts).encode("utf-8")
+    if "json" in formats:
+        text = json.dumps(layout_json(parts), ensure_ascii=False, indent=2)
+        outputs["json"] = (text + "\n").encode("utf-8")
+    return outputs
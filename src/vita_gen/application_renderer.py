@@ -0,0 +1,62 @@
+from fpdf import FPDF
+from .cover_letter_renderer import CoverLetterRenderer
+from .font_registry import add_fonts
+from .font_subsets import cached_subsetting
+from .layout import draw_layout
+from .models import CV
+from .output_options import OutputOptions, deflate_level
+from .profiling import span
+from .renderer import CVRenderer
+from .targets import Part
+from typing import BinaryIO, List, Optional, Union
+
+
+class ApplicationRenderer(FPDF):
+    """The cover letter followed by the CV, in one document with bookmarks."""
+
+    def __init__(self, cv: CV, options: Optional[OutputOptions] = None):
+        super().__init__()
+        self.cv = cv
+        self.options = options or OutputOptions()
+        if self.options.creation_date:
+            self.set_creation_date(self.options.creation_date)
+        self.set_auto_page_break(auto=True, margin=15)
+
+        # Add unicode fonts (parsed once per process)
+        add_fonts(self)
+
+        self.set_draw_color(200, 200, 200)  # Light grey for lines
+
+    def header(self):
+        pass
+
+    def parts(self) -> List[Part]:
+        """Lay out the cover letter (if any) and the CV."""
+        renderers = [("CV", "cv", CVRenderer(self.cv, self.options))]
+        if self.cv.cover_letter:
+            letter = CoverLetterRenderer(self.cv, self.options)
+            renderers.insert(0, ("Cover Letter", "cover_letter", letter))
+        return [
+            Part(title, doc_type, renderer, renderer.layout())
+            for title, doc_type, renderer in renderers
+        ]
+
+    def render(
+        self,
+        output_path: Optional[Union[str, BinaryIO]] = None,
+        parts: Optional[List[Part]] = None,
+    ):
+        # Each part is measured by its own renderer and drawn onto this
+        # document, so fonts and images are embedded only once
+        for part in parts or self.parts():
+            renderer = part.renderer
+            self.set_margins(renderer.l_margin, renderer.t_margin, renderer.r_margin)
+            self.add_page()
+            self.start_section(part.title)
+            draw_layout(self, part.layout)
+
+        # output_path may also be a binary file object; without either the
+        # PDF is returned as bytes
+        level = self.options.pdf_profile.deflate_level
+        with span("pdf.output"), deflate_level(level), cached_subsetting():
+            return self.output(output_path)
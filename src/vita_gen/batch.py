@@ -0,0 +1,243 @@
+from collections import deque
+from dataclasses import dataclass, field
+from typing import IO, Callable, Iterator, List, Optional, Set
+import hashlib
+import json
+import os
+import time
+
+from .content import EXTENDS
+from .isolation import JobLimits
+from .jobs import (
+    DOCUMENT_TYPES,
+    JobResult,
+    Overrides,
+    RenderJob,
+    output_base,
+    plan_jobs,
+    run_jobs,
+)
+from .output_options import OutputOptions
+
+# Record keys that map onto the options of `vita-gen generate`, with their types
+OVERRIDE_KEYS = {
+    "image": (str,),
+    "image_width": (int, float),
+    "signature": (str,),
+    "signature_width": (int, float),
+}
+# Failures listed in the report; the rest are only counted
+FAILURE_SAMPLE = 20
+
+
+@dataclass
+class BatchReport:
+    documents: int = 0
+    failed: int = 0
+    # Records skipped because the journal lists them as done
+    resumed: int = 0
+    invalid: int = 0
+    elapsed: float = 0.0
+    # Output and first line of the error of the first failed documents
+    failures: List[str] = field(default_factory=list)
+
+
+def record_key(record: dict, line: str) -> str:
+    """Identify a record by its `id`, or by its content if it has none."""
+    if record.get("id") is not None:
+        return str(record["id"])
+    return hashlib.sha256(line.strip().encode("utf-8")).hexdigest()[:16]
+
+
+def read_journal(path: str) -> Set[str]:
+    if not os.path.exists(path):
+        return set()
+    with open(path, "r", encoding="utf-8") as f:
+        return {line.rstrip("\n") for line in f if line.strip()}
+
+
+def record_jobs(
+    record: dict,
+    jobs_path: str,
+    number: int,
+    config_cache: Optional[str] = None,
+    output_options: Optional[OutputOptions] = None,
+    limits: Optional[JobLimits] = None,
+) -> Iterator[RenderJob]:
+    """
+    Turn a batch record into render jobs.
+
+    A record names its config with `config` (a path) or embeds it as `cv`,
+    and sets `output` plus optionally `type` and the overrides of the
+    generate command. Paths are relative to the working directory, an
+    embedded `extends` to the jobs file.
+    """
+    doc_type = record.get("type", "both")
+    if not isinstance(doc_type, str) or (
+        doc_type != "both" and doc_type not in DOCUMENT_TYPES
+    ):
+        raise ValueError(f"Unknown type {doc_type!r}")
+    output = record.get("output")
+    if not output:
+        raise ValueError("Missing output")
+    if not isinstance(output, str):
+        raise ValueError("output must be a string")
+    if not output_base(output, "", False)[1]:
+        raise ValueError(f"output {output!r} must name a file, e.g. out/acme.pdf")
+    for name, types in OVERRIDE_KEYS.items():
+        value = record.get(name)
+        # bool is an int, but never a width
+        if value is not None and (
+            not isinstance(value, types) or isinstance(value, bool)
+        ):
+            kind = "a number" if float in types else "a string"
+            raise ValueError(f"{name} must be {kind}")
+
+    data = record.get("cv")
+    if data is not None:
+        if not isinstance(data, dict):
+            raise ValueError("cv must be an object")
+        if EXTENDS in data:
+            base = os.path.join(os.path.dirname(jobs_path), str(data[EXTENDS]))
+            data = {**data, EXTENDS: base}
+        config_path = f"{jobs_path}:{number}"
+    elif record.get("config"):
+        config_path = record["config"]
+        if not isinstance(config_path, str):
+            raise ValueError("config must be a string")
+    else:
+        raise ValueError("Missing config or cv")
+
+    overrides = Overrides(**{name: record.get(name) for name in OVERRIDE_KEYS})
+    yield from plan_jobs(
+        [config_path],
+        output,
+        doc_type,
+        overrides,
+        False,
+        config_cache,
+        output_options,
+        data=data,
+        limits=limits,
+    )
+
+
+def status_line(result: JobResult, key: str, number: int) -> dict:
+    job = result.job
+    if result.error:
+        status = "failed"
+    elif result.written:
+        status = "written"
+    else:
+        # Unchanged, or a cover letter the config does not have
+        status = "skipped"
+    line = {
+        "id": key,
+        "line": number,
+        "type": job.doc_type,
+        "output": job.output_path,
+        "status": status,
+        "elapsed_ms": round(result.elapsed * 1000, 1),
+    }
+    if result.peak_rss_kb is not None:
+        line["peak_rss_mb"] = round(result.peak_rss_kb / 1024, 1)
+    if result.traced_peak_kb is not None:
+        line["traced_peak_mb"] = round(result.traced_peak_kb / 1024, 1)
+    if result.error:
+        line["error"] = result.error
+    elif not result.written and result.messages:
+        line["message"] = result.messages[-1]
+    return line
+
+
+def run_batch(
+    jobs_path: str,
+    results: IO[str],
+    journal_path: str,
+    workers: int = 1,
+    config_cache: Optional[str] = None,
+    log: Callable[[str], None] = print,
+    output_options: Optional[OutputOptions] = None,
+    limits: Optional[JobLimits] = None,
+) -> BatchReport:
+    """
+    Render the records of a JSONL jobs file and write one status line per document.
+
+    The file is streamed and at most a few jobs per worker are in flight, so
+    memory does not grow with the number of records. Once every document
+    of a record has been rendered, its key is appended to the journal; a
+    later run with the same journal skips those records. A record that
+    exceeds the `limits` fails on its own and the batch goes on.
+    """
+    report = BatchReport()
+    done = read_journal(journal_path)
+    # Key, line number and number of unfinished jobs of every record with
+    # jobs in flight, in file order like the results
+    in_flight: deque[list] = deque()
+
+    def write_status(line: dict) -> None:
+        results.write(json.dumps(line, ensure_ascii=False) + "\n")
+        results.flush()
+
+    def planned() -> Iterator[RenderJob]:
+        with open(jobs_path, "r", encoding="utf-8") as f:
+            for number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                key = None
+                try:
+                    record = json.loads(line)
+                    if not isinstance(record, dict):
+                        raise ValueError("A record must be a JSON object")
+                    key = record_key(record, line)
+                    if key in done:
+                        report.resumed += 1
+                        continue
+                    jobs = list(
+                        record_jobs(
+                            record,
+                            jobs_path,
+                            number,
+                            config_cache,
+                            output_options,
+                            limits,
+                        )
+                    )
+                except ValueError as e:
+                    report.invalid += 1
+                    write_status(
+                        {
+                            "id": key,
+                            "line": number,
+                            "status": "invalid",
+                            "error": str(e),
+                        }
+                    )
+                    continue
+                in_flight.append([key, number, len(jobs)])
+                yield from jobs
+
+    start = time.perf_counter()
+    with open(journal_path, "a", encoding="utf-8") as journal:
+        record_ok = True
+        for result in run_jobs(planned(), workers=workers, log=log, limits=limits):
+            record = in_flight[0]
+            key, number = record[0], record[1]
+            report.documents += 1
+            report.failed += not result.ok
+            if not result.ok and len(report.failures) < FAILURE_SAMPLE:
+                reason = result.error.splitlines()[0]
+                report.failures.append(f"{result.job.output_path}: {reason}")
+            record_ok = record_ok and result.ok
+            write_status(status_line(result, key, number))
+
+            record[2] -= 1
+            if not record[2]:
+                in_flight.popleft()
+                if record_ok:
+                    journal.write(key + "\n")
+                    journal.flush()
+                record_ok = True
+
+    report.elapsed = time.perf_counter() - start
+    return report
@@ -0,0 +1,345 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import BinaryIO, List, Optional
+import gzip
+import io
+import os
+import re
+import tarfile
+import time
+import zipfile
+
+from .jobs import DOCUMENT_TYPES, JobResult
+
+_REFERENCE = re.compile(rb"(\d+) 0 R")
+_STREAM = b">>\nstream\n"
+
+
+def _pdf_text(text: str) -> bytes:
+    # UTF-16 hex strings keep bookmark titles free of escaping issues
+    return b"<FEFF" + text.encode("utf-16-be").hex().upper().encode("ascii") + b">"
+
+
+def _reference(dictionary: bytes, key: bytes) -> Optional[int]:
+    match = re.search(rb"/" + key + rb" (\d+) 0 R", dictionary)
+    return int(match.group(1)) if match else None
+
+
+def _outline_items(objects: dict[int, bytes], first: Optional[int]) -> List[int]:
+    # Walks a chain of outline items and, recursively, their children
+    items = []
+    while first is not None:
+        items.append(first)
+        items += _outline_items(objects, _reference(objects[first], b"First"))
+        first = _reference(objects[first], b"Next")
+    return items
+
+
+class UnsupportedPdf(ValueError):
+    pass
+
+
+def _split_objects(pdf: bytes) -> tuple[dict[int, bytes], bytes]:
+    """
+    Return the objects of a PDF written by fpdf2 by number, and its trailer.
+
+    Raises UnsupportedPdf for anything beyond a single classic xref table
+    of uncompressed objects with direct stream lengths, as fpdf2 writes.
+    """
+    if pdf.count(b"startxref") != 1:
+        raise UnsupportedPdf("Incremental updates are not supported")
+    xref = int(pdf[pdf.rindex(b"startxref") + 9 :].split()[0])
+    if not pdf.startswith(b"xref\n", xref):
+        raise UnsupportedPdf("Cross-reference streams are not supported")
+    _, header, entries = pdf[xref:].split(b"\n", 2)
+    start, count = (int(value) for value in header.split())
+    if start != 0:
+        raise UnsupportedPdf("Only a single cross-reference section is supported")
+    offsets = {}
+    for number in range(1, count):
+        entry = entries[number * 20 : number * 20 + 20]
+        if entry[17:18] != b"n":
+            raise UnsupportedPdf(f"Object {number} is not in use")
+        offsets[number] = int(entry[:10])
+    ends = sorted(offsets.values()) + [xref]
+    next_offset = {start: end for start, end in zip(ends, ends[1:])}
+
+    objects = {}
+    for number, offset in offsets.items():
+        chunk = pdf[offset : next_offset[offset]]
+        if not chunk.startswith(b"%d 0 obj\n" % number):
+            raise UnsupportedPdf(f"Object {number} is not at its xref offset")
+        body = chunk[chunk.index(b" obj\n") + 5 : chunk.rindex(b"endobj")]
+        split = body.find(_STREAM)
+        head = body if split < 0 else body[:split]
+        if b"/ObjStm" in head:
+            raise UnsupportedPdf("Object streams are not supported")
+        if re.search(rb"/Length \d+ \d+ R", head):
+            raise UnsupportedPdf("Indirect stream lengths are not supported")
+        objects[number] = body
+    trailer = pdf[pdf.rindex(b"trailer") : pdf.rindex(b"startxref")]
+    if b"/Prev" in trailer:
+        raise UnsupportedPdf("Incremental updates are not supported")
+    return objects, trailer
+
+
+@dataclass
+class Bookmark:
+    # A PDF string object, e.g. b"(CV)"
+    title: bytes
+    page: int
+    children: List["Bookmark"] = field(default_factory=list)
+
+
+class PdfConcatenator:
+    """
+    Append finished PDFs to one output file as they arrive.
+
+    Only the object offsets, page ids and bookmarks are kept in memory, so
+    the size of the combined document does not matter. The input has to be
+    fpdf2 output: a classic xref table and direct stream lengths. Other
+    PDFs are rejected with UnsupportedPdf before anything is written.
+    """
+
+    def __init__(self, stream: BinaryIO):
+        self.stream = stream
+        self.position = 0
+        # Object 1 is the page tree, 2 the catalog and 3 the outline root;
+        # all three are written by close()
+        self.offsets: dict[int, int] = {}
+        self.next_id = 4
+        self.pages: List[int] = []
+        self.bookmarks: List[Bookmark] = []
+
+    def _write(self, data: bytes) -> None:
+        self.stream.write(data)
+        self.position += len(data)
+
+    def _write_object(self, number: int, body: bytes) -> None:
+        self.offsets[number] = self.position
+        self._write(b"%d 0 obj\n" % number + body + b"endobj\n")
+
+    def append(self, pdf: bytes) -> tuple[int, List[Bookmark]]:
+        """
+        Append all pages of a PDF.
+
+        Returns the id of its first page and its top-level bookmarks, which
+        the caller can add to `bookmarks`.
+        """
+        objects, trailer = _split_objects(pdf)
+        if not self.position:
+            self._write(pdf[: pdf.index(b"\n", pdf.index(b"\n") + 1) + 1])
+
+        catalog = _reference(trailer, b"Root")
+        page_tree = _reference(objects[catalog], b"Pages")
+        tree = objects[page_tree]
+        media_box = re.search(rb"/MediaBox \[[^\]]*\]", tree)
+        kids = [int(ref) for ref in _REFERENCE.findall(tree[tree.index(b"/Kids") :])]
+
+        # The document's own catalog, page tree, info and outline are replaced
+        # by the ones close() writes
+        outline = _reference(objects[catalog], b"Outlines")
+        items = []
+        if outline is not None:
+            items = _outline_items(objects, _reference(objects[outline], b"First"))
+        dropped = {catalog, page_tree, _reference(trailer, b"Info"), outline, *items}
+
+        renumbered = {page_tree: 1}
+        for number in sorted(objects):
+            if number not in dropped:
+                renumbered[number] = self.next_id
+                self.next_id += 1
+
+        def replace(match: re.Match) -> bytes:
+            return b"%d 0 R" % renumbered[int(match.group(1))]
+
+        for number in sorted(objects):
+            if number in dropped:
+                continue
+            body = objects[number]
+            # Only references in the dictionary are rewritten, never stream data
+            split = body.find(_STREAM)
+            head, tail = (body, b"") if split < 0 else (body[:split], body[split:])
+            head = _REFERENCE.sub(replace, head)
+            if number in kids and media_box and b"/MediaBox" not in head:
+                # The page size was inherited from the dropped page tree
+                head = head.replace(b"<<\n", b"<<\n" + media_box.group(0) + b"\n", 1)
+            self._write_object(renumbered[number], head + tail)
+
+        pages = [renumbered[kid] for kid in kids]
+        self.pages += pages
+
+        bookmarks = []
+        first = _reference(objects[outline], b"First") if outline is not None else None
+        while first is not None:
+            item = objects[first]
+            title = re.search(rb"/Title (\(.*?(?<!\\)\)|<[0-9A-Fa-f]*>)", item, re.S)
+            dest = re.search(rb"/Dest \[(\d+) 0 R", item)
+            if title and dest and int(dest.group(1)) in renumbered:
+                page = renumbered[int(dest.group(1))]
+                bookmarks.append(Bookmark(title.group(1), page))
+            first = _reference(item, b"Next")
+        return pages[0], bookmarks
+
+    def _write_outline(
+        self, bookmarks: List[Bookmark], parent: int
+    ) -> tuple[int, int, int]:
+        # Returns the first and last item ids and the number of visible items
+        ids = list(range(self.next_id, self.next_id + len(bookmarks)))
+        self.next_id += len(bookmarks)
+        count = len(bookmarks)
+        for index, (number, bookmark) in enumerate(zip(ids, bookmarks)):
+            entries = [
+                b"/Title " + bookmark.title,
+                b"/Parent %d 0 R" % parent,
+                b"/Dest [%d 0 R /Fit]" % bookmark.page,
+            ]
+            if index:
+                entries.append(b"/Prev %d 0 R" % ids[index - 1])
+            if index + 1 < len(ids):
+                entries.append(b"/Next %d 0 R" % ids[index + 1])
+            if bookmark.children:
+                first, last, _ = self._write_outline(bookmark.children, number)
+                entries.append(b"/First %d 0 R /Last %d 0 R" % (first, last))
+                entries.append(b"/Count %d" % len(bookmark.children))
+                count += len(bookmark.children)
+            self._write_object(number, b"<<\n" + b"\n".join(entries) + b"\n>>\n")
+        return ids[0], ids[-1], count
+
+    def close(self) -> None:
+        kids = b"\n".join(b"%d 0 R" % page for page in self.pages)
+        self._write_object(
+            1,
+            b"<<\n/Count %d\n/Kids [%s]\n/Type /Pages\n>>\n" % (len(self.pages), kids),
+        )
+        outline = b"<<\n/Type /Outlines\n>>\n"
+        if self.bookmarks:
+            first, last, count = self._write_outline(self.bookmarks, 3)
+            outline = (
+                b"<<\n/Count %d\n/First %d 0 R\n/Last %d 0 R\n/Type /Outlines\n>>\n"
+                % (
+                    count,
+                    first,
+                    last,
+                )
+            )
+        self._write_object(3, outline)
+        self._write_object(
+            2,
+            b"<<\n/Outlines 3 0 R\n/PageMode /UseOutlines\n/Pages 1 0 R\n/Type /Catalog\n>>\n",
+        )
+
+        xref = self.position
+        size = self.next_id
+        lines = [b"xref\n0 %d\n" % size, b"0000000000 65535 f \n"]
+        for number in range(1, size):
+            lines.append(b"%010d 00000 n \n" % self.offsets[number])
+        self._write(b"".join(lines))
+        self._write(
+            b"trailer\n<<\n/Size %d\n/Root 2 0 R\n>>\nstartxref\n%d\n%%%%EOF\n"
+            % (size, xref)
+        )
+
+
+class ArchiveSink:
+    """
+    Write every document into a zip or tar file as soon as it is rendered.
+
+    With a `date`, every member (and a gzip header) carries that timestamp
+    instead of the current time, so that the archive is reproducible.
+    """
+
+    def __init__(self, path: str, date: Optional[datetime] = None):
+        self.path = path
+        self.date = date
+        self.gzip = None
+        if path.endswith(".zip"):
+            self.zip = zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED)
+            self.tar = None
+            return
+
+        # Compression follows the extension: .tar, .tar.gz, .tgz, .tar.xz ...
+        self.zip = None
+        compression = _tar_compression(path)
+        if compression == "gz" and date is not None:
+            # tarfile would write the current time into the gzip header
+            self.gzip = gzip.GzipFile(path, "wb", mtime=int(date.timestamp()))
+            self.tar = tarfile.open(fileobj=self.gzip, mode="w")
+        else:
+            self.tar = tarfile.open(path, "w:" + compression)
+
+    def add(self, result: JobResult) -> None:
+        # Documents are planned as if the archive were a directory
+        name = os.path.relpath(result.job.output_path, self.path).replace(os.sep, "/")
+        if self.zip is not None:
+            if self.date is None:
+                self.zip.writestr(name, result.pdf)
+            else:
+                # Zip timestamps cannot be older than 1980
+                date_time = max(self.date.timetuple()[:6], (1980, 1, 1, 0, 0, 0))
+                info = zipfile.ZipInfo(name, date_time=date_time)
+                info.compress_type = zipfile.ZIP_DEFLATED
+                # The permissions writestr gives members named by a string
+                info.external_attr = 0o600 << 16
+                self.zip.writestr(info, result.pdf)
+        else:
+            info = tarfile.TarInfo(name)
+            info.size = len(result.pdf)
+            info.mtime = int(self.date.timestamp() if self.date else time.time())
+            self.tar.addfile(info, io.BytesIO(result.pdf))
+
+    def close(self) -> None:
+        if self.zip is not None:
+            self.zip.close()
+        else:
+            self.tar.close()
+            if self.gzip is not None:
+                self.gzip.close()
+
+
+def _tar_compression(path: str) -> str:
+    for suffixes, mode in (
+        ((".tar.gz", ".tgz"), "gz"),
+        ((".tar.bz2", ".tbz2"), "bz2"),
+        ((".tar.xz", ".txz"), "xz"),
+    ):
+        if path.endswith(suffixes):
+            return mode
+    return ""
+
+
+class CombinedPdfSink:
+    """
+    Append every document to one PDF with a bookmark per candidate.
+
+    The documents of one config arrive one after the other and share a
+    bookmark named after the candidate, with one child per document.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, "wb")
+        self.pdf = PdfConcatenator(self.file)
+        self.config_path: Optional[str] = None
+
+    def add(self, result: JobResult) -> None:
+        page, bookmarks = self.pdf.append(result.pdf)
+        if result.job.config_path != self.config_path:
+            self.config_path = result.job.config_path
+            title = result.title or os.path.basename(self.config_path)
+            self.pdf.bookmarks.append(Bookmark(_pdf_text(title), page))
+        # An application brings bookmarks for its cover letter and CV
+        label = DOCUMENT_TYPES[result.job.doc_type]
+        children = bookmarks or [Bookmark(_pdf_text(label), page)]
+        self.pdf.bookmarks[-1].children += children
+
+    def close(self) -> None:
+        empty = not self.pdf.pages
+        try:
+            if not empty:
+                self.pdf.close()
+        finally:
+            self.file.close()
+        if empty:
+            # A PDF without pages is not valid
+            os.remove(self.path)
@@ -1,13 +1,252 @@
+from collections import OrderedDict
+from typing import Optional, Sequence
+import hashlib
+import os
+import pickle
+import sys
+import threading
+
+from pydantic import BaseModel
+from pydantic_core import from_json
+
 from .models import CV
+from .profiling import span
 import yaml
-import os
 
+# Config path that reads the config from standard input
+STDIN = "-"
+
+# Extensions of the config files picked up from a directory
+CONFIG_EXTENSIONS = (".yaml", ".yml", ".json")
+
+# Key of an overlay config that names its base config
+EXTENDS = "extends"
+
+# libyaml is several times faster than the pure-Python parser
+_YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+_stdin: Optional[bytes] = None
+_models_digest: Optional[bytes] = None
+
+# Validated base configs by absolute path, with the stamp they were loaded at
+_bases: dict[str, tuple[tuple[int, int], CV]] = {}
+# The base config each loaded overlay extends
+_overlay_bases: dict[str, str] = {}
+# Recently loaded configs by absolute path and cache directory, with the
+# stamps of the config and its base, so that the documents and locales of
+# one config share a single parse
+_RECENT_SIZE = 64
+_recent: "OrderedDict[tuple[str, Optional[str]], tuple[tuple, CV]]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def _read_config(config_path: str) -> bytes:
+    global _stdin
+    if config_path == STDIN:
+        # Standard input can only be read once, but every document type of
+        # a config loads it
+        if _stdin is None:
+            _stdin = sys.stdin.buffer.read()
+        return _stdin
 
-def load_cv_data(config_path: str = "cv_data.yaml") -> CV:
     if not os.path.exists(config_path):
         raise FileNotFoundError(f"Config file not found: {config_path}")
+    with span("config.read"), open(config_path, "rb") as f:
+        return f.read()
+
+
+def _is_json(config_path: str, data: bytes) -> bool:
+    if config_path == STDIN:
+        return data.lstrip()[:1] == b"{"
+    return config_path.endswith(".json")
+
+
+def _parse(config_path: str, data: bytes) -> CV | dict:
+    """Return the validated CV of a full config, or the mapping of an overlay."""
+    if _is_json(config_path, data):
+        if b'"extends"' not in data:
+            # Parsed and validated in one go by pydantic's own JSON parser
+            with span("config.parse_and_validate"):
+                return CV.model_validate_json(data)
+        with span("config.parse"):
+            raw = from_json(data)
+    else:
+        with span("config.parse"):
+            raw = yaml.load(data, Loader=_YamlLoader)
+    if isinstance(raw, dict) and EXTENDS in raw:
+        return raw
+    with span("config.validate"):
+        return CV(**raw)
+
+
+def _cache_key(config_path: str, data: bytes) -> str:
+    global _models_digest
+    if _models_digest is None:
+        # A change to the models invalidates every cached config
+        with open(sys.modules[CV.__module__].__file__, "rb") as f:
+            _models_digest = hashlib.sha256(f.read()).digest()
+    h = hashlib.sha256(_models_digest)
+    h.update(b"json" if _is_json(config_path, data) else b"yaml")
+    h.update(data)
+    return h.hexdigest()
+
+
+def _merge(base: dict, overlay: dict) -> dict:
+    merged = dict(base)
+    for key, value in overlay.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            value = _merge(merged[key], value)
+        merged[key] = value
+    return merged
+
+
+def apply_overlay(base: CV, overlay: dict) -> CV:
+    """
+    Return a copy of `base` with the top-level fields of `overlay` replaced.
+
+    Mappings such as `person` or `cover_letter` are merged into the base
+    value, lists and strings replace it. Only the overlaid fields are
+    validated; the rest of the base is taken over as it is.
+    """
+    base = base.model_copy(deep=True)
+    # Model instances are not validated again by model_validate
+    data = {name: getattr(base, name) for name in CV.model_fields}
+    for name, value in overlay.items():
+        if name == EXTENDS:
+            continue
+        current = data.get(name)
+        if isinstance(current, BaseModel):
+            current = current.model_dump()
+        if isinstance(value, dict) and isinstance(current, dict):
+            value = _merge(current, value)
+        data[name] = value
+    return CV.model_validate(data)
+
+
+def _load_base(base_path: str, cache_dir: Optional[str]) -> CV:
+    # Every overlay of a batch shares the base, so it is validated once per
+    # process and reloaded only when the file changes
+    key = os.path.abspath(base_path)
+    if not os.path.exists(base_path):
+        raise FileNotFoundError(f"Base config not found: {base_path}")
+    stat = os.stat(base_path)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    cached = _bases.get(key)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+
+    base = _load(base_path, cache_dir)
+    if not isinstance(base, CV):
+        raise ValueError(f"Base config {base_path} cannot extend another config")
+    _bases[key] = (stamp, base)
+    return base
+
+
+def _load(config_path: str, cache_dir: Optional[str]) -> CV | dict:
+    data = _read_config(config_path)
+    if not cache_dir:
+        return _parse(config_path, data)
+
+    cache_path = os.path.join(cache_dir, f"{_cache_key(config_path, data)}.pickle")
+    try:
+        with span("config.cache"), open(cache_path, "rb") as f:
+            return pickle.load(f)
+    except Exception:
+        # Missing or broken entries are (re)written below
+        pass
+
+    cv = _parse(config_path, data)
+    if not isinstance(cv, CV):
+        # Overlays depend on their base, so only full configs are cached
+        return cv
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(cv, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, cache_path)
+    return cv
+
+
+def load_cv_data(
+    config_path: str = "cv_data.yaml", cache_dir: Optional[str] = None
+) -> CV:
+    """
+    Load and validate a YAML or JSON config, or read it from stdin for "-".
+
+    A config with an `extends` key is an overlay: the named base config
+    (relative to the overlay) is loaded and the overlay's fields are applied
+    on top, see `apply_overlay`.
+
+    With a `cache_dir`, validated models are stored there by the hash of the
+    config, so unchanged configs skip parsing and validation next time.
+
+    Every call returns a model of its own, which the caller may modify.
+    """
+    if config_path == STDIN:
+        return _load_config(config_path, cache_dir)
+
+    key = (os.path.abspath(config_path), cache_dir)
+    stamps = _stamps(config_path)
+    with _lock:
+        cached = _recent.get(key)
+        if cached is not None and cached[0] == stamps:
+            _recent.move_to_end(key)
+            return cached[1].model_copy(deep=True)
+
+    cv = _load_config(config_path, cache_dir)
+    with _lock:
+        # The base of an overlay is only known once it is loaded
+        _recent[key] = (_stamps(config_path), cv.model_copy(deep=True))
+        if len(_recent) > _RECENT_SIZE:
+            _recent.popitem(last=False)
+    return cv
+
+
+def _stamps(config_path: str) -> tuple:
+    stamps = []
+    for path in (config_path, config_base(config_path)):
+        if path and os.path.exists(path):
+            stat = os.stat(path)
+            stamps.append((stat.st_mtime_ns, stat.st_size))
+    return tuple(stamps)
+
+
+def _load_config(config_path: str, cache_dir: Optional[str]) -> CV:
+    cv = _load(config_path, cache_dir)
+    if isinstance(cv, CV):
+        return cv
+
+    base_path = os.path.join(os.path.dirname(config_path), str(cv[EXTENDS]))
+    base = _load_base(base_path, cache_dir)
+    _overlay_bases[os.path.abspath(config_path)] = base_path
+    with span("config.overlay"):
+        return apply_overlay(base, cv)
+
+
+def cv_from_data(data: dict, cache_dir: Optional[str] = None) -> CV:
+    """
+    Validate a config that is already parsed, e.g. one embedded in a batch
+    record. An `extends` path is relative to the working directory.
+    """
+    if EXTENDS not in data:
+        with span("config.validate"):
+            return CV(**data)
+
+    base = _load_base(str(data[EXTENDS]), cache_dir)
+    with span("config.overlay"):
+        return apply_overlay(base, data)
+
+
+def mentions(config_path: str, keys: Sequence[str]) -> bool:
+    """
+    Whether a config file may have one of the top-level `keys`, checked on
+    its bytes without parsing it. A nested key or a value of the same name
+    also counts, so the config may turn out not to have it.
+    """
+    data = _read_config(config_path)
+    return any(key.encode() in data for key in keys)
 
-    with open(config_path, "r", encoding="utf-8") as f:
-        data = yaml.safe_load(f)
 
-    return CV(**data)
+def config_base(config_path: str) -> Optional[str]:
+    """Return the base config that `config_path` extended when it was last loaded."""
+    return _overlay_bases.get(os.path.abspath(config_path))
@@ -1,27 +1,38 @@
 from fpdf import FPDF
+from .font_registry import add_fonts
+from .font_subsets import cached_subsetting
+from .image_assets import image_height, place_image
+from .layout import Block, Layout, draw_layout, fit_scale, paginate
+from .locales import letter_date
+from .measure import WrappedText, draw_line, wrap
 from .models import CV
+from .output_options import OutputOptions, deflate_level
+from .profiling import span, traced
+from functools import partial
+from typing import BinaryIO, List, Optional, Union
 import os
-from datetime import datetime
 
 
 class CoverLetterRenderer(FPDF):
-    def __init__(self, cv: CV):
+    def __init__(
+        self,
+        cv: CV,
+        options: Optional[OutputOptions] = None,
+        layout_only: bool = False,
+    ):
+        # A layout-only renderer can measure and paginate but not render
         super().__init__()
         self.cv = cv
+        self.options = options or OutputOptions()
+        if self.options.creation_date:
+            self.set_creation_date(self.options.creation_date)
         self.set_auto_page_break(auto=True, margin=15)
         self.set_margins(20, 10, 20)
+        # Factor on font sizes, line heights and spacing, see fit_scale
+        self.scale = 1.0
 
-        # Add unicode fonts
-        font_dir = os.path.join(os.path.dirname(__file__), "fonts")
-        self.add_font(
-            "Roboto", style="", fname=os.path.join(font_dir, "Roboto-Regular.ttf")
-        )
-        self.add_font(
-            "Roboto", style="B", fname=os.path.join(font_dir, "Roboto-Bold.ttf")
-        )
-        self.add_font(
-            "Roboto", style="I", fname=os.path.join(font_dir, "Roboto-Regular.ttf")
-        )
+        # Add unicode fonts (parsed once per process)
+        add_fonts(self, layout_only=layout_only)
 
         self.add_page()
         self.set_draw_color(200, 200, 200)  # Light grey for lines
@@ -30,133 +41,252 @@ class CoverLetterRenderer(FPDF):
         # We handle header manually in render to start on first page only
         pass
 
-    def render(self, output_path: str):
+    def render(
+        self,
+        output_path: Optional[Union[str, BinaryIO]] = None,
+        layout: Optional[Layout] = None,
+    ):
         if not self.cv.cover_letter:
             print("No cover letter data found in CV configuration.")
             return
 
-        self._render_header()
-        self._render_addresses()
-        self._render_date()
-        self._render_subject()
-        self._render_body()
-        self._render_signature()
+        # A layout from layout() is drawn as it is, without measuring again
+        draw_layout(self, layout or self.layout())
+
+        # output_path may also be a binary file object; without either the
+        # PDF is returned as bytes
+        level = self.options.pdf_profile.deflate_level
+        with span("pdf.output"), deflate_level(level), cached_subsetting():
+            return self.output(output_path)
+
+    def layout(self) -> Layout:
+        """Measure the letter and break it into pages without drawing anything."""
+        pages = self.options.fit_pages_for("cover_letter")
+        if pages:
+            self.scale = fit_scale(self._layout_at, pages)
+        return self._layout_at(self.scale)
+
+    def _layout_at(self, scale: float) -> Layout:
+        self.scale = scale
+        return paginate(self.blocks(), self.t_margin, self.page_break_trigger)
 
-        self.output(output_path)
+    @traced
+    def blocks(self) -> List[Block]:
+        blocks = [
+            self._header_block(),
+            self._addresses_block(),
+            self._date_block(),
+            self._subject_block(),
+        ]
+        blocks += self._body_blocks()
+        blocks += self._signature_blocks()
+        return blocks
 
-    def _render_header(self):
+    @traced
+    def _header_block(self) -> Block:
+        # Name(5) + one line per address part, email and phone(4) + Spacing(3)
+        person = self.cv.person
+        address_parts = person.address.split(",")
+        height = (5 + 4 * (len(address_parts) + 2) + 3) * self.scale
+        text = (
+            (person.name,)
+            + tuple(part.strip() for part in address_parts)
+            + (person.email, person.phone)
+        )
+        return Block("header", height, self._draw_header, text=text)
+
+    @traced
+    def _draw_header(self, pdf: FPDF):
         # Similar header to CV but maybe simpler
         if self.cv.person.image_path and os.path.exists(self.cv.person.image_path):
             width = self.cv.person.image_width
-            x = 210 - self.r_margin - width
-            self.image(self.cv.person.image_path, x=x, y=10, w=width)
+            x = 210 - pdf.r_margin - width
+            place_image(pdf, self.cv.person.image_path, x=x, y=10, w=width)
 
         # Sender Info (Top Left)
-        self.set_y(10)
-        self.set_font("Roboto", "B", 11)
-        self.cell(0, 5, self.cv.person.name, ln=True)
-        self.set_font("Roboto", size=9)
-        self.set_text_color(100, 100, 100)
+        s = self.scale
+        pdf.set_font("Roboto", "B", 11 * s)
+        pdf.cell(0, 5 * s, self.cv.person.name, ln=True)
+        pdf.set_font("Roboto", size=9 * s)
+        pdf.set_text_color(100, 100, 100)
 
         # Split address into lines for stack
         address_parts = self.cv.person.address.split(",")
         for part in address_parts:
-            self.cell(0, 4, part.strip(), ln=True)
+            pdf.cell(0, 4 * s, part.strip(), ln=True)
 
-        self.cell(0, 4, self.cv.person.email, ln=True)
-        self.cell(0, 4, self.cv.person.phone, ln=True)
-        self.set_text_color(0, 0, 0)
+        pdf.cell(0, 4 * s, self.cv.person.email, ln=True)
+        pdf.cell(0, 4 * s, self.cv.person.phone, ln=True)
+        pdf.set_text_color(0, 0, 0)
 
         # Reduced spacing after header but readable
-        self.ln(3)
+        pdf.ln(3 * s)
 
-    def _render_addresses(self):
+    @traced
+    def _addresses_block(self) -> Block:
+        company = self.cv.cover_letter.company
+        text = (
+            (company.name,)
+            + ((company.contact_person,) if company.contact_person else ())
+            + tuple(line.strip() for line in company.address.split("\n"))
+        )
+        height = (3 + 4 * len(text)) * self.scale
+        return Block("addresses", height, self._draw_addresses, text=text)
+
+    @traced
+    def _draw_addresses(self, pdf: FPDF):
         # Recipient Address
-        self.ln(3)
-        self.set_font("Roboto", size=9)
+        s = self.scale
+        pdf.ln(3 * s)
+        pdf.set_font("Roboto", size=9 * s)
 
         cl = self.cv.cover_letter
 
-        self.cell(0, 4, cl.company.name, ln=True)
+        pdf.cell(0, 4 * s, cl.company.name, ln=True)
         if cl.company.contact_person:
-            self.cell(0, 4, cl.company.contact_person, ln=True)
+            pdf.cell(0, 4 * s, cl.company.contact_person, ln=True)
 
         # Handle multiline company address
         for line in cl.company.address.split("\n"):
-            self.cell(0, 4, line.strip(), ln=True)
+            pdf.cell(0, 4 * s, line.strip(), ln=True)
+
+    def _date_block(self) -> Block:
+        date_str = letter_date(self.cv, self.options.creation_date)
+        return Block(
+            "date",
+            10 * self.scale,
+            partial(self._draw_date, date_str=date_str),
+            text=(date_str,),
+        )
 
-    def _render_date(self):
-        self.ln(3)
+    @traced
+    def _draw_date(self, pdf: FPDF, date_str: str):
+        s = self.scale
+        pdf.ln(3 * s)
         # Right aligned date
-        date_str = self.cv.person.signature_date
-        if not date_str:
-            date_str = datetime.now().strftime("%d. %B %Y")
+        pdf.set_font("Roboto", size=9 * s)
+        pdf.cell(0, 4 * s, date_str, align="R", ln=True)
+        pdf.ln(3 * s)
 
-        self.cell(0, 4, date_str, align="R", ln=True)
-        self.ln(3)
+    def _subject_block(self) -> Block:
+        return Block(
+            "subject",
+            16 * self.scale,
+            self._draw_subject,
+            text=(self.cv.cover_letter.title,),
+        )
 
-    def _render_subject(self):
-        self.ln(2)
-        self.set_font("Roboto", "B", 11)
-        self.cell(0, 6, self.cv.cover_letter.title, ln=True)
-        self.ln(8)
+    @traced
+    def _draw_subject(self, pdf: FPDF):
+        s = self.scale
+        pdf.ln(2 * s)
+        pdf.set_font("Roboto", "B", 11 * s)
+        pdf.cell(0, 6 * s, self.cv.cover_letter.title, ln=True)
+        pdf.ln(8 * s)
 
-    def _render_body(self):
-        self.set_font("Roboto", size=10)  # Restored to 10 (was 9)
-        self.set_xy(self.l_margin, self.get_y())
+    @traced
+    def _body_blocks(self) -> List[Block]:
+        s = self.scale
+        self.set_font("Roboto", size=10 * s)  # Restored to 10 (was 9)
 
-        # Simple multi_cell for text body
         # Assuming text uses \n\n for paragraphs
-        text = self.cv.cover_letter.text
-
-        # Split by double newlines for paragraphs to add spacing
-        paragraphs = text.split("\n\n")
+        paragraphs = self.cv.cover_letter.text.split("\n\n")
 
+        blocks = []
         for p in paragraphs:
-            self.multi_cell(0, 5, p.strip())  # Increased line height to 5 (was 4)
-            self.ln(2.5)  # Increased paragraph spacing to 2.5 (was 1.5)
-
-    def _render_signature(self):
-        self.ln(5)
-        self.cell(
-            0,
-            5,
-            (
-                "Best regards,"
-                if "english" in self.cv.languages.lower()
-                and "German" not in self.cv.languages
-                else "Mit freundlichen Grüßen,"
-            ),
-            ln=True,
+            wrapped = wrap(self, p.strip(), self.epw)
+            last = len(wrapped.lines) - 1
+            for index in range(len(wrapped.lines)):
+                blocks.append(
+                    Block(
+                        "paragraph_line",
+                        5 * s,  # Increased line height to 5 (was 4)
+                        partial(self._draw_body_line, wrapped=wrapped, index=index),
+                        # Paragraph spacing of 2.5 (was 1.5)
+                        space_before=2.5 * s if blocks and index == 0 else 0,
+                        # No single line of a paragraph alone on a page
+                        keep_with_next=index == 0 or index == last - 1,
+                        text=(wrapped.lines[index],),
+                    )
+                )
+        if blocks:
+            # The closing follows the end of the letter onto a new page
+            blocks[-1].keep_with_next = True
+        return blocks
+
+    @traced
+    def _draw_body_line(self, pdf: FPDF, wrapped: WrappedText, index: int):
+        pdf.set_font("Roboto", size=10 * self.scale)
+        draw_line(pdf, wrapped, index, pdf.epw, 5 * self.scale)
+
+    def _closing(self) -> str:
+        if self.cv.closing:
+            return self.cv.closing
+        if "english" in self.cv.languages.lower() and "German" not in self.cv.languages:
+            return "Best regards,"
+        return "Mit freundlichen Grüßen,"
+
+    @traced
+    def _signature_blocks(self) -> List[Block]:
+        person = self.cv.person
+        # The closing stays with the signature below it
+        s = self.scale
+        closing = Block(
+            "closing",
+            8 * s,
+            self._draw_closing,
+            space_before=7.5 * s,
+            keep_with_next=True,
+            text=(self._closing(),),
         )
-        self.ln(3)
 
+        if person.signature_path and os.path.exists(person.signature_path):
+            text_height = (person.signature_width / 2) - 10 + 2 * s + 5 * s
+            image = image_height(self, person.signature_path, person.signature_width)
+            height = max(text_height, image)
+        else:
+            height = 15 * s
+        signature = Block(
+            "signature", height, self._draw_signature, text=(person.name,)
+        )
+        return [closing, signature]
+
+    @traced
+    def _draw_closing(self, pdf: FPDF):
+        s = self.scale
+        pdf.set_font("Roboto", size=10 * s)
+        pdf.cell(0, 5 * s, self._closing(), ln=True)
+        pdf.ln(3 * s)
+
+    @traced
+    def _draw_signature(self, pdf: FPDF):
+        s = self.scale
         if self.cv.person.signature_path and os.path.exists(
             self.cv.person.signature_path
         ):
-            self.image(
+            place_image(
+                pdf,
                 self.cv.person.signature_path,
-                x=self.l_margin,
-                y=self.get_y(),
+                x=pdf.l_margin,
+                y=pdf.get_y(),
                 w=self.cv.person.signature_width,
             )
             # Match CV renderer spacing logic
-            self.ln((self.cv.person.signature_width / 2) - 10)
+            pdf.ln((self.cv.person.signature_width / 2) - 10)
 
             # Draw line
             line_width = self.cv.person.signature_width
-            self.line(
-                self.l_margin, self.get_y(), self.l_margin + line_width, self.get_y()
-            )
+            pdf.line(pdf.l_margin, pdf.get_y(), pdf.l_margin + line_width, pdf.get_y())
 
             # Add name below line
-            self.ln(2)
-            self.set_font("Roboto", size=10)
+            pdf.ln(2 * s)
+            pdf.set_font("Roboto", size=10 * s)
 
             # Print name centered under line
-            self.cell(line_width, 5, self.cv.person.name, align="C", ln=True)
+            pdf.cell(line_width, 5 * s, self.cv.person.name, align="C", ln=True)
 
         else:
             # Fallback if no signature image
-            self.ln(10)
-            self.cell(0, 5, self.cv.person.name, ln=True)
+            pdf.ln(10 * s)
+            pdf.set_font("Roboto", size=10 * s)
+            pdf.cell(0, 5 * s, self.cv.person.name, ln=True)
@@ -0,0 +1,13 @@
+import os
+
+# Kept free of fpdf imports so that hashing the fonts for the build manifest
+# does not load the PDF stack
+
+FONT_DIR = os.path.join(os.path.dirname(__file__), "fonts")
+
+# Roboto ships without an italic cut, so Regular doubles as the "I" style
+ROBOTO_STYLES = {
+    "": "Roboto-Regular.ttf",
+    "B": "Roboto-Bold.ttf",
+    "I": "Roboto-Regular.ttf",
+}
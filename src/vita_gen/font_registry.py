@@ -0,0 +1,111 @@
+from copy import copy
+from io import BytesIO
+from fpdf import FPDF
+from fpdf.enums import TextEmphasis
+from fpdf.fonts import SubsetMap, TTFFont
+from pathlib import Path
+import os
+import threading
+
+from .font_files import FONT_DIR, ROBOTO_STYLES
+from .font_subsets import SubsetCachingFont, font_digest
+from .profiling import span, traced
+
+# Parsed fonts, raw file contents and their digests, keyed by font file path
+_parsed: dict[str, TTFFont] = {}
+_font_bytes: dict[str, bytes] = {}
+_font_digests: dict[str, str] = {}
+_lock = threading.Lock()
+
+# The TTFFont attributes _instantiate sets or relies on. Without all of them
+# (a different fpdf2 release) every document parses the fonts with add_font.
+_INSTANCE_SLOTS = {
+    "i",
+    "fontkey",
+    "emphasis",
+    "cw",
+    "desc",
+    "missing_glyphs",
+    "biggest_size_pt",
+    "ttffile",
+    "ttfont",
+    "subset",
+}
+_COPYABLE = _INSTANCE_SLOTS <= set(getattr(TTFFont, "__slots__", ()))
+
+
+def _parse(pdf: FPDF, font_path: str) -> TTFFont:
+    with _lock:
+        parsed = _parsed.get(font_path)
+        if parsed is None:
+            with span("fonts.parse", file=os.path.basename(font_path)):
+                with open(font_path, "rb") as f:
+                    _font_bytes[font_path] = f.read()
+                _font_digests[font_path] = font_digest(_font_bytes[font_path])
+                parsed = TTFFont(pdf, Path(font_path), "", "")
+            _parsed[font_path] = parsed
+        return parsed
+
+
+def _instantiate(
+    parsed: TTFFont, pdf: FPDF, fontkey: str, style: str, layout_only: bool
+) -> TTFFont:
+    """
+    Create a per-document font from an already parsed one.
+
+    Metrics, cmap and glyph ids are shared. Everything fpdf2 mutates while a
+    document is written (subset map, font descriptor and the fontTools font
+    that gets subset in place at output time) is fresh for every document,
+    except for documents that are only laid out and never written.
+    """
+    font = TTFFont.__new__(TTFFont)
+    for slot in TTFFont.__slots__:
+        if hasattr(parsed, slot):
+            setattr(font, slot, getattr(parsed, slot))
+
+    font.i = len(pdf.fonts) + 1
+    font.fontkey = fontkey
+    font.emphasis = TextEmphasis.coerce(style)
+    font.cw = parsed.cw.copy()
+    font.desc = copy(parsed.desc)
+    font.missing_glyphs = []
+    font.biggest_size_pt = 0
+    font_path = str(parsed.ttffile)
+    if layout_only:
+        # Measuring text only reads the font, so the parsed one is enough
+        font.ttfont = parsed.ttfont
+        font.subset = SubsetMap(font)
+        return font
+    font.ttfont = SubsetCachingFont(
+        BytesIO(_font_bytes[font_path]),
+        _font_digests[font_path],
+        recalcTimestamp=False,
+        lazy=True,
+    )
+    font.subset = SubsetMap(font)
+    return font
+
+
+@traced
+def add_fonts(pdf: FPDF, family: str = "Roboto", layout_only: bool = False) -> None:
+    """
+    Register the bundled Roboto fonts on a document.
+
+    Each font file is parsed once per process; later documents receive cheap
+    copies of the parsed fonts instead of re-reading the TTF files, and
+    reuse the font subsets of earlier documents with the same glyphs.
+    Fonts added with `layout_only` can measure text but not be embedded.
+    """
+    if not _COPYABLE:
+        for style, fname in ROBOTO_STYLES.items():
+            pdf.add_font(family, style, os.path.join(FONT_DIR, fname))
+        return
+    for style, fname in ROBOTO_STYLES.items():
+        parsed = _parse(pdf, os.path.join(FONT_DIR, fname))
+        fontkey = f"{family.lower()}{style}"
+        pdf.fonts[fontkey] = _instantiate(parsed, pdf, fontkey, style, layout_only)
+
+
+def preload() -> None:
+    """Parse all bundled fonts ahead of the first document."""
+    add_fonts(FPDF())
@@ -0,0 +1,234 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from io import BytesIO
+from types import SimpleNamespace
+from typing import Iterator, Optional
+import hashlib
+import os
+import pickle
+import threading
+import zlib
+
+from fontTools import subset as ftsubset, ttLib, version as fonttools_version
+
+from .profiling import span
+
+# Directory in which subset fonts are kept across runs. Read from the
+# environment on every lookup so that worker processes share the setting.
+CACHE_ENV = "VITA_GEN_FONT_CACHE"
+
+# Subsets kept in memory; a document of the bundled fonts uses three
+MAX_ENTRIES = 256
+
+# Bump whenever the fields of Subset change, so old entries on disk are ignored
+_FORMAT = 2
+
+
+@dataclass(frozen=True)
+class Subset:
+    # The subset font file as fpdf2 embeds it
+    data: bytes
+    # The same, compressed like fpdf2 compresses font streams, at `level`
+    compressed: bytes
+    level: int
+    # Glyph ids within the subset, by glyph name
+    glyph_ids: dict[str, int]
+    tables: frozenset[str]
+
+
+_subsets: "OrderedDict[tuple[str, tuple[str, ...]], Subset]" = OrderedDict()
+# Cached subsets by their uncompressed data
+_by_data: dict[bytes, Subset] = {}
+_lock = threading.Lock()
+# Documents being written with the subsetter of this module in place
+_patch_lock = threading.Lock()
+_writers = 0
+_originals: Optional[tuple] = None
+_stream_class: Optional[type] = None
+
+
+def font_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class SubsetCachingFont(ttLib.TTFont):
+    """
+    A fontTools font that fpdf2 can subset through the cache.
+
+    Once a cached subset is attached, the calls fpdf2 makes on the subset
+    font are answered from it and the font itself is never parsed.
+    """
+
+    def __init__(self, file, digest: str, **kwargs):
+        super().__init__(file, **kwargs)
+        self.digest = digest
+        self.cached_subset: Optional[Subset] = None
+
+    def getGlyphID(self, glyphName):
+        if self.cached_subset is not None:
+            return self.cached_subset.glyph_ids[glyphName]
+        return super().getGlyphID(glyphName)
+
+    def save(self, file, *args, **kwargs):
+        if self.cached_subset is not None:
+            file.write(self.cached_subset.data)
+            return
+        super().save(file, *args, **kwargs)
+
+    def __contains__(self, tag):
+        if self.cached_subset is not None:
+            return tag in self.cached_subset.tables
+        return super().__contains__(tag)
+
+
+def _remember(key: tuple[str, tuple[str, ...]], subset: Subset) -> None:
+    with _lock:
+        _subsets[key] = subset
+        _by_data[subset.data] = subset
+        while len(_subsets) > MAX_ENTRIES:
+            _, evicted = _subsets.popitem(last=False)
+            _by_data.pop(evicted.data, None)
+
+
+def _cache_path(directory: str, key: tuple[str, tuple[str, ...]]) -> str:
+    import fpdf
+
+    # The subset depends on the fontTools version and on the options fpdf2
+    # subsets with
+    h = hashlib.sha256(
+        f"{_FORMAT}|{fonttools_version}|{fpdf.__version__}|{key[0]}|".encode()
+    )
+    h.update(" ".join(key[1]).encode("utf-8"))
+    return os.path.join(directory, f"{h.hexdigest()}.pickle")
+
+
+def _load(key: tuple[str, tuple[str, ...]]) -> Optional[Subset]:
+    with _lock:
+        subset = _subsets.get(key)
+        if subset is not None:
+            _subsets.move_to_end(key)
+            return subset
+
+    directory = os.environ.get(CACHE_ENV)
+    if not directory:
+        return None
+    try:
+        with span("fonts.subset_cache"), open(_cache_path(directory, key), "rb") as f:
+            subset = pickle.load(f)
+    except Exception:
+        # Missing or broken entries are (re)written after subsetting
+        return None
+    _remember(key, subset)
+    return subset
+
+
+def _store(key: tuple[str, tuple[str, ...]], font: ttLib.TTFont) -> Subset:
+    from fpdf.syntax import PDFContentStream
+
+    output = BytesIO()
+    font.save(output)
+    data = output.getvalue()
+    level = PDFContentStream._COMPRESSION_LEVEL
+    subset = Subset(
+        data=data,
+        compressed=zlib.compress(data, level=level),
+        level=level,
+        glyph_ids={name: font.getGlyphID(name) for name in font.getGlyphOrder()},
+        tables=frozenset(font.keys()),
+    )
+    _remember(key, subset)
+
+    directory = os.environ.get(CACHE_ENV)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        cache_path = _cache_path(directory, key)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(subset, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    return subset
+
+
+class _CachingSubsetter(ftsubset.Subsetter):
+    def populate(self, glyphs=(), **kwargs):
+        self.glyph_names = tuple(sorted(set(glyphs)))
+        super().populate(glyphs=glyphs, **kwargs)
+
+    def subset(self, font):
+        # CFF fonts are embedded from their compiled CFF table, not the file
+        if not isinstance(font, SubsetCachingFont) or font.sfntVersion == "OTTO":
+            return super().subset(font)
+
+        key = (font.digest, self.glyph_names)
+        cached = _load(key)
+        if cached is None:
+            with span("fonts.subset"):
+                super().subset(font)
+                cached = _store(key, font)
+        font.cached_subset = cached
+
+
+def _font_stream_class():
+    from fpdf.output import PDFFontStream
+    from fpdf.syntax import Name, PDFObject
+
+    class CachedFontStream(PDFFontStream):
+        # Reuses the compressed data of cached subsets instead of compressing
+        # the same font file for every document
+        def __init__(self, contents: bytes) -> None:
+            subset = _by_data.get(contents)
+            if subset is None or subset.level != self._COMPRESSION_LEVEL:
+                super().__init__(contents)
+                return
+            PDFObject.__init__(self)
+            self._contents = subset.compressed
+            self.filter = Name("FlateDecode")
+            self.length = len(subset.compressed)
+            self.length1 = len(contents)
+
+    return CachedFontStream
+
+
+def _supported() -> bool:
+    # The fpdf2 internals patched below; without them fpdf2 subsets and
+    # compresses every font itself, which gives the same PDF, only slower
+    import fpdf.output
+    from fpdf.syntax import PDFContentStream
+
+    return (
+        getattr(fpdf.output, "ftsubset", None) is ftsubset
+        and isinstance(getattr(fpdf.output, "PDFFontStream", None), type)
+        and isinstance(getattr(PDFContentStream, "_COMPRESSION_LEVEL", None), int)
+    )
+
+
+@contextmanager
+def cached_subsetting() -> Iterator[None]:
+    """
+    Make fpdf2 subset fonts through the cache while writing a document.
+
+    Only the names fpdf2's output module looks up are replaced, and only
+    until the last document written inside such a block is done, so other
+    users of fpdf2 and fontTools are not affected outside of it.
+    """
+    global _writers, _originals, _stream_class
+    import fpdf.output
+
+    with _patch_lock:
+        if not _writers and _supported():
+            _originals = (fpdf.output.ftsubset, fpdf.output.PDFFontStream)
+            _stream_class = _stream_class or _font_stream_class()
+            fpdf.output.ftsubset = SimpleNamespace(
+                Options=ftsubset.Options, Subsetter=_CachingSubsetter
+            )
+            fpdf.output.PDFFontStream = _stream_class
+        _writers += 1
+    try:
+        yield
+    finally:
+        with _patch_lock:
+            _writers -= 1
+            if not _writers and _originals is not None:
+                fpdf.output.ftsubset, fpdf.output.PDFFontStream = _originals
+                _originals = None
@@ -0,0 +1,290 @@
+from collections import OrderedDict
+from fpdf import FPDF
+from fpdf.image_datastructures import RasterImageInfo
+from fpdf.image_parsing import get_img_info
+from io import BytesIO
+from typing import Optional
+import hashlib
+import os
+import pickle
+import threading
+
+from .manifest import file_digest
+from .output_options import OutputOptions, deflate_level
+from .profiling import span
+
+# Directory in which decoded and optimized images are kept across runs. Read
+# from the environment on every lookup so that worker processes share it.
+CACHE_ENV = "VITA_GEN_IMAGE_CACHE"
+
+# Bump whenever the preparation of images changes, so old entries are ignored
+_FORMAT = 1
+
+# Decoded and compressed image data, keyed by path, target width and the
+# encoding settings. Each entry remembers the file's mtime and size so
+# edits invalidate it. Both caches are LRUs, so a batch with a photo per
+# config does not grow without bound; a document has at most two images,
+# and batches usually share them.
+_DECODED_CACHE_SIZE = 8
+_decoded: "OrderedDict[tuple, tuple[tuple[int, int], RasterImageInfo]]" = OrderedDict()
+# Pixel size of images by path, read from the file header only
+_SIZE_CACHE_SIZE = 4096
+_sizes: "OrderedDict[str, tuple[tuple[int, int], tuple[int, int]]]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def _cached(cache: OrderedDict, key, stamp: tuple[int, int]):
+    with _lock:
+        entry = cache.get(key)
+        if entry is None or entry[0] != stamp:
+            return None
+        cache.move_to_end(key)
+        return entry[1]
+
+
+def _store(cache: OrderedDict, size: int, key, stamp: tuple[int, int], value) -> None:
+    with _lock:
+        cache[key] = (stamp, value)
+        cache.move_to_end(key)
+        if len(cache) > size:
+            cache.popitem(last=False)
+
+
+_DEFAULT_OPTIONS = OutputOptions()
+
+# JPEG segments that only hold metadata: APP1 (Exif, XMP), APP3 to APP15
+# except Adobe's APP14, and comments
+_METADATA_MARKERS = frozenset(range(0xE3, 0xF0)) - {0xEE} | {0xE1, 0xFE}
+# Quality JPEGs are re-encoded with when they have to be re-encoded anyway
+_JPEG_QUALITY = 95
+# Exif orientations that turn the image by 90 degrees
+_TRANSPOSED = (5, 6, 7, 8)
+
+
+def _strip_jpeg_metadata(data: bytes) -> bytes:
+    """
+    Drop the Exif, XMP, IPTC and comment segments of a JPEG losslessly.
+
+    JFIF, ICC profile and Adobe segments are kept, since they affect how
+    the image is decoded. Anything unexpected is returned as it is.
+    """
+    if data[:2] != b"\xff\xd8":
+        return data
+    parts = [data[:2]]
+    pos = 2
+    while pos + 4 <= len(data):
+        if data[pos] != 0xFF:
+            return data
+        marker = data[pos + 1]
+        if marker == 0xFF:
+            # Fill byte
+            pos += 1
+            continue
+        if marker == 0xDA:
+            # The entropy-coded image data follows the start of scan
+            parts.append(data[pos:])
+            return b"".join(parts)
+        length = int.from_bytes(data[pos + 2 : pos + 4], "big")
+        if marker not in _METADATA_MARKERS:
+            parts.append(data[pos : pos + 2 + length])
+        pos += 2 + length
+    return data
+
+
+def _prepare(
+    path: str,
+    width: float,
+    image_filter: str,
+    quality: Optional[int],
+    dpi: Optional[int],
+) -> RasterImageInfo:
+    """
+    Prepare an image for embedding at `width` mm.
+
+    The image is turned upright by its Exif orientation, an alpha channel
+    that is fully opaque is dropped, and with `dpi` and `quality` it is
+    scaled down and re-encoded as JPEG. Metadata never reaches the PDF.
+
+    Whichever of the original, the processed and the JPEG encoding is
+    smallest is used: flat graphics like signatures compress better
+    losslessly, and scaling adds grey levels to them. Transparent images
+    are never JPEG.
+    """
+    from PIL import ExifTags, Image, ImageOps
+
+    candidates = []
+    with open(path, "rb") as f:
+        original = f.read()
+    with Image.open(BytesIO(original)) as img:
+        img.load()
+    upright = img.getexif().get(ExifTags.Base.Orientation, 1) == 1
+    if upright:
+        # JPEGs are embedded byte for byte, including their metadata; other
+        # formats are re-encoded from the pixels already decoded
+        source = img
+        if img.format in ("JPEG", "TIFF"):
+            source = BytesIO(_strip_jpeg_metadata(original))
+        candidates.append(get_img_info(path, source, image_filter=image_filter))
+
+    processed = img if upright else ImageOps.exif_transpose(img)
+    if processed.mode in ("RGBA", "LA"):
+        if processed.getchannel("A").getextrema()[0] == 255:
+            # Fully opaque, so the soft mask would only take up space
+            processed = processed.convert(processed.mode[:-1])
+    if dpi:
+        target = round(width / 25.4 * dpi)
+        if processed.width > target:
+            height = max(1, round(processed.height * target / processed.width))
+            processed = processed.resize((target, height), Image.Resampling.LANCZOS)
+    if processed is not img:
+        candidates.append(get_img_info(path, processed, image_filter=image_filter))
+
+    transparent = (
+        processed.mode in ("RGBA", "LA", "PA") or "transparency" in processed.info
+    )
+    if not quality and img.format == "JPEG" and processed is not img:
+        # A photo that had to be turned stays a JPEG rather than being
+        # embedded losslessly at many times the size
+        quality = _JPEG_QUALITY
+    if quality and not transparent:
+        data = BytesIO()
+        processed.convert("RGB").save(
+            data,
+            format="JPEG",
+            quality=quality,
+            optimize=True,
+            icc_profile=img.info.get("icc_profile"),
+        )
+        candidates.append(get_img_info(path, data, image_filter="DCTDecode"))
+    return min(
+        candidates, key=lambda info: len(info["data"]) + len(info.get("smask") or b"")
+    )
+
+
+def _cache_path(directory: str, path: str, key: tuple) -> Optional[str]:
+    import fpdf
+    import PIL
+
+    # Content-addressed, so copies of an image share the entry and an edited
+    # image never matches a stale one
+    digest = file_digest(path)
+    if digest is None:
+        return None
+    h = hashlib.sha256(
+        f"{_FORMAT}|{PIL.__version__}|{fpdf.__version__}|{digest}|{key[1:]}".encode()
+    )
+    return os.path.join(directory, f"{h.hexdigest()}.pickle")
+
+
+def _decode(path: str, key: tuple) -> RasterImageInfo:
+    _, width, image_filter, quality, dpi, level = key
+    directory = os.environ.get(CACHE_ENV)
+    cache_path = directory and _cache_path(directory, path, key)
+    if cache_path:
+        try:
+            with span("image.cache", path=path), open(cache_path, "rb") as f:
+                return pickle.load(f)
+        except Exception:
+            # Missing or broken entries are (re)written below
+            pass
+
+    with span("image.decode", path=path), deflate_level(level):
+        info = _prepare(path, width, image_filter, quality, dpi)
+
+    if cache_path:
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(info, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    return info
+
+
+def _load(
+    path: str, width: float, image_filter: str, options: OutputOptions
+) -> RasterImageInfo:
+    stat = os.stat(path)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    quality, dpi = options.images()
+    level = options.pdf_profile.deflate_level
+    key = (os.path.abspath(path), width, image_filter, quality, dpi, level)
+
+    cached = _cached(_decoded, key, stamp)
+    if cached is not None:
+        return cached
+
+    info = _decode(path, key)
+    _store(_decoded, _DECODED_CACHE_SIZE, key, stamp, info)
+    return info
+
+
+def _options(pdf: FPDF) -> OutputOptions:
+    # Set by the renderers; plain FPDF documents use the defaults
+    return getattr(pdf, "options", None) or _DEFAULT_OPTIONS
+
+
+def _pixel_size(path: str) -> tuple[int, int]:
+    from PIL import ExifTags, Image
+
+    stat = os.stat(path)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    key = os.path.abspath(path)
+    cached = _cached(_sizes, key, stamp)
+    if cached is not None:
+        return cached
+
+    # Opening an image only parses its header
+    with Image.open(path) as img:
+        size = img.size
+        if img.getexif().get(ExifTags.Base.Orientation, 1) in _TRANSPOSED:
+            # Turned upright when it is prepared, see _prepare
+            size = size[::-1]
+    _store(_sizes, _SIZE_CACHE_SIZE, key, stamp, size)
+    return size
+
+
+def register_image(pdf: FPDF, path: str, width: float) -> str:
+    """
+    Make a decoded image available to a document and return its name.
+
+    The PNG/JPEG is decoded, split into colour and alpha data and deflated
+    only once per process; every document gets a shallow copy of that data
+    with its own image index. An image drawn at several widths is prepared
+    and registered once per width.
+    """
+    images = pdf.image_cache.images
+    name = f"{path}@{width!r}"
+    if name in images:
+        return name
+
+    info = RasterImageInfo(
+        _load(path, width, pdf.image_cache.image_filter, _options(pdf))
+    )
+    info["i"] = len(images) + 1
+    info["usages"] = 0
+    info["iccp_i"] = None
+    iccp = info.get("iccp")
+    if iccp is not None:
+        icc_profiles = pdf.image_cache.icc_profiles
+        if iccp not in icc_profiles:
+            icc_profiles[iccp] = len(icc_profiles)
+        info["iccp_i"] = icc_profiles[iccp]
+        info["iccp"] = None
+    images[name] = info
+    return name
+
+
+def image_height(pdf: FPDF, path: str, width: float) -> float:
+    """Height an image takes up when drawn `width` wide."""
+    options = _options(pdf)
+    if options.images() == (None, None):
+        # Not scaled, so the size is known without decoding the image
+        pixel_width, pixel_height = _pixel_size(path)
+        return width * pixel_height / pixel_width
+    info = _load(path, width, pdf.image_cache.image_filter, options)
+    return info.size_in_document_units(width, 0)[1]
+
+
+def place_image(pdf: FPDF, path: str, x: float, y: float, w: float) -> None:
+    """Draw an image through the process-wide decoded image cache."""
+    pdf.image(register_image(pdf, path, w), x=x, y=y, w=w)
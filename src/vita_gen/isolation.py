@@ -0,0 +1,157 @@
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterator, Optional
+import os
+import signal
+import threading
+import tracemalloc
+
+
+class JobTimeout(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class JobLimits:
+    """Limits on every job of a build, enforced in worker processes."""
+
+    # Wall-clock seconds a job may take
+    timeout: Optional[float] = None
+    # Address space of each worker process in MB
+    max_memory_mb: Optional[int] = None
+    # Record the peak of Python allocations per job; slows rendering down
+    trace_memory: bool = False
+
+    @property
+    def isolated(self) -> bool:
+        """Whether jobs must run in worker processes, even with one worker."""
+        return bool(self.timeout or self.max_memory_mb or self.trace_memory)
+
+
+@dataclass
+class JobUsage:
+    peak_rss_kb: Optional[int] = None
+    traced_peak_kb: Optional[int] = None
+
+
+def limit_memory(max_memory_mb: Optional[int]) -> None:
+    """Cap the address space of this process, so allocations beyond it fail."""
+    if not max_memory_mb:
+        return
+    import resource
+
+    limit = max_memory_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _reset_peak_rss() -> None:
+    # Linux resets the high-water mark of the resident set on request;
+    # elsewhere the peak covers the whole life of the worker
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _peak_rss_kb() -> Optional[int]:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Kilobytes on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if os.uname().sysname == "Darwin" else peak
+
+
+def _address_space_kb() -> Optional[int]:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmSize:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+@contextmanager
+def _alarm(timeout: Optional[float]) -> Iterator[None]:
+    # Raise JobTimeout in the main thread once `timeout` seconds have passed
+    if not timeout:
+        yield
+        return
+
+    def expired(signum, frame):
+        raise JobTimeout(f"Job exceeded the time limit of {timeout:g} s")
+
+    previous = signal.signal(signal.SIGALRM, expired)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+@contextmanager
+def limited(limits: JobLimits) -> Iterator[JobUsage]:
+    """
+    Run a job within `limits` and measure its memory use.
+
+    The timeout raises JobTimeout in the job through SIGALRM, so it only
+    works in the main thread of a process, which is where pool workers run
+    their jobs. Code stuck in a C call is only interrupted once it returns.
+    """
+    usage = JobUsage()
+    _reset_peak_rss()
+    if limits.trace_memory:
+        tracemalloc.start()
+    try:
+        with _alarm(limits.timeout):
+            yield usage
+    finally:
+        if limits.trace_memory:
+            usage.traced_peak_kb = tracemalloc.get_traced_memory()[1] // 1024
+            tracemalloc.stop()
+        usage.peak_rss_kb = _peak_rss_kb()
+
+
+@contextmanager
+def bounded(limits: Optional[JobLimits]) -> Iterator[None]:
+    """
+    Hold work the main process does for a job, like loading its config to
+    plan it, to the job's limits.
+
+    The timeout works as in `limited`, but only in the main thread. The
+    memory limit allows `max_memory_mb` on top of what the process already
+    uses, and is lifted again afterwards.
+    """
+    if limits is None or threading.current_thread() is not threading.main_thread():
+        yield
+        return
+    restore = None
+    used_kb = _address_space_kb() if limits.max_memory_mb else None
+    if used_kb is not None:
+        import resource
+
+        soft, hard = resource.getrlimit(resource.RLIMIT_AS)
+        limit = (used_kb + limits.max_memory_mb * 1024) * 1024
+        if hard != resource.RLIM_INFINITY:
+            limit = min(limit, hard)
+        if soft == resource.RLIM_INFINITY or limit < soft:
+            resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+            restore = (soft, hard)
+    try:
+        with _alarm(limits.timeout):
+            yield
+    finally:
+        if restore:
+            resource.setrlimit(resource.RLIMIT_AS, restore)
@@ -0,0 +1,865 @@
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from fnmatch import fnmatchcase
+from typing import Callable, Iterable, Iterator, List, Optional, Protocol, Sequence
+import hashlib
+import os
+import shutil
+import sys
+import time
+
+from .api import render_document, render_formats
+from .content import (
+    CONFIG_EXTENSIONS,
+    EXTENDS,
+    config_base,
+    cv_from_data,
+    load_cv_data,
+    mentions,
+)
+from .isolation import JobLimits, JobTimeout, bounded, limit_memory, limited
+from .locales import locale_names, localize
+from .manifest import Manifest, document_digest
+from .models import CV
+from .output_options import OutputOptions, output_path
+from . import profiling
+from .profiling import span
+
+DOCUMENT_TYPES = {
+    "cv": "CV",
+    "cover_letter": "Cover Letter",
+    "application": "Application",
+}
+
+# Output file name prefix per document type
+FILE_PREFIXES = {"cv": "cv", "cover_letter": "cl", "application": "application"}
+
+# Output path that writes the PDF to standard output
+STDOUT = "-"
+
+# Seconds past its time limit after which a job that did not stop is killed
+_KILL_GRACE = 5.0
+
+
+@dataclass
+class Overrides:
+    """CLI overrides applied to every loaded config."""
+
+    image: Optional[str] = None
+    image_width: Optional[float] = None
+    signature: Optional[str] = None
+    signature_width: Optional[float] = None
+
+    def apply(self, cv: CV) -> None:
+        if self.image:
+            cv.person.image_path = self.image
+        if self.image_width:
+            cv.person.image_width = self.image_width
+        if self.signature:
+            cv.person.signature_path = self.signature
+        if self.signature_width:
+            cv.person.signature_width = self.signature_width
+
+
+@dataclass
+class RenderJob:
+    """A single (config, document type) pair to render."""
+
+    config_path: str
+    doc_type: str
+    output_path: str
+    overrides: Overrides = field(default_factory=Overrides)
+    # Only the first job of a config prints the loading message and asset warnings
+    announce: bool = True
+    # Report a missing cover letter instead of skipping silently
+    required: bool = True
+    # Digest recorded in the build manifest when the output was last written
+    previous_digest: Optional[str] = None
+    # Return the PDF in the result instead of writing it to output_path
+    in_memory: bool = False
+    # Directory of the validated-model cache, see load_cv_data
+    config_cache: Optional[str] = None
+    # Output of an earlier job of the same build with an identical document,
+    # linked instead of rendering it again
+    reuse_from: Optional[str] = None
+    # Config given inline instead of as a file; config_path only names it
+    data: Optional[dict] = None
+    # Compression profile, creation date and size limit of the PDF
+    output_options: OutputOptions = field(default_factory=OutputOptions)
+    # Locale of the config the document is rendered in, see locales.py
+    locale: Optional[str] = None
+    # Why the config failed to load while planning; the job fails with it
+    # instead of loading the config again
+    load_error: Optional[str] = None
+    # The config as loaded while planning, so that the job does not load it
+    # again; only set for configs planning has to read, see config_locales
+    cv: Optional[CV] = None
+    # The base config `cv` was loaded from, see content.config_base
+    base_config: Optional[str] = None
+
+
+@dataclass
+class JobResult:
+    job: RenderJob
+    messages: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+    written: bool = False
+    skipped: bool = False
+    digest: Optional[str] = None
+    # Image and signature files the document was rendered from
+    assets: List[str] = field(default_factory=list)
+    elapsed: float = 0.0
+    # Name of the candidate, for bookmarks
+    title: str = ""
+    # The rendered document of an in-memory job
+    pdf: Optional[bytes] = None
+    # Profiling spans recorded by a worker process, see profiling.py
+    spans: List[dict] = field(default_factory=list)
+    # Peak resident set and traced Python allocations of a job run in a
+    # worker, see isolation.py
+    peak_rss_kb: Optional[int] = None
+    traced_peak_kb: Optional[int] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass(frozen=True)
+class ConfigSelection:
+    """Which configs of a directory to render."""
+
+    recursive: bool = False
+    # Globs matched against the path relative to the directory, e.g.
+    # "acme/*.yaml"; * also matches across folders
+    include: tuple[str, ...] = ()
+    exclude: tuple[str, ...] = ()
+    # 1-based index and number of shards; every config belongs to exactly
+    # one shard, decided by its relative path alone
+    shard: Optional[tuple[int, int]] = None
+
+    def matches(self, relative: str) -> bool:
+        if self.include and not any(fnmatchcase(relative, p) for p in self.include):
+            return False
+        if any(fnmatchcase(relative, p) for p in self.exclude):
+            return False
+        if self.shard is not None:
+            index, count = self.shard
+            digest = hashlib.sha256(relative.encode("utf-8")).digest()
+            return int.from_bytes(digest[:8], "big") % count == index - 1
+        return True
+
+    def excludes_folder(self, relative: str) -> bool:
+        return any(
+            fnmatchcase(relative, p) or fnmatchcase(relative + "/", p)
+            for p in self.exclude
+        )
+
+
+def parse_shard(value: str) -> tuple[int, int]:
+    """Parse a shard such as "2/4" into (2, 4)."""
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise ValueError(f"Expected a shard like 1/4, got {value!r}") from None
+    if not 1 <= index <= count:
+        raise ValueError(
+            f"Shard {value} does not exist, shards are numbered 1 to {count}"
+        )
+    return index, count
+
+
+def iter_configs(
+    config: str, selection: Optional[ConfigSelection] = None
+) -> Iterator[str]:
+    """
+    Yield the config files to render for a file or directory path.
+
+    Directories are walked in sorted order, so every machine sees the same
+    sequence, and lazily, so a large tree is never listed in full. Hidden
+    files and folders, such as the build manifest, are skipped.
+    """
+    if not os.path.isdir(config):
+        yield config
+        return
+    selection = selection or ConfigSelection()
+
+    def walk(folder: str, relative: str) -> Iterator[str]:
+        with os.scandir(folder) as scan:
+            entries = sorted(
+                (entry for entry in scan if not entry.name.startswith(".")),
+                key=lambda entry: entry.name,
+            )
+        for entry in entries:
+            path = relative + entry.name
+            if entry.is_dir():
+                if selection.recursive and not selection.excludes_folder(path):
+                    yield from walk(entry.path, path + "/")
+            elif entry.name.endswith(CONFIG_EXTENSIONS) and selection.matches(path):
+                yield os.path.join(config, *path.split("/"))
+
+    yield from walk(config, "")
+
+
+def discover_configs(
+    config: str, selection: Optional[ConfigSelection] = None
+) -> List[str]:
+    """Return the config files to render for a file or directory path."""
+    return list(iter_configs(config, selection))
+
+
+def output_base(
+    output: str, config_path: str, multiple: bool, config_root: Optional[str] = None
+) -> tuple[str, str]:
+    """
+    Return the output directory and base file name for a config.
+
+    With a `config_root`, configs in subfolders of it are written to the
+    same subfolders of the output directory.
+    """
+    current_output = output
+    if multiple:
+        out_dir = os.path.dirname(output) if output.endswith(".pdf") else output
+        if not out_dir:
+            out_dir = "."
+        if config_root:
+            folder = os.path.relpath(os.path.dirname(config_path), config_root)
+            if folder != ".":
+                out_dir = os.path.join(out_dir, folder)
+
+        base_name = os.path.splitext(os.path.basename(config_path))[0]
+        current_output = os.path.join(out_dir, f"{base_name}.pdf")
+
+    out_dir = os.path.dirname(current_output)
+    base_filename = os.path.basename(current_output)
+    if base_filename.startswith("cv_"):
+        base_filename = base_filename[3:]
+    if base_filename.endswith(".pdf"):
+        base_filename = base_filename[:-4]
+    return out_dir, base_filename
+
+
+def config_locales(
+    config_path: str,
+    config_cache: Optional[str] = None,
+    data: Optional[dict] = None,
+    selected: Optional[Sequence[str]] = None,
+    limits: Optional[JobLimits] = None,
+) -> tuple[List[Optional[str]], Optional[CV]]:
+    """
+    The locales to render a config in, and the config if it was loaded.
+
+    Only configs that may declare locales or extend a base config are
+    loaded; the others are left to their jobs, which load them in parallel
+    when they run in a pool. A config is loaded within the `limits` of its
+    jobs, so a config too big to load within them fails like any other
+    invalid config.
+    """
+    if data is not None:
+        if not data.get("locales") and EXTENDS not in data:
+            return [None], None
+    elif not mentions(config_path, ("locales", EXTENDS)):
+        return [None], None
+    with bounded(limits):
+        if data is not None:
+            cv = cv_from_data(data, config_cache)
+        else:
+            cv = load_cv_data(config_path, config_cache)
+    return locale_names(cv, selected), cv
+
+
+def plan_jobs(
+    configs: Iterable[str],
+    output: str,
+    doc_type: str,
+    overrides: Overrides,
+    multiple: bool,
+    config_cache: Optional[str] = None,
+    output_options: Optional[OutputOptions] = None,
+    config_root: Optional[str] = None,
+    locales: Optional[Sequence[str]] = None,
+    data: Optional[dict] = None,
+    limits: Optional[JobLimits] = None,
+) -> Iterator[RenderJob]:
+    """
+    Expand config paths into one job per requested document type and locale.
+
+    A config that declares locales gets the documents of each of them, or
+    of those named in `locales`, with the locale appended to the file name.
+    """
+    doc_types = ["cv", "cover_letter"] if doc_type == "both" else [doc_type]
+    for config_path in configs:
+        out_dir, base_filename = output_base(output, config_path, multiple, config_root)
+        index = 0
+        try:
+            config_names, cv = config_locales(
+                config_path, config_cache, data, locales, limits
+            )
+            load_error = None
+        except Exception as e:
+            config_names, cv = [None], None
+            load_error = f"Error loading config {config_path}: {str(e) or repr(e)}"
+        for locale in config_names:
+            suffix = f"_{locale}" if locale else ""
+            for current in doc_types:
+                prefix = FILE_PREFIXES[current]
+                yield RenderJob(
+                    config_path=config_path,
+                    doc_type=current,
+                    output_path=os.path.join(
+                        out_dir, f"{prefix}_{base_filename}{suffix}.pdf"
+                    ),
+                    overrides=overrides,
+                    announce=index == 0,
+                    required=doc_type != "both",
+                    config_cache=config_cache,
+                    data=data,
+                    output_options=output_options or OutputOptions(),
+                    locale=locale,
+                    load_error=load_error,
+                    cv=cv,
+                    base_config=config_base(config_path) if cv else None,
+                )
+                index += 1
+
+
+def check_assets(cv: CV, log: Callable[[str], None]) -> None:
+    if cv.person.image_path and not os.path.exists(cv.person.image_path):
+        log(f"Warning: Image file not found at {cv.person.image_path}")
+
+    if cv.person.signature_path and not os.path.exists(cv.person.signature_path):
+        log(f"Warning: Signature file not found at {cv.person.signature_path}")
+
+
+def link_or_copy(source: str, target: str) -> None:
+    """Make `target` a hard link to `source`, or a copy where links fail."""
+    tmp_path = f"{target}.{os.getpid()}.tmp"
+    try:
+        os.link(source, tmp_path)
+    except OSError:
+        shutil.copyfile(source, tmp_path)
+    os.replace(tmp_path, target)
+
+
+def run_job(job: RenderJob, log: Callable[[str], None] = print) -> JobResult:
+    """Load the config of a job and render its document."""
+    with span("document", config=job.config_path, doc_type=job.doc_type):
+        return _run_job(job, log)
+
+
+def _run_job(job: RenderJob, log: Callable[[str], None]) -> JobResult:
+    result = JobResult(job=job)
+
+    def emit(message: str) -> None:
+        result.messages.append(message)
+        log(message)
+
+    start = time.perf_counter()
+    try:
+        if job.announce:
+            emit(f"Loading data from {job.config_path}...")
+        if job.load_error:
+            result.error = job.load_error
+            emit(result.error)
+            return result
+        try:
+            if job.cv is not None:
+                # Shared by the jobs of the config, so this one gets a copy;
+                # dropped so that the result does not carry it back
+                cv_object = job.cv.model_copy(deep=True)
+                job.cv = None
+            elif job.data is not None:
+                cv_object = cv_from_data(job.data, job.config_cache)
+            else:
+                cv_object = load_cv_data(job.config_path, job.config_cache)
+        except Exception as e:
+            result.error = f"Error loading config {job.config_path}: {e}"
+            emit(result.error)
+            return result
+
+        job.overrides.apply(cv_object)
+        try:
+            cv_object = localize(cv_object, job.locale)
+        except ValueError as e:
+            result.error = f"Error loading config {job.config_path}: {e}"
+            emit(result.error)
+            return result
+        result.title = cv_object.person.name
+        result.assets = [
+            path
+            for path in (
+                cv_object.person.image_path,
+                cv_object.person.signature_path,
+                job.base_config or config_base(job.config_path),
+            )
+            if path
+        ]
+        if job.announce:
+            check_assets(cv_object, emit)
+
+        label = DOCUMENT_TYPES[job.doc_type]
+        if job.doc_type == "cover_letter" and not cv_object.cover_letter:
+            if job.required:
+                emit(f"No cover letter data found in {job.config_path}")
+            return result
+
+        to_stdout = job.output_path == STDOUT
+        # Files of the document by format; the PDF path names the others
+        formats = job.output_options.formats
+        paths = {name: output_path(job.output_path, name) for name in formats}
+        if not (to_stdout or job.in_memory):
+            result.digest = document_digest(cv_object, job.doc_type, job.output_options)
+            if result.digest == job.previous_digest and all(
+                os.path.exists(path) for path in paths.values()
+            ):
+                result.skipped = True
+                emit(f"Skipping {label} at {job.output_path} (unchanged)")
+                return result
+
+        if not (to_stdout or job.in_memory):
+            try:
+                # Batch records may name folders that do not exist yet
+                os.makedirs(os.path.dirname(job.output_path) or ".", exist_ok=True)
+            except OSError as e:
+                result.error = f"Error creating the folder of {job.output_path}: {e}"
+                emit(result.error)
+                return result
+
+        if job.reuse_from:
+            try:
+                for name, path in paths.items():
+                    link_or_copy(output_path(job.reuse_from, name), path)
+            except OSError as e:
+                result.error = f"Error linking {label} to {job.output_path}: {e}"
+                emit(result.error)
+                return result
+            result.written = True
+            emit(f"Reused {label} from {job.reuse_from} at {job.output_path}")
+            return result
+
+        target = "stdout" if to_stdout else ", ".join(paths.values())
+        emit(f"Rendering {label} to {target}...")
+        try:
+            options = job.output_options
+            if job.in_memory:
+                result.pdf = render_document(cv_object, job.doc_type, options=options)
+            elif to_stdout:
+                render_document(cv_object, job.doc_type, sys.stdout.buffer, options)
+                sys.stdout.buffer.flush()
+            else:
+                outputs = render_formats(cv_object, job.doc_type, formats, options)
+                for name, data in outputs.items():
+                    path = paths[name]
+                    if os.path.exists(path) and os.stat(path).st_nlink > 1:
+                        # Files are written in place, which would change the
+                        # documents linked to this one as well
+                        os.remove(path)
+                    with span("pdf.write"), open(path, "wb") as f:
+                        f.write(data)
+        except Exception as e:
+            # MemoryError usually comes without a message
+            reason = str(e) or repr(e)
+            result.error = f"Error rendering {label} from {job.config_path}: {reason}"
+            emit(result.error)
+            return result
+
+        result.written = True
+        emit(f"Successfully generated {label} at {target}")
+        return result
+    finally:
+        result.elapsed = time.perf_counter() - start
+
+
+def init_worker(profile: bool = False, limits: Optional[JobLimits] = None) -> None:
+    if profile:
+        profiling.enable()
+    # Import the renderers and parse the fonts once per worker so that jobs
+    # only pay for rendering
+    from . import application_renderer  # noqa: F401
+    from .font_registry import preload
+
+    preload()
+    if limits:
+        # Set last, so that a limit too low for the fonts fails every job
+        # instead of breaking the pool
+        limit_memory(limits.max_memory_mb)
+
+
+def _failed(job: RenderJob, error: str) -> JobResult:
+    result = JobResult(job=job, error=error)
+    result.messages.append(error)
+    return result
+
+
+def _run_in_worker(job: RenderJob, limits: Optional[JobLimits] = None) -> JobResult:
+    limits = limits or JobLimits()
+    try:
+        with limited(limits) as usage:
+            result = run_job(job, log=lambda message: None)
+    except (JobTimeout, MemoryError) as e:
+        # Raised outside of loading and rendering, which report it themselves
+        reason = str(e) or repr(e)
+        result = _failed(job, f"Error in job for {job.config_path}: {reason}")
+    result.peak_rss_kb = usage.peak_rss_kb
+    result.traced_peak_kb = usage.traced_peak_kb
+    # Hand the spans to the main process, including those of init_worker
+    result.spans = profiling.drain()
+    return result
+
+
+def _kill(pool: ProcessPoolExecutor) -> None:
+    # The executor cannot cancel a running job, so its workers are killed
+    # and the pool replaced
+    for process in list((getattr(pool, "_processes", None) or {}).values()):
+        process.kill()
+    pool.shutdown(wait=True, cancel_futures=True)
+
+
+def run_jobs(
+    jobs: Iterable[RenderJob],
+    workers: int = 1,
+    log: Callable[[str], None] = print,
+    limits: Optional[JobLimits] = None,
+) -> Iterator[JobResult]:
+    """
+    Run jobs and yield their results in submission order.
+
+    With more than one worker, or with `limits`, the jobs are rendered by a
+    process pool. Only a bounded number of jobs is submitted ahead of the
+    result being consumed, so the job iterable can be arbitrarily long.
+
+    A job that exceeds the time limit without reacting to it, or whose
+    worker dies, does not stop the run: the pool is replaced and the other
+    jobs in flight are submitted again. As any of them may have killed the
+    worker, a job in a broken pool first runs again on its own, and only
+    fails if it takes down that worker as well.
+
+    Jobs that reuse the output of an earlier job link it in this process
+    once that job's result is in. If it failed, they render after all, in
+    the pool when there is one, so that they are held to the same limits.
+    """
+    limits = limits or JobLimits()
+    # Outputs that are up to date in this run
+    done: set[str] = set()
+
+    def run_here(job: RenderJob) -> JobResult:
+        if job.reuse_from not in done:
+            job.reuse_from = None
+        return run_job(job, log)
+
+    def finished(result: JobResult) -> JobResult:
+        if result.written or result.skipped:
+            done.add(result.job.output_path)
+        return result
+
+    if workers <= 1 and not limits.isolated:
+        for job in jobs:
+            yield finished(run_here(job))
+        return
+
+    def new_pool() -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=init_worker,
+            initargs=(profiling.enabled(), limits),
+        )
+
+    def submit(entry: list) -> None:
+        nonlocal pool
+        job = entry[0]
+        if job.reuse_from:
+            entry[1] = None
+            return
+        try:
+            entry[1] = pool.submit(_run_in_worker, job, limits)
+        except BrokenProcessPool:
+            restart()
+            entry[1] = pool.submit(_run_in_worker, job, limits)
+
+    def restart() -> None:
+        nonlocal pool
+        _kill(pool)
+        pool = new_pool()
+
+    def resubmit() -> None:
+        # Jobs that were in flight when the pool was replaced
+        for entry in pending:
+            future = entry[1]
+            if future is None or not future.done():
+                continue
+            if future.cancelled() or isinstance(future.exception(), BrokenProcessPool):
+                submit(entry)
+
+    def wait(future: Future) -> JobResult:
+        if not limits.timeout:
+            return future.result()
+        # Jobs normally stop themselves at the time limit, see isolation.py;
+        # this catches those stuck in native code. The clock starts once the
+        # job is running, not while it waits for a worker.
+        started = None
+        while True:
+            if started is None:
+                timeout = 1.0
+            else:
+                timeout = started + limits.timeout + _KILL_GRACE - time.monotonic()
+            try:
+                return future.result(timeout=max(timeout, 0))
+            except FutureTimeout:
+                if started is not None:
+                    raise
+                if future.running():
+                    started = time.monotonic()
+
+    jobs = iter(jobs)
+    # Job, future and whether the job runs alone after a broken pool, for
+    # every job in flight
+    pending: deque[list] = deque()
+    pool = new_pool()
+    try:
+        for job in jobs:
+            entry = [job, None, False]
+            pending.append(entry)
+            submit(entry)
+            if len(pending) >= workers * 4:
+                break
+
+        while pending:
+            job, future, alone = pending[0]
+            if future is None and job.reuse_from not in done:
+                # The source failed; render the job like any other
+                job.reuse_from = None
+                submit(pending[0])
+                continue
+            if future is None:
+                pending.popleft()
+                yield finished(run_job(job, log))
+            else:
+                try:
+                    result = wait(future)
+                except FutureTimeout:
+                    pending.popleft()
+                    result = _failed(
+                        job,
+                        f"Killed {job.config_path} after exceeding the time limit "
+                        f"of {limits.timeout:g} s",
+                    )
+                    restart()
+                except BrokenProcessPool:
+                    if not alone:
+                        # Any job in flight may have taken the worker down, so
+                        # this one runs again on its own before the others
+                        pending[0][2] = True
+                        restart()
+                        submit(pending[0])
+                        continue
+                    pending.popleft()
+                    result = _failed(
+                        job,
+                        f"Worker died while rendering {job.config_path}, e.g. "
+                        "because it ran out of memory",
+                    )
+                    restart()
+                except Exception as e:
+                    pending.popleft()
+                    result = _failed(job, f"Worker failed on {job.config_path}: {e}")
+                else:
+                    pending.popleft()
+                resubmit()
+                for message in result.messages:
+                    log(message)
+                profiling.add(result.spans)
+                result.spans = []
+                yield finished(result)
+
+            next_job = next(jobs, None)
+            if next_job is not None:
+                entry = [next_job, None, False]
+                pending.append(entry)
+                submit(entry)
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+class Sink(Protocol):
+    """Receives the documents of a build that are not written to a directory."""
+
+    path: str
+
+    def add(self, result: JobResult) -> None: ...
+
+
+@dataclass
+class BuildReport:
+    results: List[JobResult]
+    workers: int
+    elapsed: float = 0.0
+
+    @property
+    def failed(self) -> List[JobResult]:
+        return [result for result in self.results if not result.ok]
+
+    @property
+    def skipped(self) -> int:
+        return sum(result.skipped for result in self.results)
+
+    def print_summary(self, always: bool = False) -> None:
+        failed = self.failed
+        if not (always or failed or self.skipped):
+            return
+        print(
+            f"Finished {len(self.results)} documents in {self.elapsed:.2f}s "
+            f"with {self.workers} worker(s), {self.skipped} unchanged, "
+            f"{len(failed)} failed"
+        )
+        for result in failed:
+            reason = result.error.splitlines()[0]
+            print(f"  {result.job.config_path} ({result.job.doc_type}): {reason}")
+        measured = [r for r in self.results if r.peak_rss_kb is not None]
+        if measured:
+            top = max(measured, key=lambda r: r.peak_rss_kb)
+            print(
+                f"Peak memory {top.peak_rss_kb / 1024:.0f} MB "
+                f"for {top.job.config_path} ({top.job.doc_type})"
+            )
+
+
+def build(
+    configs: Iterable[str],
+    output: str,
+    doc_type: str,
+    overrides: Overrides,
+    multiple: bool,
+    workers: int = 1,
+    force: bool = False,
+    sink: Optional[Sink] = None,
+    config_cache: Optional[str] = None,
+    output_options: Optional[OutputOptions] = None,
+    config_root: Optional[str] = None,
+    shard: Optional[tuple[int, int]] = None,
+    locales: Optional[Sequence[str]] = None,
+    limits: Optional[JobLimits] = None,
+) -> BuildReport:
+    """
+    Render the documents of the given configs, skipping unchanged ones.
+
+    The build manifest of every output directory is read before the first
+    job of that directory and written back once all jobs have finished.
+    Documents of several configs that come out identical are rendered once
+    and hard linked (or copied) to the other outputs.
+
+    With a `sink` (an archive or a combined PDF) every document is rendered
+    in memory and handed to the sink as soon as it is done, in config order.
+    The sink is rewritten from scratch, so no manifest is involved.
+
+    Configs below `config_root` are written to the matching subfolders of
+    the output. A `shard` build records its documents in a manifest of its
+    own, see `merge_manifests`. `locales` limits the locales rendered of
+    configs that declare several. With `limits`, every job runs in a worker
+    process that enforces them, see `run_jobs`.
+    """
+    manifests: dict[str, Manifest] = {}
+
+    def with_previous_digests(render_jobs: Iterable[RenderJob]) -> Iterator[RenderJob]:
+        for job in render_jobs:
+            out_dir = os.path.dirname(job.output_path)
+            if out_dir not in manifests:
+                if config_root:
+                    # Configs in subfolders are written to subfolders
+                    os.makedirs(out_dir or ".", exist_ok=True)
+                manifests[out_dir] = Manifest(out_dir, shard)
+            if not force:
+                job.previous_digest = manifests[out_dir].get(job.output_path)
+            yield job
+
+    def with_shared_documents(render_jobs: Iterable[RenderJob]) -> Iterator[RenderJob]:
+        # Documents that come out identical, like the CV of application
+        # overlays extending the same base config, are rendered only once.
+        # Only configs loaded while planning are compared, so that the
+        # others are not read in this process.
+        first_outputs: dict[str, str] = {}
+        loaded: tuple[Optional[CV], Optional[CV]] = (None, None)
+        for job in render_jobs:
+            if job.cv is None:
+                yield job
+                continue
+            if loaded[0] is not job.cv:
+                cv = job.cv.model_copy(deep=True)
+                job.overrides.apply(cv)
+                loaded = (job.cv, cv)
+            cv = loaded[1]
+            if cv is not None and job.locale:
+                try:
+                    cv = localize(cv, job.locale)
+                except ValueError:
+                    # A locale the config does not declare; the job reports it
+                    cv = None
+            if cv is not None and (job.doc_type != "cover_letter" or cv.cover_letter):
+                digest = document_digest(cv, job.doc_type, job.output_options)
+                source = first_outputs.setdefault(digest, job.output_path)
+                if source != job.output_path:
+                    job.reuse_from = source
+            yield job
+
+    def in_memory(render_jobs: Iterable[RenderJob]) -> Iterator[RenderJob]:
+        for job in render_jobs:
+            job.in_memory = True
+            yield job
+
+    if sink is not None:
+        # Documents are named as if the sink were a directory
+        render_jobs = in_memory(
+            plan_jobs(
+                configs,
+                os.path.join(sink.path, ""),
+                doc_type,
+                overrides,
+                True,
+                config_cache,
+                output_options,
+                config_root,
+                locales,
+                limits=limits,
+            )
+        )
+    else:
+        render_jobs = with_previous_digests(
+            plan_jobs(
+                configs,
+                output,
+                doc_type,
+                overrides,
+                multiple,
+                config_cache,
+                output_options,
+                config_root,
+                locales,
+                limits=limits,
+            )
+        )
+        if multiple:
+            render_jobs = with_shared_documents(render_jobs)
+
+    report = BuildReport(results=[], workers=workers)
+    start = time.perf_counter()
+    try:
+        for result in run_jobs(render_jobs, workers=workers, limits=limits):
+            report.results.append(result)
+            if sink is not None:
+                if result.pdf is not None:
+                    sink.add(result)
+                    # Drop the document as soon as the sink has written it
+                    result.pdf = None
+                continue
+            manifest = manifests[os.path.dirname(result.job.output_path)]
+            if result.written or result.skipped:
+                manifest.set(result.job.output_path, result.digest)
+            elif not result.ok:
+                manifest.set(result.job.output_path, None)
+    finally:
+        for manifest in manifests.values():
+            manifest.save()
+        report.elapsed = time.perf_counter() - start
+    return report
@@ -0,0 +1,165 @@
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator, List, Tuple
+import math
+
+from fpdf import FPDF
+
+from .profiling import traced
+
+# Slack for rounding errors when comparing summed heights with the page bottom
+_EPSILON = 1e-6
+
+# Range and precision of the scale fit_scale searches
+MIN_SCALE = 0.7
+MAX_SCALE = 1.3
+_SCALE_PRECISION = 0.005
+
+
+@dataclass
+class Block:
+    """A part of a document that is measured up front and drawn in one piece."""
+
+    kind: str
+    height: float
+    # Draws the block at the current position of the given document
+    draw: Callable[[FPDF], None]
+    # Spacing above the block, dropped when the block starts a page
+    space_before: float = 0.0
+    # Keep this block on the same page as the next one
+    keep_with_next: bool = False
+    # Lines of text the block draws, in reading order, see targets.py
+    text: Tuple[str, ...] = ()
+    # Distance of the block from the left margin
+    indent: float = 0.0
+
+
+@dataclass
+class Placement:
+    block: Block
+    page: int
+    y: float
+    # Taller than a page; FPDF breaks it while drawing
+    overflow: bool = False
+
+
+@dataclass
+class Layout:
+    placements: List[Placement]
+    pages: int
+
+
+def _chains(blocks: Iterable[Block]) -> Iterator[List[Block]]:
+    chain: List[Block] = []
+    for block in blocks:
+        chain.append(block)
+        if not block.keep_with_next:
+            yield chain
+            chain = []
+    if chain:
+        yield chain
+
+
+@traced
+def paginate(blocks: Iterable[Block], top: float, bottom: float) -> Layout:
+    """
+    Give every block a page and a vertical position in one pass.
+
+    Blocks chained by `keep_with_next` move to the next page together when
+    they do not fit on the current one. A chain taller than a page is broken
+    between blocks, but never between a block and a following block of a
+    different kind, so headings stay with the first line below them.
+    """
+    usable = bottom - top
+    placements: List[Placement] = []
+    page, y = 0, top
+
+    for chain in _chains(blocks):
+        lead = chain[0].space_before if y > top else 0.0
+        height = lead + sum(block.space_before + block.height for block in chain)
+        height -= chain[0].space_before
+        if (
+            y > top
+            and y + height > bottom + _EPSILON
+            and height - lead <= usable + _EPSILON
+        ):
+            page, y = page + 1, top
+
+        for index, block in enumerate(chain):
+            gap = block.space_before if y > top else 0.0
+            needed = block.height
+            following = chain[index + 1] if index + 1 < len(chain) else None
+            if following is not None and following.kind != block.kind:
+                pair = block.height + following.space_before + following.height
+                if pair <= usable + _EPSILON:
+                    needed = pair
+            if y > top and y + gap + needed > bottom + _EPSILON:
+                page, y, gap = page + 1, top, 0.0
+
+            overflow = block.height > usable + _EPSILON
+            placements.append(Placement(block, page, y + gap, overflow))
+            y += gap + block.height
+            if overflow:
+                # Continue below the last page the block spills onto
+                page += math.ceil(block.height / usable)
+                y = top
+
+    pages = page if placements and placements[-1].overflow else page + 1
+    return Layout(placements, pages)
+
+
+@traced
+def draw_layout(pdf: FPDF, layout: Layout) -> None:
+    """Draw a paginated layout, starting on the current page of `pdf`."""
+    auto_page_break = pdf.auto_page_break
+    page = 0
+    for placement in layout.placements:
+        if placement.page != page:
+            pdf.add_page()
+            page = placement.page
+        pdf.set_y(placement.y)
+        # Positions are final, so only oversized blocks may break the page
+        pdf.auto_page_break = auto_page_break and placement.overflow
+        placement.block.draw(pdf)
+    pdf.auto_page_break = auto_page_break
+
+
+@traced
+def fit_scale(layout_at: Callable[[float], Layout], pages: int) -> float:
+    """
+    Find the scale at which a document is `pages` pages long.
+
+    `layout_at` lays the document out at a scale, which only measures, so
+    a step takes a few milliseconds per page. A longer document gets
+    the largest scale that fits, a shorter one the smallest scale that
+    reaches the last page. Where the page count cannot be reached within
+    MIN_SCALE and MAX_SCALE, the closest end of the range is used.
+    """
+    count = layout_at(1.0).pages
+    if count == pages:
+        return 1.0
+
+    # Documents get longer with the scale, so a bisection finds the boundary
+    if count > pages:
+        # The largest scale at which the document is short enough
+        low, high = MIN_SCALE, 1.0
+        if layout_at(low).pages > pages:
+            return low
+        while high - low > _SCALE_PRECISION:
+            middle = (low + high) / 2
+            if layout_at(middle).pages <= pages:
+                low = middle
+            else:
+                high = middle
+        return low
+
+    # The smallest scale at which the document reaches the last page
+    low, high = 1.0, MAX_SCALE
+    if layout_at(high).pages < pages:
+        return high
+    while high - low > _SCALE_PRECISION:
+        middle = (low + high) / 2
+        if layout_at(middle).pages >= pages:
+            high = middle
+        else:
+            low = middle
+    return high
@@ -0,0 +1,144 @@
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, List, Optional, Sequence
+
+from .content import load_cv_data
+from .jobs import DOCUMENT_TYPES, Overrides
+from .layout import Layout
+from .locales import locale_names, localize
+from .models import CV
+from .output_options import OutputOptions
+
+
+@dataclass
+class PageBreak:
+    # Page that starts at the break, counted from 1
+    page: int
+    # How far the previous page is filled, in mm from its top edge
+    filled: float
+    # Kind of the first block on the new page
+    before: str
+
+
+@dataclass
+class Overflow:
+    kind: str
+    page: int
+    height: float
+
+
+@dataclass
+class DocumentLayout:
+    doc_type: str
+    pages: int
+    # Scale of text and spacing, other than 1 when fitted to a page count
+    scale: float = 1.0
+    breaks: List[PageBreak] = field(default_factory=list)
+    # Blocks taller than a page, which break wherever the page ends
+    overflow: List[Overflow] = field(default_factory=list)
+
+    def describe(self) -> str:
+        pages = f"{self.pages} page{'s' if self.pages != 1 else ''}"
+        if self.scale != 1.0:
+            pages += f" at {self.scale:.1%} scale"
+        breaks = [
+            f"page {b.page} starts with {b.before} ({b.filled:.1f} mm filled before)"
+            for b in self.breaks
+        ]
+        overflow = [
+            f"{o.kind} on page {o.page} overflows ({o.height:.1f} mm tall)"
+            for o in self.overflow
+        ]
+        return "; ".join([f"{self.doc_type}: {pages}"] + breaks + overflow)
+
+
+def _summarize(doc_type: str, layout: Layout, scale: float) -> DocumentLayout:
+    summary = DocumentLayout(doc_type, layout.pages, scale)
+    page, filled = 0, 0.0
+    for placement in layout.placements:
+        if placement.page != page:
+            summary.breaks.append(
+                PageBreak(placement.page + 1, filled, placement.block.kind)
+            )
+            page = placement.page
+        if placement.overflow:
+            summary.overflow.append(
+                Overflow(placement.block.kind, page + 1, placement.block.height)
+            )
+        filled = placement.y + placement.block.height
+    return summary
+
+
+def measure(
+    cv: CV, doc_type: str, options: Optional[OutputOptions] = None
+) -> List[DocumentLayout]:
+    """
+    Lay out the documents of a CV without rendering them.
+
+    "both" and "application" give the cover letter (if any) and the CV
+    separately. Images are measured from their file headers and fonts are
+    never subset, so this costs a fraction of a render. The `fit_pages` of
+    the options are applied as they would be when rendering.
+    """
+    from .cover_letter_renderer import CoverLetterRenderer
+    from .renderer import CVRenderer
+
+    layouts = []
+    if doc_type != "cv" and cv.cover_letter:
+        letter = CoverLetterRenderer(cv, options, layout_only=True)
+        layout = letter.layout()
+        layouts.append(_summarize("cover_letter", layout, letter.scale))
+    elif doc_type == "cover_letter":
+        raise ValueError("No cover letter data found in CV configuration.")
+    if doc_type != "cover_letter":
+        renderer = CVRenderer(cv, options, layout_only=True)
+        layout = renderer.layout()
+        layouts.append(_summarize("cv", layout, renderer.scale))
+    return layouts
+
+
+@dataclass
+class LayoutReport:
+    configs: int = 0
+    documents: int = 0
+    # Documents with blocks taller than a page
+    overflowing: int = 0
+    failed: int = 0
+
+
+def check_layouts(
+    configs: Iterable[str],
+    doc_type: str,
+    overrides: Optional[Overrides] = None,
+    config_cache: Optional[str] = None,
+    locales: Optional[Sequence[str]] = None,
+    options: Optional[OutputOptions] = None,
+    log: Callable[[str], None] = print,
+) -> LayoutReport:
+    """
+    Print the page count, page breaks and overflowing blocks of every config,
+    in each of its locales (or those of them named in `locales`).
+    """
+    if doc_type != "both" and doc_type not in DOCUMENT_TYPES:
+        raise ValueError(f"Unknown type {doc_type!r}")
+    report = LayoutReport()
+    for config_path in configs:
+        report.configs += 1
+        try:
+            cv = load_cv_data(config_path, config_cache)
+            if overrides:
+                overrides.apply(cv)
+            layouts = [
+                (name, layout)
+                for name in locale_names(cv, locales)
+                for layout in measure(localize(cv, name), doc_type, options)
+            ]
+        except Exception as e:
+            report.failed += 1
+            log(f"{config_path}: {e}")
+            continue
+        for name, layout in layouts:
+            report.documents += 1
+            report.overflowing += bool(layout.overflow)
+            label = f"{config_path} [{name}]" if name else config_path
+            log(f"{label}: {layout.describe()}")
+    return report
@@ -0,0 +1,70 @@
+from datetime import datetime
+from typing import List, Optional, Sequence
+
+from .models import CV
+
+# Date format of the cover letter when the config sets none
+DEFAULT_DATE_FORMAT = "%d. %B %Y"
+
+
+def locale_names(
+    cv: CV, selected: Optional[Sequence[str]] = None
+) -> List[Optional[str]]:
+    """
+    The locales a config is rendered in, limited to `selected` if given.
+
+    A config without locales is rendered once as it is, which is [None].
+    Selected names the config does not declare are kept, so that rendering
+    them fails with an error instead of silently producing nothing.
+    """
+    if not cv.locales:
+        return [None]
+    names = [name for name in cv.locales if not selected or name in selected]
+    return names + [name for name in selected or () if name not in cv.locales]
+
+
+def localize(cv: CV, name: Optional[str]) -> CV:
+    """
+    Return the CV as rendered in locale `name`.
+
+    The locale's titles and labels are merged into those of the config, its
+    closing and date format replace them. Everything else is shared with
+    `cv`, so localizing is cheap and the result must not be modified.
+    """
+    if name is None:
+        return cv
+    if not cv.locales or name not in cv.locales:
+        raise ValueError(f"Locale {name!r} is not defined in the config")
+    locale = cv.locales[name]
+    update = {
+        field: value
+        for field, value in locale
+        if value is not None and field not in ("section_titles", "labels")
+    }
+    if locale.section_titles:
+        titles = cv.section_titles or {}
+        update["section_titles"] = {**titles, **locale.section_titles}
+    if locale.labels:
+        update["labels"] = {**(cv.labels or {}), **locale.labels}
+    update["locales"] = None
+    return cv.model_copy(update=update)
+
+
+def format_date(cv: CV, date: datetime) -> str:
+    """Format a date with the config's date format and month names."""
+    date_format = cv.date_format or DEFAULT_DATE_FORMAT
+    if cv.month_names:
+        if len(cv.month_names) != 12:
+            raise ValueError("month_names must list all 12 months")
+        # strftime only knows the month names of the process locale
+        month = cv.month_names[date.month - 1].replace("%", "%%")
+        date_format = date_format.replace("%B", month)
+    return date.strftime(date_format)
+
+
+def letter_date(cv: CV, creation_date: Optional[datetime] = None) -> str:
+    """The date printed on the cover letter."""
+    if cv.person.signature_date:
+        return cv.person.signature_date
+    # Reproducible documents are dated by their fixed creation date
+    return format_date(cv, creation_date or datetime.now())
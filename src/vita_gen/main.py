@@ -1,16 +1,116 @@
+from typing import List
 import typer
-from .content import load_cv_data
-from .renderer import CVRenderer
 import os
+import sys
 
+# Commands import the rest of the package when they run, so that --help and
+# validate never load the PDF stack
 app = typer.Typer()
 
+# Read by the font subset and image caches in every process, see
+# font_subsets.py and image_assets.py
+FONT_CACHE_ENV = "VITA_GEN_FONT_CACHE"
+IMAGE_CACHE_ENV = "VITA_GEN_IMAGE_CACHE"
+
+
+def _use_caches(font_cache: str, image_cache: str) -> None:
+    # Worker processes inherit the environment
+    if font_cache:
+        os.environ[FONT_CACHE_ENV] = font_cache
+    if image_cache:
+        os.environ[IMAGE_CACHE_ENV] = image_cache
+
+
+def _selection(recursive: bool, include: List[str], exclude: List[str], shard: str):
+    from .jobs import ConfigSelection, parse_shard
+
+    try:
+        shard_index = parse_shard(shard) if shard else None
+    except ValueError as e:
+        raise typer.BadParameter(str(e), param_hint="--shard")
+    return ConfigSelection(
+        recursive, tuple(include or ()), tuple(exclude or ()), shard_index
+    )
+
+
+def _output_options(
+    pdf_profile: str,
+    max_kb: float,
+    reproducible: bool,
+    creation_date: str,
+    image_dpi: int,
+    image_quality: int,
+    fit_pages: str,
+    formats: str,
+):
+    from .output_options import (
+        OutputOptions,
+        parse_date,
+        parse_fit_pages,
+        parse_formats,
+        reproducible_date,
+    )
+
+    try:
+        fit = parse_fit_pages(fit_pages) if fit_pages else ()
+    except ValueError as e:
+        raise typer.BadParameter(str(e), param_hint="--fit-pages")
+    try:
+        names = parse_formats(formats)
+    except ValueError as e:
+        raise typer.BadParameter(str(e), param_hint="--format")
+
+    date = None
+    if creation_date:
+        try:
+            date = parse_date(creation_date)
+        except ValueError as e:
+            raise typer.BadParameter(str(e), param_hint="--creation-date")
+    elif reproducible:
+        date = reproducible_date()
+    try:
+        return OutputOptions(
+            pdf_profile, date, max_kb, image_quality, image_dpi, fit, names
+        )
+    except ValueError as e:
+        raise typer.BadParameter(str(e))
+
+
+def _limits(timeout: float, max_memory: int, trace_memory: bool):
+    from .isolation import JobLimits
+
+    if timeout is not None and timeout <= 0:
+        raise typer.BadParameter("must be positive", param_hint="--timeout")
+    if max_memory is not None and max_memory <= 0:
+        raise typer.BadParameter("must be positive", param_hint="--max-memory")
+    return JobLimits(timeout, max_memory, trace_memory)
+
 
 @app.command()
 def generate(
-    output: str = "data/cv.pdf",
+    output: str = typer.Option(
+        "data/cv.pdf", help="Output PDF path or directory, or - to write to stdout"
+    ),
     config: str = typer.Option(
-        "data", help="Path to the YAML configuration file or directory"
+        "data",
+        help="Path to the YAML or JSON configuration file or directory, "
+        "or - to read it from stdin",
+    ),
+    recursive: bool = typer.Option(
+        False, "--recursive", "-r", help="Also render configs in subfolders of --config"
+    ),
+    include: List[str] = typer.Option(
+        None,
+        help="Only render configs whose path below --config matches this glob "
+        "(repeatable)",
+    ),
+    exclude: List[str] = typer.Option(
+        None, help="Skip configs and folders matching this glob (repeatable)"
+    ),
+    shard: str = typer.Option(
+        None,
+        help="Render only shard I/N of the configs, e.g. 2/4, to split one config "
+        "tree over N machines",
     ),
     image: str = typer.Option(None, help="Path to an override profile image"),
     image_width: float = typer.Option(None, help="Width of the profile image in mm"),
@@ -19,99 +119,641 @@ def generate(
         None, help="Width of the signature image in mm"
     ),
     type: str = typer.Option(
-        "both", help="Type of document to generate: cv, cover_letter, or both"
+        "both",
+        help="Type of document to generate: cv, cover_letter, both, "
+        "or application (cover letter and CV in one PDF)",
+    ),
+    locale: List[str] = typer.Option(
+        None,
+        help="Render only this locale of configs that declare several "
+        "(repeatable; default: all of them)",
+    ),
+    force: bool = typer.Option(
+        False, "--force", help="Re-render documents even if their inputs are unchanged"
+    ),
+    watch: bool = typer.Option(
+        False,
+        "--watch",
+        help="Keep running and re-render documents whenever a config or image changes",
+    ),
+    jobs: int = typer.Option(
+        1,
+        "--jobs",
+        "-j",
+        help="Number of worker processes used for rendering (0 uses all CPUs)",
+    ),
+    archive: str = typer.Option(
+        None,
+        help="Write all documents into this .zip or .tar[.gz|.bz2|.xz] file "
+        "instead of separate PDFs",
+    ),
+    combined: str = typer.Option(
+        None, help="Write all documents into this single PDF, bookmarked by candidate"
+    ),
+    config_cache: str = typer.Option(
+        None,
+        envvar="VITA_GEN_CONFIG_CACHE",
+        help="Directory in which validated configs are cached by content hash",
+    ),
+    font_cache: str = typer.Option(
+        None,
+        envvar=FONT_CACHE_ENV,
+        help="Directory in which font subsets are cached by the glyphs they contain",
+    ),
+    image_cache: str = typer.Option(
+        None,
+        envvar=IMAGE_CACHE_ENV,
+        help="Directory in which prepared images are cached by their content",
+    ),
+    pdf_profile: str = typer.Option(
+        "balanced",
+        help="Compression of the PDFs: fast (least CPU), balanced, or small "
+        "(maximum deflate, photos re-encoded as JPEG at 300 dpi)",
+    ),
+    max_kb: float = typer.Option(
+        None,
+        help="Re-encode images at lower quality until every PDF is at most this "
+        "many KB",
+    ),
+    image_dpi: int = typer.Option(
+        None,
+        help="Scale images down to this resolution at their printed size",
+    ),
+    image_quality: int = typer.Option(
+        None,
+        help="Re-encode opaque images as JPEG at this quality (1-95) where that "
+        "is smaller",
+    ),
+    fit_pages: str = typer.Option(
+        None,
+        help="Scale text and spacing until every document has this many pages, "
+        "e.g. 2, or cv=2,cover_letter=1",
+    ),
+    format: str = typer.Option(
+        "pdf",
+        help="Files written for every document: pdf, txt (the text in reading "
+        "order) and/or json (the page and position of every block), e.g. pdf,txt",
+    ),
+    reproducible: bool = typer.Option(
+        False,
+        "--reproducible",
+        help="Write a fixed creation date (SOURCE_DATE_EPOCH or 2000-01-01), so "
+        "identical inputs give byte-identical files",
+    ),
+    creation_date: str = typer.Option(
+        None,
+        help="ISO 8601 creation date written into every PDF; implies --reproducible",
+    ),
+    timeout: float = typer.Option(
+        None,
+        help="Fail a document that takes longer than this many seconds to render; "
+        "documents render in worker processes, so the others carry on",
+    ),
+    max_memory: int = typer.Option(
+        None,
+        help="Limit every worker process to this many MB, so a document that "
+        "needs more fails on its own",
+    ),
+    trace_memory: bool = typer.Option(
+        False,
+        "--trace-memory",
+        help="Record the peak of Python allocations of every document "
+        "(slows rendering down)",
+    ),
+    profile: str = typer.Option(
+        None,
+        help="Time every stage of every document and write a summary "
+        "(profile.json) and a Chrome trace (trace.json) to this directory",
+    ),
+    dry_run_layout: bool = typer.Option(
+        False,
+        "--dry-run-layout",
+        help="Only lay out the documents and print their page counts, page breaks "
+        "and overflowing blocks; no PDFs are written",
     ),
 ):
     """
     Generate a CV PDF and/or Cover Letter.
     """
-    configs = []
-    if os.path.isdir(config):
-        # Find all yaml files in the directory
-        for f in os.listdir(config):
-            if f.endswith(".yaml") or f.endswith(".yml"):
-                configs.append(os.path.join(config, f))
-    else:
-        configs.append(config)
-
-    for config_path in configs:
-        print(f"Loading data from {config_path}...")
+    from .profiling import profile_to
+
+    _use_caches(font_cache, image_cache)
+    output_options = _output_options(
+        pdf_profile,
+        max_kb,
+        reproducible,
+        creation_date,
+        image_dpi,
+        image_quality,
+        fit_pages,
+        format,
+    )
+    limits = _limits(timeout, max_memory, trace_memory)
+    selection = _selection(recursive, include, exclude, shard)
+    if dry_run_layout:
+        _dry_run_layout(
+            config,
+            selection,
+            image,
+            image_width,
+            signature,
+            signature_width,
+            type,
+            config_cache,
+            locale,
+            output_options,
+        )
+        return
+    with profile_to(profile):
+        _generate(
+            output,
+            config,
+            selection,
+            image,
+            image_width,
+            signature,
+            signature_width,
+            type,
+            force,
+            watch,
+            jobs,
+            archive,
+            combined,
+            config_cache,
+            output_options,
+            locale,
+            limits,
+        )
+
+
+def _generate(
+    output: str,
+    config: str,
+    selection,
+    image: str,
+    image_width: float,
+    signature: str,
+    signature_width: float,
+    type: str,
+    force: bool,
+    watch: bool,
+    jobs: int,
+    archive: str,
+    combined: str,
+    config_cache: str,
+    output_options,
+    locales: List[str],
+    limits,
+):
+    from .content import STDIN
+    from .jobs import STDOUT, Overrides, RenderJob, build, iter_configs, run_job
+
+    overrides = Overrides(
+        image=image,
+        image_width=image_width,
+        signature=signature,
+        signature_width=signature_width,
+    )
+    if jobs <= 0:
+        jobs = os.cpu_count() or 1
+
+    # Configs are discovered while the first ones render
+    configs = iter_configs(config, selection)
+    multiple = os.path.isdir(config)
+    config_root = config if multiple else None
+
+    if limits.isolated and (config == STDIN or output == STDOUT):
+        # Both streams belong to this process, not to the workers
+        raise typer.BadParameter(
+            "--timeout, --max-memory and --trace-memory need files for --config "
+            "and --output"
+        )
+    if config == STDIN:
+        if watch:
+            raise typer.BadParameter("cannot watch stdin", param_hint="--config")
+        # Only this process can read stdin
+        jobs = 1
+
+    if output_options.formats != ("pdf",) and (output == STDOUT or archive or combined):
+        raise typer.BadParameter(
+            "only pdf can be written to stdout, --archive or --combined",
+            param_hint="--format",
+        )
+    if output == STDOUT:
+        if type == "both" or multiple or watch or len(locales or ()) > 1:
+            raise typer.BadParameter(
+                "writing to stdout needs a single config file, "
+                "--type cv or --type cover_letter and at most one --locale",
+                param_hint="--output",
+            )
+        # Keep stdout clean for the PDF
+        result = run_job(
+            RenderJob(
+                config,
+                type,
+                STDOUT,
+                overrides,
+                config_cache=config_cache,
+                output_options=output_options,
+                locale=locales[0] if locales else None,
+            ),
+            log=lambda message: print(message, file=sys.stderr),
+        )
+        if not result.written:
+            raise typer.Exit(1)
+        return
+
+    if archive or combined:
+        if archive and combined:
+            raise typer.BadParameter("use either --archive or --combined")
+        if watch:
+            raise typer.BadParameter("cannot be combined with --watch")
+        from .bundle import ArchiveSink, CombinedPdfSink
+
+        if combined:
+            sink = CombinedPdfSink(combined)
+        else:
+            sink = ArchiveSink(archive, output_options.creation_date)
         try:
-            cv_object = load_cv_data(config_path)
+            report = build(
+                configs,
+                output,
+                type,
+                overrides,
+                multiple,
+                jobs,
+                sink=sink,
+                config_cache=config_cache,
+                output_options=output_options,
+                config_root=config_root,
+                locales=locales,
+                limits=limits,
+            )
+        finally:
+            sink.close()
+        report.print_summary(always=jobs > 1 or limits.isolated)
+        written = sum(result.written for result in report.results)
+        print(f"Wrote {written} documents to {sink.path}")
+        if report.failed:
+            raise typer.Exit(1)
+        return
+
+    if watch:
+        from .watch import watch_configs
+
+        def rebuild(changed):
+            return build(
+                changed,
+                output,
+                type,
+                overrides,
+                multiple,
+                force=force,
+                config_cache=config_cache,
+                output_options=output_options,
+                config_root=config_root,
+                shard=selection.shard,
+                locales=locales,
+                limits=limits,
+            )
+
+        watch_configs(config, rebuild, selection=selection)
+        return
+
+    report = build(
+        configs,
+        output,
+        type,
+        overrides,
+        multiple,
+        jobs,
+        force,
+        config_cache=config_cache,
+        output_options=output_options,
+        config_root=config_root,
+        shard=selection.shard,
+        locales=locales,
+        limits=limits,
+    )
+    report.print_summary(always=jobs > 1 or limits.isolated)
+    if report.failed:
+        raise typer.Exit(1)
+
+
+def _dry_run_layout(
+    config: str,
+    selection,
+    image: str,
+    image_width: float,
+    signature: str,
+    signature_width: float,
+    type: str,
+    config_cache: str,
+    locales: List[str],
+    output_options,
+):
+    import time
+    from .jobs import Overrides, iter_configs
+    from .layout_check import check_layouts
+
+    overrides = Overrides(
+        image=image,
+        image_width=image_width,
+        signature=signature,
+        signature_width=signature_width,
+    )
+    start = time.perf_counter()
+    try:
+        report = check_layouts(
+            iter_configs(config, selection),
+            type,
+            overrides,
+            config_cache,
+            locales,
+            output_options,
+        )
+    except ValueError as e:
+        raise typer.BadParameter(str(e), param_hint="--type")
+    elapsed = (time.perf_counter() - start) * 1000
+    print(
+        f"Laid out {report.documents} document(s) of {report.configs} config(s) in "
+        f"{elapsed:.0f} ms, {report.overflowing} with overflowing blocks, "
+        f"{report.failed} failed"
+    )
+    if report.failed or report.overflowing:
+        raise typer.Exit(1)
+
+
+@app.command()
+def validate(
+    config: str = typer.Option(
+        "data",
+        help="Path to the YAML or JSON configuration file or directory, "
+        "or - to read it from stdin",
+    ),
+    recursive: bool = typer.Option(
+        False, "--recursive", "-r", help="Also check configs in subfolders of --config"
+    ),
+    include: List[str] = typer.Option(
+        None,
+        help="Only check configs whose path below --config matches this glob "
+        "(repeatable)",
+    ),
+    exclude: List[str] = typer.Option(
+        None, help="Skip configs and folders matching this glob (repeatable)"
+    ),
+):
+    """
+    Check configs against the CV model without rendering anything.
+    """
+    import time
+    from pydantic import ValidationError
+    from .content import load_cv_data
+    from .jobs import check_assets, iter_configs
+
+    start = time.perf_counter()
+    invalid = 0
+    count = 0
+    selection = _selection(recursive, include, exclude, None)
+    for config_path in iter_configs(config, selection):
+        count += 1
+        config_start = time.perf_counter()
+        try:
+            cv = load_cv_data(config_path)
+        except ValidationError as e:
+            invalid += 1
+            print(f"Invalid {config_path}:")
+            for error in e.errors():
+                field = ".".join(str(part) for part in error["loc"])
+                print(f"  {field}: {error['msg']}")
+            continue
         except Exception as e:
-            print(f"Error loading config {config_path}: {e}")
+            invalid += 1
+            print(f"Invalid {config_path}: {e}")
             continue
+        elapsed = (time.perf_counter() - config_start) * 1000
+        print(f"OK {config_path} ({elapsed:.1f} ms)")
+        check_assets(cv, print)
 
-        # Override image if provided via CLI
-        if image:
-            cv_object.person.image_path = image
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"Validated {count} config(s) in {elapsed:.0f} ms, {invalid} invalid")
+    if invalid:
+        raise typer.Exit(1)
 
-        if image_width:
-            cv_object.person.image_width = image_width
 
-        # Override signature if provided via CLI
-        if signature:
-            cv_object.person.signature_path = signature
+@app.command()
+def batch(
+    jobs_file: str = typer.Argument(
+        ..., help="JSONL file with one job record per line, see the README"
+    ),
+    results: str = typer.Option(
+        None, help="Append JSONL status lines to this file instead of stdout"
+    ),
+    journal: str = typer.Option(
+        None,
+        help="Completion journal used to resume an interrupted run "
+        "(default: JOBS_FILE.done)",
+    ),
+    jobs: int = typer.Option(
+        1,
+        "--jobs",
+        "-j",
+        help="Number of worker processes used for rendering (0 uses all CPUs)",
+    ),
+    verbose: bool = typer.Option(
+        False, "--verbose", help="Print progress messages to stderr"
+    ),
+    pdf_profile: str = typer.Option(
+        "balanced",
+        help="Compression of the PDFs: fast (least CPU), balanced, or small "
+        "(maximum deflate, photos re-encoded as JPEG at 300 dpi)",
+    ),
+    max_kb: float = typer.Option(
+        None,
+        help="Re-encode images at lower quality until every PDF is at most this "
+        "many KB",
+    ),
+    image_dpi: int = typer.Option(
+        None,
+        help="Scale images down to this resolution at their printed size",
+    ),
+    image_quality: int = typer.Option(
+        None,
+        help="Re-encode opaque images as JPEG at this quality (1-95) where that "
+        "is smaller",
+    ),
+    fit_pages: str = typer.Option(
+        None,
+        help="Scale text and spacing until every document has this many pages, "
+        "e.g. 2, or cv=2,cover_letter=1",
+    ),
+    format: str = typer.Option(
+        "pdf",
+        help="Files written for every document: pdf, txt (the text in reading "
+        "order) and/or json (the page and position of every block), e.g. pdf,txt",
+    ),
+    reproducible: bool = typer.Option(
+        False,
+        "--reproducible",
+        help="Write a fixed creation date (SOURCE_DATE_EPOCH or 2000-01-01), so "
+        "identical inputs give byte-identical files",
+    ),
+    creation_date: str = typer.Option(
+        None,
+        help="ISO 8601 creation date written into every PDF; implies --reproducible",
+    ),
+    timeout: float = typer.Option(
+        None,
+        help="Fail a document that takes longer than this many seconds to render; "
+        "documents render in worker processes, so the others carry on",
+    ),
+    max_memory: int = typer.Option(
+        None,
+        help="Limit every worker process to this many MB, so a document that "
+        "needs more fails on its own",
+    ),
+    trace_memory: bool = typer.Option(
+        False,
+        "--trace-memory",
+        help="Record the peak of Python allocations of every document "
+        "(slows rendering down)",
+    ),
+    config_cache: str = typer.Option(
+        None,
+        envvar="VITA_GEN_CONFIG_CACHE",
+        help="Directory in which validated configs are cached by content hash",
+    ),
+    font_cache: str = typer.Option(
+        None,
+        envvar=FONT_CACHE_ENV,
+        help="Directory in which font subsets are cached by the glyphs they contain",
+    ),
+    image_cache: str = typer.Option(
+        None,
+        envvar=IMAGE_CACHE_ENV,
+        help="Directory in which prepared images are cached by their content",
+    ),
+):
+    """
+    Render a stream of job records and report one status line per document.
 
-        if signature_width:
-            cv_object.person.signature_width = signature_width
+    Records that completed are listed in the journal and skipped when the
+    same command runs again, so a crashed run can simply be restarted.
+    """
+    from .batch import run_batch
 
-        # Check if assets exist
-        if cv_object.person.image_path and not os.path.exists(
-            cv_object.person.image_path
-        ):
-            print(f"Warning: Image file not found at {cv_object.person.image_path}")
+    _use_caches(font_cache, image_cache)
+    output_options = _output_options(
+        pdf_profile,
+        max_kb,
+        reproducible,
+        creation_date,
+        image_dpi,
+        image_quality,
+        fit_pages,
+        format,
+    )
+    limits = _limits(timeout, max_memory, trace_memory)
+    if jobs <= 0:
+        jobs = os.cpu_count() or 1
 
-        if cv_object.person.signature_path and not os.path.exists(
-            cv_object.person.signature_path
-        ):
-            print(
-                f"Warning: Signature file not found at {cv_object.person.signature_path}"
-            )
+    def log(message: str) -> None:
+        if verbose:
+            print(message, file=sys.stderr)
+
+    out = open(results, "a", encoding="utf-8") if results else sys.stdout
+    try:
+        report = run_batch(
+            jobs_file,
+            out,
+            journal or f"{jobs_file}.done",
+            jobs,
+            config_cache,
+            log,
+            output_options,
+            limits,
+        )
+    finally:
+        if results:
+            out.close()
+    print(
+        f"Finished {report.documents} documents in {report.elapsed:.2f}s with "
+        f"{jobs} worker(s), {report.failed} failed, {report.invalid} invalid records, "
+        f"{report.resumed} records already done",
+        file=sys.stderr,
+    )
+    for failure in report.failures:
+        print(f"  {failure}", file=sys.stderr)
+    if report.failed > len(report.failures):
+        print(f"  ... and {report.failed - len(report.failures)} more", file=sys.stderr)
+    if report.failed or report.invalid:
+        raise typer.Exit(1)
+
+
+@app.command()
+def merge_manifests(
+    output: str = typer.Argument(
+        ..., help="Output directory that the shards of a build wrote to"
+    ),
+):
+    """
+    Merge the build manifests written by `generate --shard` into one.
+
+    Run it once all shards have finished; afterwards incremental builds see
+    the documents of every shard, whether they are sharded or not.
+    """
+    from .manifest import merge_manifests as merge
+
+    merged = merge(output)
+    for path in merged:
+        print(f"Merged shard manifests into {path}")
+    if not merged:
+        print(f"No shard manifests found below {output}")
+
+
+@app.command()
+def serve(
+    host: str = typer.Option("127.0.0.1", help="Interface to bind the HTTP server to"),
+    port: int = typer.Option(8000, help="Port to listen on"),
+    socket: str = typer.Option(
+        None, help="Serve on this unix socket path instead of a TCP port"
+    ),
+    workers: int = typer.Option(
+        0, help="Number of pre-warmed render worker processes (0 uses all CPUs)"
+    ),
+    queue_size: int = typer.Option(
+        32, help="Number of requests that may wait for a worker before 429 is returned"
+    ),
+    font_cache: str = typer.Option(
+        None,
+        envvar=FONT_CACHE_ENV,
+        help="Directory in which font subsets are cached by the glyphs they contain",
+    ),
+    image_cache: str = typer.Option(
+        None,
+        envvar=IMAGE_CACHE_ENV,
+        help="Directory in which prepared images are cached by their content",
+    ),
+):
+    """
+    Run a local render service that turns CV JSON into PDF bytes.
+
+    POST a CV as JSON to /render/cv or /render/cover_letter.
+    """
+    from .server import serve as run_server
 
-        # Determine output base
-        current_output = output
-        if len(configs) > 1 or os.path.isdir(config):
-            out_dir = os.path.dirname(output) if output.endswith(".pdf") else output
-            if not out_dir:
-                out_dir = "."
-
-            base_name = os.path.splitext(os.path.basename(config_path))[0]
-            current_output = os.path.join(out_dir, f"{base_name}.pdf")
-
-        # If explicit output file defined and single config, we might need to adjust logic
-        # But for simplicity, let's strictly follow convention if type!=cv
-
-        out_dir = os.path.dirname(current_output)
-        base_filename = os.path.basename(current_output)
-        if base_filename.startswith("cv_"):
-            base_filename = base_filename[3:]
-        if base_filename.endswith(".pdf"):
-            base_filename = base_filename[:-4]
-
-        # Generate CV
-        if type in ["cv", "both"]:
-            cv_output = os.path.join(out_dir, f"cv_{base_filename}.pdf")
-            print(f"Rendering CV to {cv_output}...")
-            renderer = CVRenderer(cv_object)
-            renderer.render(cv_output)
-            print(f"Successfully generated CV at {cv_output}")
-
-        # Generate Cover Letter
-        if type in ["cover_letter", "both"]:
-            if cv_object.cover_letter:
-                from .cover_letter_renderer import CoverLetterRenderer
-
-                cl_output = os.path.join(out_dir, f"cl_{base_filename}.pdf")
-                print(f"Rendering Cover Letter to {cl_output}...")
-                renderer = CoverLetterRenderer(cv_object)
-                renderer.render(cl_output)
-                print(f"Successfully generated Cover Letter at {cl_output}")
-            elif type == "cover_letter":
-                print(f"No cover letter data found in {config_path}")
+    _use_caches(font_cache, image_cache)
+    run_server(host, port, socket, workers or os.cpu_count() or 1, queue_size)
 
 
 def main():
+    # Keep `vita-gen --config ...` working by defaulting to the generate command
+    args = sys.argv[1:]
+    if not args or (
+        args[0].startswith("-")
+        and args[0] not in ("--help", "--install-completion", "--show-completion")
+    ):
+        sys.argv.insert(1, "generate")
     app()
 
 
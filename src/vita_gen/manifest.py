@@ -0,0 +1,192 @@
+from typing import Optional
+import hashlib
+import json
+import os
+import threading
+
+from .font_files import FONT_DIR, ROBOTO_STYLES
+from .locales import letter_date
+from .models import CV
+from .output_options import OutputOptions
+
+# Bump whenever a change to the renderers alters the PDFs they produce
+RENDERER_VERSION = 3
+
+MANIFEST_NAME = ".vita-gen-manifest.json"
+# Manifests written by one shard of a sharded build, see merge_manifests
+_SHARD_PREFIX = ".vita-gen-manifest.shard-"
+
+# The parts of the CV model each document type is rendered from
+DOCUMENT_FIELDS = {
+    "cv": {
+        "section_titles",
+        "labels",
+        "person",
+        "experiences",
+        "education",
+        "skills",
+        "languages",
+    },
+    "cover_letter": {
+        "person",
+        "cover_letter",
+        "languages",
+        "closing",
+        "date_format",
+        "month_names",
+    },
+}
+DOCUMENT_FIELDS["application"] = DOCUMENT_FIELDS["cv"] | {"cover_letter"}
+
+_file_digests: dict[str, tuple[tuple[int, int], str]] = {}
+_lock = threading.Lock()
+
+
+def file_digest(path: Optional[str]) -> Optional[str]:
+    """Return the SHA-256 of a file, cached per process by mtime and size."""
+    if not path or not os.path.exists(path):
+        return None
+
+    stat = os.stat(path)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    key = os.path.abspath(path)
+    with _lock:
+        cached = _file_digests.get(key)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    digest = h.hexdigest()
+    with _lock:
+        _file_digests[key] = (stamp, digest)
+    return digest
+
+
+def document_digest(
+    cv: CV, doc_type: str, options: Optional[OutputOptions] = None
+) -> str:
+    """
+    Hash everything a rendered document depends on.
+
+    CLI overrides are covered because they are applied to the model before it
+    is hashed. Referenced images and the bundled fonts are hashed by content.
+    """
+    payload = {
+        "renderer_version": RENDERER_VERSION,
+        "doc_type": doc_type,
+        "data": cv.model_dump(mode="json", include=DOCUMENT_FIELDS[doc_type]),
+        "image": file_digest(cv.person.image_path),
+        "signature": file_digest(cv.person.signature_path),
+        "fonts": sorted(
+            file_digest(os.path.join(FONT_DIR, fname))
+            for fname in set(ROBOTO_STYLES.values())
+        ),
+    }
+    options = options or OutputOptions()
+    if options != OutputOptions():
+        payload["output"] = options.digest_payload()
+    if doc_type != "cv" and cv.cover_letter and not cv.person.signature_date:
+        # The letter falls back to its creation date
+        payload["date"] = letter_date(cv, options.creation_date)
+
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def shard_manifest_name(shard: tuple[int, int]) -> str:
+    return f"{_SHARD_PREFIX}{shard[0]}-of-{shard[1]}.json"
+
+
+def _read_documents(path: str) -> dict[str, str]:
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        # A broken manifest only means everything is rebuilt
+        return {}
+    if data.get("renderer_version") != RENDERER_VERSION:
+        return {}
+    return data.get("documents", {})
+
+
+class Manifest:
+    """
+    Content hashes of the documents rendered into one output directory.
+
+    A shard of a sharded build records its documents in a manifest of its
+    own, so that machines sharing the directory never write the same file.
+    It still skips documents listed in the merged manifest.
+    """
+
+    def __init__(self, directory: str, shard: Optional[tuple[int, int]] = None):
+        self.directory = directory or "."
+        merged_path = os.path.join(self.directory, MANIFEST_NAME)
+        if shard is None:
+            self.path = merged_path
+            self.merged: dict[str, str] = {}
+        else:
+            self.path = os.path.join(self.directory, shard_manifest_name(shard))
+            self.merged = _read_documents(merged_path)
+        self.documents = _read_documents(self.path)
+        self.dirty = False
+
+    def _key(self, output_path: str) -> str:
+        return os.path.relpath(output_path, self.directory)
+
+    def get(self, output_path: str) -> Optional[str]:
+        key = self._key(output_path)
+        return self.documents.get(key) or self.merged.get(key)
+
+    def set(self, output_path: str, digest: Optional[str]) -> None:
+        key = self._key(output_path)
+        if digest is None:
+            if self.documents.pop(key, None) is not None:
+                self.dirty = True
+        elif self.documents.get(key) != digest:
+            self.documents[key] = digest
+            self.dirty = True
+
+    def save(self) -> None:
+        if not self.dirty or not os.path.isdir(self.directory):
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"renderer_version": RENDERER_VERSION, "documents": self.documents},
+                f,
+                indent=2,
+                sort_keys=True,
+            )
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+
+def merge_manifests(directory: str) -> list[str]:
+    """
+    Merge the shard manifests below `directory` into one manifest per folder.
+
+    Returns the merged manifests. The shard manifests are removed, so the
+    next build, sharded or not, starts from the merged state.
+    """
+    merged = []
+    for folder, dirs, files in os.walk(directory):
+        dirs.sort()
+        shards = sorted(
+            f for f in files if f.startswith(_SHARD_PREFIX) and f.endswith(".json")
+        )
+        if not shards:
+            continue
+        manifest = Manifest(folder)
+        for name in shards:
+            manifest.documents.update(_read_documents(os.path.join(folder, name)))
+        manifest.dirty = True
+        manifest.save()
+        for name in shards:
+            os.remove(os.path.join(folder, name))
+        merged.append(manifest.path)
+    return merged
@@ -0,0 +1,295 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from fpdf import FPDF, FPDF_VERSION
+from fpdf.enums import Align, MethodReturnValue, XPos, YPos
+from fpdf.fonts import TTFFont
+import re
+import threading
+from typing import List, Optional
+
+from .profiling import traced
+
+try:
+    from fpdf.line_break import (
+        BREAKING_SPACE_SYMBOLS_STR,
+        FORM_FEED,
+        NBSP,
+        SOFT_HYPHEN,
+        TextLine,
+    )
+except ImportError:  # pragma: no cover - depends on the fpdf2 release
+    TextLine = None
+    BREAKING_SPACE_SYMBOLS_STR, FORM_FEED, NBSP, SOFT_HYPHEN = " ", "\f", "\xa0", "\xad"
+
+# _break_lines and draw_line redo what multi_cell does with fpdf2 internals,
+# which tests/test_measure.py checks against the 2.8 series. Other releases
+# break lines with multi_cell and justify them with cell(), word by word.
+_INTERNALS = (
+    TextLine is not None
+    and FPDF_VERSION.startswith("2.8.")
+    and hasattr(FPDF, "_render_styled_text_line")
+)
+
+# Wrapped text is memoized per process. Font metrics are identical for every
+# document, so a bullet or skill list that repeats across a batch is only
+# line-broken once.
+_WRAP_CACHE_SIZE = 8192
+_wrapped: "OrderedDict[tuple, WrappedText]" = OrderedDict()
+_lock = threading.Lock()
+
+# Widths of words in font units per font file, shared by all font sizes and
+# documents
+_ADVANCE_CACHE_SIZE = 65536
+_advances: dict[str, dict[str, int]] = {}
+# Characters multi_cell treats on their own, and the words between them
+_SEPARATORS = "\n" + NBSP + BREAKING_SPACE_SYMBOLS_STR
+_WORD = re.compile(f"[^{re.escape(_SEPARATORS)}]+")
+
+
+@dataclass(frozen=True)
+class WrappedText:
+    lines: tuple[str, ...]
+    # "J" for lines broken automatically, "L" for the last line of a paragraph
+    aligns: tuple[str, ...]
+    trailing_newline: bool = False
+
+    def height(self, line_height: float) -> float:
+        return (len(self.lines) + self.trailing_newline) * line_height
+
+
+def _line_aligns(text: str, lines: list[str]) -> tuple[str, ...]:
+    # multi_cell justifies every line except those ending a paragraph
+    aligns = []
+    position = 0
+    for index, line in enumerate(lines):
+        position += len(line)
+        if index == len(lines) - 1 or text[position : position + 1] == "\n":
+            aligns.append("L")
+        else:
+            aligns.append("J")
+        if text[position : position + 1] in ("\n", " "):
+            position += 1
+    return tuple(aligns)
+
+
+def _pick_glyphs(pdf: FPDF, wrapped: WrappedText) -> None:
+    # The dry run of multi_cell encodes every line, which numbers the glyphs
+    # of the font subset in order of first use. A cached result must do the
+    # same, or the codes in a document would depend on what the process
+    # rendered before.
+    subset = getattr(pdf.current_font, "subset", None)
+    if subset is None:
+        return
+    # Picking a character again changes nothing, so each is picked once
+    for char in dict.fromkeys("".join(wrapped.lines)):
+        subset.pick(ord(char))
+
+
+def _word_advances(font: TTFFont) -> dict[str, int]:
+    advances = _advances.get(str(font.ttffile))
+    if advances is None or len(advances) >= _ADVANCE_CACHE_SIZE:
+        advances = _advances[str(font.ttffile)] = {}
+    return advances
+
+
+def _break_lines(pdf: FPDF, text: str, width: float) -> Optional[List[str]]:
+    # The lines multi_cell would break plain text into, without building its
+    # fragments: multi_cell sums the widths of the whole line again for every
+    # character, which makes page fitting and dry runs slow. Widths are added
+    # up in font units and converted to document units like fpdf2 does, so
+    # the lines are the same. A word that clearly fits or clearly overflows
+    # the line is handled at once, one close to the edge character by
+    # character, as multi_cell does.
+    # Anything else, e.g. soft hyphens or a character wider than the cell,
+    # returns None and is left to multi_cell. These are fpdf2 internals:
+    # tests/test_measure.py checks the lines against multi_cell.
+    font = pdf.current_font
+    if (
+        not isinstance(font, TTFFont)
+        or font.is_symbol
+        or pdf.text_shaping
+        or pdf._fallback_font_ids
+        or pdf.char_spacing
+        or pdf.font_stretching != 100
+        or (pdf.str_alias_nb_pages and pdf.str_alias_nb_pages in text)
+        or SOFT_HYPHEN in text
+        or FORM_FEED in text
+    ):
+        return None
+
+    widths = font.cw
+    advances = _word_advances(font)
+    size, k = pdf.font_size_pt, pdf.k
+    if text and size > font.biggest_size_pt:
+        font.biggest_size_pt = size
+    max_width = width - pdf.c_margin - pdf.c_margin
+    lines: List[str] = []
+    line: List[str] = []
+    units = 0
+    # Position in `line` and in `text` of the last breaking space
+    space = None
+    forced = None
+    # End of a word that is measured character by character
+    slow_until = 0
+    index = 0
+    while index < len(text):
+        char = text[index]
+        if index >= slow_until and char not in _SEPARATORS:
+            end = _WORD.match(text, index).end()
+            word = text[index:end]
+            advance = advances.get(word)
+            if advance is None:
+                advance = advances[word] = sum(widths[ord(c)] for c in word)
+            # Far enough from the edge for rounding not to matter, the word
+            # either fits or one of its characters overflows the line
+            line_width = (units + advance) * size * 0.001 / k
+            if line_width < max_width - 1e-6:
+                line.append(word)
+                units += advance
+                index = end
+                continue
+            if line_width > max_width + 1e-6 and space is not None:
+                lines.append("".join(line[: space[0]]))
+                index = space[1] + 1
+                line, units, space, forced = [], 0, None, None
+                continue
+            slow_until = end
+
+        if char == "\n":
+            lines.append("".join(line))
+            line, units, space, forced = [], 0, None, None
+            index += 1
+            continue
+        char_units = widths[ord(char)]
+        line_width = units * size * 0.001 / k
+        if line_width + char_units * size * 0.001 / k - max_width > 1e-9:
+            if char in BREAKING_SPACE_SYMBOLS_STR:
+                lines.append("".join(line))
+                index += 1
+            elif space is not None:
+                lines.append("".join(line[: space[0]]))
+                index = space[1] + 1
+                slow_until = 0
+            else:
+                # multi_cell fails on a character that fits on no line
+                if forced == index:
+                    return None
+                lines.append("".join(line))
+                line, units, space, forced = [], 0, None, index
+                slow_until = 0
+                continue
+            line, units, space, forced = [], 0, None, None
+            continue
+        if char in BREAKING_SPACE_SYMBOLS_STR:
+            space = (len(line), index)
+        elif char == NBSP:
+            # Drawn and measured as a space, but not broken at
+            char = " "
+            char_units = widths[ord(char)]
+        line.append(char)
+        units += char_units
+        index += 1
+    if units:
+        lines.append("".join(line))
+    return lines or [""]
+
+
+@traced
+def wrap(pdf: FPDF, text: str, width: float) -> WrappedText:
+    """Break text into lines for the current font of `pdf` and a cell width."""
+    key = (pdf.font_family, pdf.font_style, pdf.font_size_pt, round(width, 4), text)
+    with _lock:
+        wrapped = _wrapped.get(key)
+        if wrapped is not None:
+            _wrapped.move_to_end(key)
+    if wrapped is not None:
+        _pick_glyphs(pdf, wrapped)
+        return wrapped
+
+    normalized = pdf.normalize_text(text).replace("\r", "")
+    broken = _break_lines(pdf, normalized, width) if _INTERNALS else None
+    if broken is None:
+        lines = pdf.multi_cell(
+            width, 5, text, dry_run=True, output=MethodReturnValue.LINES
+        )
+    else:
+        lines = broken
+    wrapped = WrappedText(
+        tuple(lines), _line_aligns(normalized, lines), normalized.endswith("\n")
+    )
+    if broken is not None:
+        _pick_glyphs(pdf, wrapped)
+
+    with _lock:
+        _wrapped[key] = wrapped
+        if len(_wrapped) > _WRAP_CACHE_SIZE:
+            _wrapped.popitem(last=False)
+    return wrapped
+
+
+def _draw_justified(
+    pdf: FPDF, line: str, width: float, line_height: float, new_x: XPos
+) -> None:
+    # Public API only: each word is a cell of its own, placed so the spaces
+    # between them take up the slack of the line
+    words = line.split(" ")
+    if len(words) == 1:
+        pdf.cell(width, line_height, line, new_x=new_x, new_y=YPos.NEXT)
+        return
+    left, y = pdf.x, pdf.y
+    slack = width - 2 * pdf.c_margin - pdf.get_string_width(line)
+    space = pdf.get_string_width(" ") + slack / (len(words) - 1)
+    x = left
+    for word in words:
+        pdf.set_xy(x, y)
+        pdf.cell(h=line_height, text=word)
+        x += pdf.get_string_width(word) + space
+    # Leave the position where multi_cell would
+    pdf.set_xy(left, y)
+    pdf.cell(width, line_height, "", new_x=new_x, new_y=YPos.NEXT)
+
+
+def draw_line(
+    pdf: FPDF, wrapped: WrappedText, index: int, width: float, line_height: float
+) -> None:
+    """Draw one pre-wrapped line at the current position."""
+    last = index == len(wrapped.lines) - 1
+    line = wrapped.lines[index]
+    # Like multi_cell, end on the next line right of the text
+    new_x = XPos.RIGHT if last else XPos.LEFT
+    if wrapped.aligns[index] == "J" and not _INTERNALS:
+        _draw_justified(pdf, line, width, line_height, new_x)
+    elif wrapped.aligns[index] == "J":
+        # cell() refuses to justify, so hand the line to the renderer
+        # multi_cell uses, with the spaces that get stretched. The slack is
+        # divided among all breaking spaces, tabs included, like multi_cell
+        # does, but only " " is widened.
+        text = pdf.normalize_text(line)
+        fragments = (
+            pdf._preload_bidirectional_text(text, False)
+            if pdf.text_shaping
+            else pdf._preload_font_styles(text, False)
+        )
+        text_line = TextLine(
+            fragments,
+            text_width=0,
+            number_of_spaces=sum(char in BREAKING_SPACE_SYMBOLS_STR for char in text),
+            align=Align.J,
+            height=line_height,
+            max_width=width,
+        )
+        pdf._render_styled_text_line(
+            text_line, line_height, new_x=new_x, new_y=YPos.NEXT
+        )
+    else:
+        pdf.cell(width, line_height, line, new_x=new_x, new_y=YPos.NEXT)
+    if last and wrapped.trailing_newline:
+        pdf.ln()
+
+
+def draw_wrapped(
+    pdf: FPDF, wrapped: WrappedText, width: float, line_height: float
+) -> None:
+    """Draw pre-wrapped lines exactly like `multi_cell` would have."""
+    for index in range(len(wrapped.lines)):
+        draw_line(pdf, wrapped, index, width, line_height)
@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pydantic import BaseModel
 
 
@@ -50,9 +50,21 @@ class CoverLetter(BaseModel):
     text: str
 
 
+class Locale(BaseModel):
+    section_titles: Optional[dict] = None
+    labels: Optional[dict] = None
+    closing: Optional[str] = None
+    date_format: Optional[str] = None
+    month_names: Optional[List[str]] = None
+
+
 class CV(BaseModel):
     section_titles: Optional[dict] = None
     labels: Optional[dict] = None
+    closing: Optional[str] = None
+    date_format: Optional[str] = None
+    month_names: Optional[List[str]] = None
+    locales: Optional[Dict[str, Locale]] = None
     cover_letter: Optional[CoverLetter] = None
     person: Person
     experiences: List[Experience]
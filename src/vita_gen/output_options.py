@@ -0,0 +1,190 @@
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from datetime import datetime, timezone
+from typing import Iterator, Optional
+import os
+import threading
+
+
+@dataclass(frozen=True)
+class PdfProfile:
+    # zlib level of the page, font and image streams
+    deflate_level: int
+    # JPEG quality images are re-encoded with, None to embed them losslessly
+    image_quality: Optional[int] = None
+    # Resolution at their printed size that larger images are scaled down
+    # to, None to embed them at full resolution
+    image_dpi: Optional[int] = None
+
+
+PROFILES = {
+    # Least CPU per document, at the cost of larger files
+    "fast": PdfProfile(deflate_level=1),
+    # fpdf2's defaults
+    "balanced": PdfProfile(deflate_level=-1),
+    # Smallest files; photos are re-encoded, which is lossy
+    "small": PdfProfile(deflate_level=9, image_quality=85, image_dpi=300),
+}
+DEFAULT_PROFILE = "balanced"
+
+# Image settings tried, best first, to bring a document under max_kb
+IMAGE_STEPS = ((85, 300), (75, 300), (65, 200), (50, 150), (35, 150), (25, 100))
+
+# Output formats and the suffix of their files, which replaces ".pdf"; see
+# targets.py
+FORMATS = {"pdf": ".pdf", "txt": ".txt", "json": ".layout.json"}
+
+# Creation date of reproducible documents without SOURCE_DATE_EPOCH
+REPRODUCIBLE_DATE = datetime(2000, 1, 1, tzinfo=timezone.utc)
+
+_lock = threading.RLock()
+
+
+@dataclass(frozen=True)
+class OutputOptions:
+    """How a document is written, independent of what it contains."""
+
+    profile: str = DEFAULT_PROFILE
+    # Creation date written into the PDF instead of the current time. Fixing
+    # it makes identical inputs give byte-identical files.
+    creation_date: Optional[datetime] = None
+    # Re-encode images at lower quality until the PDF is at most this large
+    max_kb: Optional[float] = None
+    # Image settings that override the profile's, see IMAGE_STEPS
+    image_quality: Optional[int] = None
+    image_dpi: Optional[int] = None
+    # Scale text and spacing until documents have this many pages, by
+    # document type ("cv", "cover_letter"), see layout.fit_scale
+    fit_pages: tuple[tuple[str, int], ...] = ()
+    # Files written for every document, see FORMATS
+    formats: tuple[str, ...] = ("pdf",)
+
+    def __post_init__(self):
+        if self.profile not in PROFILES:
+            raise ValueError(
+                f"Unknown PDF profile {self.profile!r}, use one of {', '.join(PROFILES)}"
+            )
+        if self.image_quality is not None and not 1 <= self.image_quality <= 95:
+            raise ValueError("The image quality must be between 1 and 95")
+        if self.image_dpi is not None and self.image_dpi <= 0:
+            raise ValueError("The image resolution must be positive")
+        if not self.formats or not set(self.formats) <= set(FORMATS):
+            raise ValueError(f"Formats must be some of {', '.join(FORMATS)}")
+
+    def fit_pages_for(self, doc_type: str) -> Optional[int]:
+        return dict(self.fit_pages).get(doc_type)
+
+    @property
+    def pdf_profile(self) -> PdfProfile:
+        return PROFILES[self.profile]
+
+    def images(self) -> tuple[Optional[int], Optional[int]]:
+        """JPEG quality and resolution of embedded images (None: unchanged)."""
+        profile = self.pdf_profile
+        return (
+            self.image_quality or profile.image_quality,
+            self.image_dpi or profile.image_dpi,
+        )
+
+    def smaller_images(self) -> Iterator["OutputOptions"]:
+        """These options with each image setting below the current one."""
+        quality, dpi = self.images()
+        for step_quality, step_dpi in IMAGE_STEPS:
+            if (quality and step_quality >= quality) or (dpi and step_dpi > dpi):
+                continue
+            yield replace(self, image_quality=step_quality, image_dpi=step_dpi)
+
+    def digest_payload(self) -> dict:
+        """The settings that change the rendered bytes, for document digests."""
+        return {
+            "profile": self.profile,
+            "creation_date": self.creation_date and self.creation_date.isoformat(),
+            "max_kb": self.max_kb,
+            "images": self.images(),
+            "fit_pages": dict(self.fit_pages),
+            "formats": list(self.formats),
+        }
+
+
+def reproducible_date() -> datetime:
+    """SOURCE_DATE_EPOCH if set, as in other reproducible builds, else a fixed date."""
+    epoch = os.environ.get("SOURCE_DATE_EPOCH")
+    if epoch:
+        return datetime.fromtimestamp(int(epoch), tz=timezone.utc)
+    return REPRODUCIBLE_DATE
+
+
+def parse_fit_pages(value: str) -> tuple[tuple[str, int], ...]:
+    """Parse "2" (every document) or "cv=2,cover_letter=1" into fit_pages."""
+    if "=" not in value:
+        value = f"cv={value},cover_letter={value}"
+    fit_pages = {}
+    for part in value.split(","):
+        doc_type, _, pages = part.partition("=")
+        doc_type = doc_type.strip()
+        if doc_type not in ("cv", "cover_letter"):
+            raise ValueError(
+                f"Unknown document type {doc_type!r}, use cv or cover_letter"
+            )
+        if not pages.strip().isdigit() or int(pages) < 1:
+            raise ValueError(
+                f"Expected a number of pages for {doc_type}, got {pages!r}"
+            )
+        fit_pages[doc_type] = int(pages)
+    return tuple(sorted(fit_pages.items()))
+
+
+def parse_formats(value: str) -> tuple[str, ...]:
+    """Parse "pdf,txt,json" into formats, in the order of FORMATS."""
+    formats = {part.strip() for part in value.split(",") if part.strip()}
+    for name in sorted(formats):
+        if name not in FORMATS:
+            raise ValueError(f"Unknown format {name!r}, use {', '.join(FORMATS)}")
+    if not formats:
+        raise ValueError("Expected at least one format")
+    return tuple(name for name in FORMATS if name in formats)
+
+
+def output_path(pdf_path: str, name: str) -> str:
+    """The file of format `name` written next to the PDF at `pdf_path`."""
+    root, extension = os.path.splitext(pdf_path)
+    if extension.lower() != ".pdf":
+        root = pdf_path
+    return root + FORMATS[name]
+
+
+def parse_date(value: str) -> datetime:
+    """Parse an ISO 8601 date or timestamp; times without a zone are UTC."""
+    date = datetime.fromisoformat(value)
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return date
+
+
+@contextmanager
+def deflate_level(level: int) -> Iterator[None]:
+    """
+    Compress the streams written inside the block at `level`.
+
+    fpdf2 only has process-wide settings for this, so documents of
+    different threads are compressed one at a time, and the settings are
+    restored afterwards. An fpdf2 release without these settings compresses
+    at its default level instead.
+    """
+    from fpdf.image_parsing import SETTINGS
+    from fpdf.syntax import PDFContentStream
+
+    if not (
+        isinstance(getattr(PDFContentStream, "_COMPRESSION_LEVEL", None), int)
+        and isinstance(getattr(SETTINGS, "compression_level", None), int)
+    ):
+        yield
+        return
+    with _lock:
+        previous = PDFContentStream._COMPRESSION_LEVEL, SETTINGS.compression_level
+        PDFContentStream._COMPRESSION_LEVEL = level
+        SETTINGS.compression_level = level
+        try:
+            yield
+        finally:
+            PDFContentStream._COMPRESSION_LEVEL, SETTINGS.compression_level = previous
@@ -0,0 +1,225 @@
+from contextlib import contextmanager, nullcontext
+from typing import Iterable, Iterator, List, Optional
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+# Recorded spans as Chrome trace events, None while profiling is off. Every
+# instrumented call checks this first, so disabled profiling costs one
+# global lookup per call.
+_events: Optional[List[dict]] = None
+# Methods of fpdf2's OutputProducer replaced while profiling, by name
+_fpdf_originals: dict = {}
+_OFF = nullcontext()
+
+TRACE_NAME = "trace.json"
+SUMMARY_NAME = "profile.json"
+
+
+class _Span:
+    __slots__ = ("name", "args", "start")
+
+    def __init__(self, name: str, args: Optional[dict]):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        end = time.perf_counter_ns()
+        events = _events
+        if events is None:
+            return
+        # perf_counter is a system-wide monotonic clock, so the spans of
+        # worker processes line up with those of the main process
+        event = {
+            "name": self.name,
+            "cat": self.name.split(".", 1)[0],
+            "ph": "X",
+            "ts": self.start / 1000,
+            "dur": (end - self.start) / 1000,
+            "pid": os.getpid(),
+            "tid": threading.get_native_id(),
+        }
+        if self.args:
+            event["args"] = self.args
+        events.append(event)
+
+
+def span(name: str, **args):
+    """Time a `with` block as a span named `name`, if profiling is on."""
+    if _events is None:
+        return _OFF
+    return _Span(name, args)
+
+
+def traced(fn):
+    """Record a span for every call of `fn`, named after its qualified name."""
+    name = fn.__qualname__
+    if "." not in name:
+        # Plain functions are named after their module, e.g. layout.paginate
+        name = f"{fn.__module__.rsplit('.', 1)[-1]}.{name}"
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if _events is None:
+            return fn(*args, **kwargs)
+        with _Span(name, None):
+            return fn(*args, **kwargs)
+
+    return wrapper
+
+
+def _instrument_fpdf() -> None:
+    # Font subsetting and image embedding happen inside FPDF.output(). The
+    # private methods doing them are wrapped while profiling is on; those
+    # an fpdf2 release does not have are left out of the profile.
+    if _fpdf_originals:
+        return
+    from fpdf.output import OutputProducer
+
+    for method, name in (
+        ("_add_fonts", "pdf.font_subsetting"),
+        ("_add_images", "pdf.image_embedding"),
+    ):
+        original = vars(OutputProducer).get(method)
+        if not callable(original):
+            continue
+
+        def wrapper(self, *args, _original=original, _name=name, **kwargs):
+            with span(_name):
+                return _original(self, *args, **kwargs)
+
+        setattr(OutputProducer, method, wrapper)
+        _fpdf_originals[method] = original
+
+
+def _restore_fpdf() -> None:
+    if not _fpdf_originals:
+        return
+    from fpdf.output import OutputProducer
+
+    for method, original in _fpdf_originals.items():
+        setattr(OutputProducer, method, original)
+    _fpdf_originals.clear()
+
+
+def enable() -> None:
+    """Start recording spans in this process."""
+    global _events
+    if _events is None:
+        _events = []
+    _instrument_fpdf()
+
+
+def disable() -> List[dict]:
+    """Stop recording and return the recorded spans."""
+    global _events
+    events, _events = _events or [], None
+    _restore_fpdf()
+    return events
+
+
+def enabled() -> bool:
+    return _events is not None
+
+
+def drain() -> List[dict]:
+    """Return the spans recorded so far and start a new list."""
+    global _events
+    if _events is None:
+        return []
+    events, _events = _events, []
+    return events
+
+
+def add(events: Iterable[dict]) -> None:
+    """Add spans recorded by another process."""
+    if _events is not None:
+        _events.extend(events)
+
+
+def summary(events: List[dict]) -> dict:
+    """Total, mean and maximum duration per span name, slowest first."""
+    stages: dict[str, dict] = {}
+    for event in events:
+        stage = stages.setdefault(
+            event["name"], {"count": 0, "total_ms": 0.0, "max_ms": 0.0}
+        )
+        duration = event["dur"] / 1000
+        stage["count"] += 1
+        stage["total_ms"] += duration
+        stage["max_ms"] = max(stage["max_ms"], duration)
+    for stage in stages.values():
+        stage["mean_ms"] = stage["total_ms"] / stage["count"]
+
+    wall_ms = 0.0
+    if events:
+        start = min(event["ts"] for event in events)
+        wall_ms = (max(event["ts"] + event["dur"] for event in events) - start) / 1000
+    return {
+        "wall_ms": wall_ms,
+        "documents": stages.get("document", {}).get("count", 0),
+        "stages": dict(sorted(stages.items(), key=lambda item: -item[1]["total_ms"])),
+    }
+
+
+def write(directory: str, events: List[dict]) -> dict:
+    """Write the spans as a Chrome trace and a JSON summary; return the summary."""
+    os.makedirs(directory, exist_ok=True)
+    start = min((event["ts"] for event in events), default=0)
+    main_pid = os.getpid()
+    trace = [
+        {
+            "name": "process_name",
+            "ph": "M",
+            "pid": pid,
+            "args": {"name": "vita-gen" if pid == main_pid else f"worker {pid}"},
+        }
+        for pid in sorted({event["pid"] for event in events})
+    ]
+    trace += [{**event, "ts": round(event["ts"] - start, 3)} for event in events]
+    with open(os.path.join(directory, TRACE_NAME), "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, f)
+
+    result = summary(events)
+    with open(os.path.join(directory, SUMMARY_NAME), "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    return result
+
+
+@contextmanager
+def profile_to(directory: Optional[str], top: int = 12) -> Iterator[None]:
+    """
+    Record spans while the block runs and write them to `directory`.
+
+    A short table of the slowest stages goes to stderr, so that it never
+    mixes with a PDF written to stdout. Does nothing without a directory.
+    """
+    if not directory:
+        yield
+        return
+
+    enable()
+    try:
+        yield
+    finally:
+        result = write(directory, disable())
+        log = sys.stderr
+        print(
+            f"Profile of {result['documents']} documents ({result['wall_ms']:.0f} ms) "
+            f"written to {directory}",
+            file=log,
+        )
+        print(f"  {'stage':<44} {'count':>6} {'total':>10} {'mean':>9}", file=log)
+        for name, stage in list(result["stages"].items())[:top]:
+            print(
+                f"  {name:<44} {stage['count']:>6} {stage['total_ms']:>8.1f}ms "
+                f"{stage['mean_ms']:>7.2f}ms",
+                file=log,
+            )
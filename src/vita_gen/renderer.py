@@ -1,26 +1,36 @@
 from fpdf import FPDF
+from .font_registry import add_fonts
+from .font_subsets import cached_subsetting
+from .image_assets import image_height, place_image
+from .layout import Block, Layout, draw_layout, fit_scale, paginate
+from .measure import WrappedText, draw_line, draw_wrapped, wrap
 from .models import CV, Person, Experience, Education, SkillCategory
+from .output_options import OutputOptions, deflate_level
+from .profiling import span, traced
+from functools import partial
+from typing import BinaryIO, List, Optional, Union
 import os
 
 
 class CVRenderer(FPDF):
-    def __init__(self, cv: CV):
+    def __init__(
+        self,
+        cv: CV,
+        options: Optional[OutputOptions] = None,
+        layout_only: bool = False,
+    ):
+        # A layout-only renderer can measure and paginate but not render
         super().__init__()
         self.cv = cv
+        self.options = options or OutputOptions()
+        if self.options.creation_date:
+            self.set_creation_date(self.options.creation_date)
         self.set_auto_page_break(auto=True, margin=15)
+        # Factor on font sizes, line heights and spacing, see fit_scale
+        self.scale = 1.0
 
-        # Add unicode fonts
-        font_dir = os.path.join(os.path.dirname(__file__), "fonts")
-        self.add_font(
-            "Roboto", style="", fname=os.path.join(font_dir, "Roboto-Regular.ttf")
-        )
-        self.add_font(
-            "Roboto", style="B", fname=os.path.join(font_dir, "Roboto-Bold.ttf")
-        )
-        # Use Regular for Italic if Italic not available
-        self.add_font(
-            "Roboto", style="I", fname=os.path.join(font_dir, "Roboto-Regular.ttf")
-        )
+        # Add unicode fonts (parsed once per process)
+        add_fonts(self, layout_only=layout_only)
 
         self.add_page()
         self.set_font("Roboto", size=11)
@@ -47,232 +57,333 @@ class CVRenderer(FPDF):
     def header(self):
         pass
 
-    def render(self, output_path: str):
-
-        self._render_header()
-        self._render_contact_info()
-        self._render_section_title(self.titles["experiences"])
+    def render(
+        self,
+        output_path: Optional[Union[str, BinaryIO]] = None,
+        layout: Optional[Layout] = None,
+    ):
+        # A layout from layout() is drawn as it is, without measuring again
+        draw_layout(self, layout or self.layout())
+
+        # output_path may also be a binary file object; without either the
+        # PDF is returned as bytes
+        level = self.options.pdf_profile.deflate_level
+        with span("pdf.output"), deflate_level(level), cached_subsetting():
+            return self.output(output_path)
+
+    def layout(self) -> Layout:
+        """Measure the CV and break it into pages without drawing anything."""
+        pages = self.options.fit_pages_for("cv")
+        if pages:
+            self.scale = fit_scale(self._layout_at, pages)
+        return self._layout_at(self.scale)
+
+    def _layout_at(self, scale: float) -> Layout:
+        self.scale = scale
+        return paginate(self.blocks(), self.t_margin, self.page_break_trigger)
+
+    @traced
+    def blocks(self) -> List[Block]:
+        s = self.scale
+        blocks = [self._header_block(), self._contact_block()]
+
+        blocks.append(self._section_title_block(self.titles["experiences"]))
+        # Spacing below an entry becomes spacing above the next block, so it
+        # is dropped when that block starts a new page
+        gap = 0.0
         prev_company = None
         for exp in self.cv.experiences:
-            self._render_experience(exp, prev_company)
+            # Visual separation between different companies
+            new_company = prev_company is not None and exp.company != prev_company
+            blocks += self._experience_blocks(exp, gap + (4 * s if new_company else 0))
             prev_company = exp.company
+            gap = 2 * s
 
-        self.ln(5)
-        self._render_section_title(self.titles["education"])
+        blocks.append(self._section_title_block(self.titles["education"], gap + 5 * s))
+        gap = 0.0
         for edu in self.cv.education:
-            self._render_education(edu)
-
-        self.ln(5)
-        self._render_section_title(self.titles["skills"])
-        self._render_skills(self.cv.skills, self.cv.languages)
-
-        self.ln(10)
-        self._render_signature()
-
-        self.output(output_path)
+            blocks += self._education_blocks(edu, gap)
+            gap = 3 * s
+
+        blocks.append(self._section_title_block(self.titles["skills"], gap + 5 * s))
+        blocks += self._skills_blocks(self.cv.skills, self.cv.languages)
+
+        signature = self._signature_block()
+        if signature:
+            blocks.append(signature)
+        return blocks
+
+    @traced
+    def _header_block(self) -> Block:
+        person = self.cv.person
+        return Block(
+            "header",
+            25 * self.scale,
+            self._draw_header,
+            text=(person.name, person.title),
+        )
 
-    def _render_header(self):
+    @traced
+    def _draw_header(self, pdf: FPDF):
         if self.cv.person.image_path and os.path.exists(self.cv.person.image_path):
             width = self.cv.person.image_width
             # Position image top right: Page Width - Right Margin - Image Width
             # A4 width is 210mm.
-            x = 210 - self.r_margin - width
-            self.image(self.cv.person.image_path, x=x, y=10, w=width)
+            x = 210 - pdf.r_margin - width
+            place_image(pdf, self.cv.person.image_path, x=x, y=10, w=width)
 
+        s = self.scale
         # Name
-        self.set_font("Roboto", "B", 24)
-        self.cell(0, 10, self.cv.person.name, ln=True)
+        pdf.set_font("Roboto", "B", 24 * s)
+        pdf.cell(0, 10 * s, self.cv.person.name, ln=True)
 
         # Title
-        self.set_font("Roboto", "B", 14)
-        self.set_text_color(100, 100, 100)
-        self.cell(0, 10, self.cv.person.title, ln=True)
-        self.set_text_color(0, 0, 0)
-        self.ln(5)
-
-    def _render_contact_info(self):
-        self.set_font("Roboto", size=10)
+        pdf.set_font("Roboto", "B", 14 * s)
+        pdf.set_text_color(100, 100, 100)
+        pdf.cell(0, 10 * s, self.cv.person.title, ln=True)
+        pdf.set_text_color(0, 0, 0)
+        pdf.ln(5 * s)
+
+    @traced
+    def _contact_block(self) -> Block:
+        s = self.scale
+        self.set_font("Roboto", size=10 * s)
         born_prefix = self.labels["born_on"]
         info = f"{self.cv.person.address}\n{self.cv.person.phone} | {self.cv.person.email}\n{self.cv.person.linkedin}\n{born_prefix} {self.cv.person.birth_date}"
-        self.multi_cell(0, 5, info)
-        self.ln(5)
-        self.line(10, self.get_y(), 200, self.get_y())
-        self.ln(5)
-
-    def _render_section_title(self, title: str):
-        # Ensure there is enough space for the title + at least 30mm of content
-        if self.get_y() + 30 > self.page_break_trigger:
-            self.add_page()
-
-        self.set_font("Roboto", "B", 16)
-        self.set_fill_color(240, 240, 240)
-        self.cell(0, 8, title, ln=True, fill=False)
-        self.ln(2)
-
-    def _render_experience(self, exp: Experience, prev_company: str = None):
-        # Check if we need a page break
-        self.set_font("Roboto", size=11)
-        desc_height = 0
-        effective_width = (
-            self.w - self.l_margin - self.r_margin - 6
-        )  # Account for bullet area
-        for point in exp.description:
-            # Calculate height of this bullet point
-            h = self.multi_cell(
-                effective_width, 5, point.strip(), dry_run=True, output="HEIGHT"
-            )
-            desc_height += h
-
-        # Total height: Date(6) + Title(6) + Company(6) + Description + Spacing(3) + Potential Spacer(4)
-        total_height = 18 + desc_height + 3
-        # Add extra height calculation for spacing if new company
-        if prev_company is not None and exp.company != prev_company:
-            total_height += 4
-
-        if self.get_y() + total_height > self.page_break_trigger:
-            self.add_page()
-
-        # Add visual separation between different companies (unless top of page)
-        if (
-            prev_company is not None
-            and exp.company != prev_company
-            and self.get_y() > 30
-        ):
-            self.ln(4)
-
-        self.set_font("Roboto", "B", 11)
+        wrapped = wrap(self, info, self.epw)
+        return Block(
+            "contact",
+            wrapped.height(5 * s) + 10 * s,
+            partial(self._draw_contact_info, wrapped=wrapped),
+            text=wrapped.lines,
+        )
+
+    @traced
+    def _draw_contact_info(self, pdf: FPDF, wrapped: WrappedText):
+        s = self.scale
+        pdf.set_font("Roboto", size=10 * s)
+        draw_wrapped(pdf, wrapped, pdf.epw, 5 * s)
+        pdf.ln(5 * s)
+        pdf.line(10, pdf.get_y(), 200, pdf.get_y())
+        pdf.ln(5 * s)
+
+    def _section_title_block(self, title: str, space_before: float = 0) -> Block:
+        # A title always stays on the page of the first entry below it
+        return Block(
+            "section_title",
+            10 * self.scale,
+            partial(self._draw_section_title, title=title),
+            space_before=space_before,
+            keep_with_next=True,
+            text=(title,),
+        )
+
+    @traced
+    def _draw_section_title(self, pdf: FPDF, title: str):
+        s = self.scale
+        pdf.set_font("Roboto", "B", 16 * s)
+        pdf.cell(0, 8 * s, title, ln=True)
+        pdf.ln(2 * s)
+
+    def _entry_blocks(self, header: Block, points: list[str], kind: str) -> List[Block]:
+        # An entry is kept on one page unless it is longer than a page, in
+        # which case it may break between the lines of its bullet points
+        self.set_font("Roboto", size=11 * self.scale)
+        indent = 6  # Account for bullet area
+        width = self.epw - indent
+        blocks = [header]
+        for point in points:
+            wrapped = wrap(self, point.strip(), width)
+            for index in range(len(wrapped.lines)):
+                blocks.append(
+                    Block(
+                        kind,
+                        5 * self.scale,
+                        partial(
+                            self._draw_bullet_line,
+                            wrapped=wrapped,
+                            index=index,
+                            width=width,
+                        ),
+                        keep_with_next=True,
+                        # The bullet, or the indent of the lines below it
+                        text=(("• " if index == 0 else "  ") + wrapped.lines[index],),
+                        # The bullet hangs into the indent
+                        indent=indent,
+                    )
+                )
+        blocks[-1].keep_with_next = False
+        return blocks
+
+    @traced
+    def _experience_blocks(self, exp: Experience, space_before: float) -> List[Block]:
+        # Date(6) + Title(6) + Company(6) + Spacing(1)
+        header = Block(
+            "experience",
+            19 * self.scale,
+            partial(self._draw_experience_header, exp=exp),
+            space_before=space_before,
+            keep_with_next=True,
+            text=(f"{exp.start_date} - {exp.end_date}", exp.title.upper(), exp.company),
+        )
+        return self._entry_blocks(header, exp.description, "experience_line")
+
+    @traced
+    def _draw_experience_header(self, pdf: FPDF, exp: Experience):
+        s = self.scale
+        pdf.set_font("Roboto", "B", 11 * s)
         # Date range
         date_range = f"{exp.start_date} - {exp.end_date}"
-        self.cell(0, 6, date_range, ln=True)
+        pdf.cell(0, 6 * s, date_range, ln=True)
 
         # Title
-        self.set_font("Roboto", "B", 12)
-        self.cell(0, 6, exp.title.upper(), ln=True)
+        pdf.set_font("Roboto", "B", 12 * s)
+        pdf.cell(0, 6 * s, exp.title.upper(), ln=True)
 
         # Company - ALWAYS PRINT
-        # Removed inconsistent internal padding
-        self.set_font("Roboto", "I", 11)
-        self.cell(0, 6, exp.company, ln=True)
-        self.ln(1)
-
-        # Description
-        self.set_font("Roboto", size=11)
-        for point in exp.description:
+        pdf.set_font("Roboto", "I", 11 * s)
+        pdf.cell(0, 6 * s, exp.company, ln=True)
+        pdf.ln(1 * s)
+
+    @traced
+    def _draw_bullet_line(
+        self, pdf: FPDF, wrapped: WrappedText, index: int, width: float
+    ):
+        s = self.scale
+        pdf.set_font("Roboto", size=11 * s)
+        if index == 0:
             # Bullet point simulation
-            self.set_x(self.l_margin + 2)
-            self.cell(4, 5, "•")
-
-            # Text with hanging indent
-            prev_l_margin = self.l_margin
-            self.l_margin += 6
-            self.set_x(self.l_margin)
-            self.multi_cell(0, 5, point.strip())
-            self.l_margin = prev_l_margin
-
-        self.ln(2)
-
-    def _render_education(self, edu: Education):
-        # Similar check for education if needed, but experience is more critical for length
-        # Let's add it for consistency
-        self.set_font("Roboto", size=11)
-        details_height = 0
-        effective_width = self.w - self.l_margin - self.r_margin - 6
-        for detail in edu.details:
-            h = self.multi_cell(
-                effective_width, 5, detail.strip(), dry_run=True, output="HEIGHT"
-            )
-            details_height += h
-
-        total_height = 18 + details_height + 3
-
-        if self.get_y() + total_height > self.page_break_trigger:
-            self.add_page()
+            pdf.set_x(pdf.l_margin + 2)
+            pdf.cell(4, 5 * s, "•")
+
+        # Text with hanging indent
+        pdf.set_x(pdf.l_margin + 6)
+        draw_line(pdf, wrapped, index, width, 5 * s)
+
+    @traced
+    def _education_blocks(self, edu: Education, space_before: float) -> List[Block]:
+        header = Block(
+            "education",
+            18 * self.scale,
+            partial(self._draw_education_header, edu=edu),
+            space_before=space_before,
+            keep_with_next=True,
+            text=(
+                f"{edu.start_date} - {edu.end_date}",
+                edu.degree.upper(),
+                edu.institution,
+            ),
+        )
+        return self._entry_blocks(header, edu.details, "education_line")
 
-        self.set_font("Roboto", "B", 11)
+    @traced
+    def _draw_education_header(self, pdf: FPDF, edu: Education):
+        s = self.scale
+        pdf.set_font("Roboto", "B", 11 * s)
         date_range = f"{edu.start_date} - {edu.end_date}"
-        self.cell(0, 6, date_range, ln=True)
+        pdf.cell(0, 6 * s, date_range, ln=True)
 
-        self.set_font("Roboto", "B", 12)
-        self.cell(0, 6, edu.degree.upper(), ln=True)
+        pdf.set_font("Roboto", "B", 12 * s)
+        pdf.cell(0, 6 * s, edu.degree.upper(), ln=True)
 
-        self.set_font("Roboto", "I", 11)
-        self.cell(0, 6, edu.institution, ln=True)
+        pdf.set_font("Roboto", "I", 11 * s)
+        pdf.cell(0, 6 * s, edu.institution, ln=True)
 
-        self.set_font("Roboto", size=11)
-        for detail in edu.details:
-            self.set_x(self.l_margin + 2)
-            self.cell(4, 5, "•")
-
-            # Text with hanging indent
-            prev_l_margin = self.l_margin
-            self.l_margin += 6
-            self.set_x(self.l_margin)
-            self.multi_cell(0, 5, detail.strip())
-            self.l_margin = prev_l_margin
-
-        self.ln(3)
-
-    def _render_skills(self, skills: list[SkillCategory], languages: str):
-        self.set_font("Roboto", "B", 11)
+    @traced
+    def _skills_blocks(
+        self, skills: list[SkillCategory], languages: str
+    ) -> List[Block]:
+        s = self.scale
+        self.set_font("Roboto", size=11 * s)
+        blocks = []
         for cat in skills:
-            # Simple check for skill block height
-            # Name(6) + Content(? approx 5-10) + Spacing(2)
-            # Assume ~15 units
-            if self.get_y() + 20 > self.page_break_trigger:
-                self.add_page()
-
-            self.cell(0, 6, cat.name, ln=True)
-            self.set_font("Roboto", size=11)
-            self.multi_cell(0, 5, cat.skills)
-            self.ln(2)
-            self.set_font("Roboto", "B", 11)
-
-        # Languages
-        if self.get_y() + 15 > self.page_break_trigger:
-            self.add_page()
-
-        self.cell(0, 6, self.titles["languages"], ln=True)
-        self.set_font("Roboto", size=11)
-        self.multi_cell(0, 5, languages)
-
-    def _render_signature(self):
-        if self.cv.person.signature_path and os.path.exists(
-            self.cv.person.signature_path
-        ):
-            # Check for page break before signature block (Image + Line + Text)
-            # Approx 15mm for signature height + 5mm spacing + 5mm for text
-            block_height = (self.cv.person.signature_width / 2) + 15
-
-            if self.get_y() + block_height > self.page_break_trigger:
-                self.add_page()
-
-            # Render signature image
-            self.image(
-                self.cv.person.signature_path,
-                x=self.l_margin,
-                y=self.get_y(),
-                w=self.cv.person.signature_width,
+            wrapped = wrap(self, cat.skills, self.epw)
+            blocks.append(
+                Block(
+                    "skill_category",
+                    6 * s + wrapped.height(5 * s),
+                    partial(self._draw_skill_list, name=cat.name, wrapped=wrapped),
+                    space_before=2 * s if blocks else 0,
+                    text=(cat.name,) + wrapped.lines,
+                )
             )
 
-            # Move down below image
-            # drastically reduce spacing to pull line up (overlapping bottom of image box heavily)
-            self.ln((self.cv.person.signature_width / 2) - 10)
-
-            # Draw line
-            line_width = self.cv.person.signature_width
-            self.line(
-                self.l_margin, self.get_y(), self.l_margin + line_width, self.get_y()
+        wrapped = wrap(self, languages, self.epw)
+        blocks.append(
+            Block(
+                "languages",
+                6 * s + wrapped.height(5 * s),
+                partial(
+                    self._draw_skill_list,
+                    name=self.titles["languages"],
+                    wrapped=wrapped,
+                ),
+                space_before=2 * s if blocks else 0,
+                text=(self.titles["languages"],) + wrapped.lines,
             )
+        )
+        return blocks
+
+    @traced
+    def _draw_skill_list(self, pdf: FPDF, name: str, wrapped: WrappedText):
+        s = self.scale
+        pdf.set_font("Roboto", "B", 11 * s)
+        pdf.cell(0, 6 * s, name, ln=True)
+        pdf.set_font("Roboto", size=11 * s)
+        draw_wrapped(pdf, wrapped, pdf.epw, 5 * s)
+
+    @traced
+    def _signature_block(self) -> Optional[Block]:
+        person = self.cv.person
+        if not person.signature_path or not os.path.exists(person.signature_path):
+            return None
+
+        # The line overlaps the lower part of the image, followed by the
+        # name and date; the block ends below whichever reaches further
+        s = self.scale
+        text_height = (person.signature_width / 2) - 10 + 2 * s + 5 * s
+        text = (person.name,)
+        if person.signature_date:
+            text_height += 5 * s
+            text += (person.signature_date,)
+        image = image_height(self, person.signature_path, person.signature_width)
+        return Block(
+            "signature",
+            max(text_height, image),
+            self._draw_signature,
+            space_before=10 * s,
+            text=text,
+        )
+
+    @traced
+    def _draw_signature(self, pdf: FPDF):
+        # Render signature image
+        place_image(
+            pdf,
+            self.cv.person.signature_path,
+            x=pdf.l_margin,
+            y=pdf.get_y(),
+            w=self.cv.person.signature_width,
+        )
 
-            # Add name below line
-            self.ln(2)
-            self.set_font("Roboto", size=10)
+        # Move down below image
+        # drastically reduce spacing to pull line up (overlapping bottom of image box heavily)
+        pdf.ln((self.cv.person.signature_width / 2) - 10)
 
-            # Print name centered under line
-            self.cell(line_width, 5, self.cv.person.name, align="C", ln=True)
+        # Draw line
+        line_width = self.cv.person.signature_width
+        pdf.line(pdf.l_margin, pdf.get_y(), pdf.l_margin + line_width, pdf.get_y())
 
-            # Print date if available
-            if self.cv.person.signature_date:
-                self.cell(
-                    line_width, 5, self.cv.person.signature_date, align="C", ln=True
-                )
+        # Add name below line
+        s = self.scale
+        pdf.ln(2 * s)
+        pdf.set_font("Roboto", size=10 * s)
+
+        # Print name centered under line
+        pdf.cell(line_width, 5 * s, self.cv.person.name, align="C", ln=True)
+
+        # Print date if available
+        if self.cv.person.signature_date:
+            pdf.cell(
+                line_width, 5 * s, self.cv.person.signature_date, align="C", ln=True
+            )
@@ -0,0 +1,231 @@
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pydantic import ValidationError
+from socketserver import ThreadingUnixStreamServer
+from typing import Optional
+import hashlib
+import json
+import os
+import signal
+import threading
+
+from .api import render_document
+from .jobs import DOCUMENT_TYPES, init_worker
+from .models import CV
+
+RENDER_PREFIX = "/render/"
+
+
+def _warm() -> None:
+    pass
+
+
+class QueueFull(Exception):
+    pass
+
+
+class Unavailable(Exception):
+    """The worker pool broke, e.g. because a worker was killed."""
+
+
+class RenderService:
+    """
+    Render documents on a pool of pre-warmed worker processes.
+
+    At most `workers + queue_size` distinct documents are accepted at once;
+    beyond that `submit` raises `QueueFull`. Requests for a document that is
+    already being rendered share the pending result instead of being queued
+    again. When a worker dies the pool is replaced and `submit` raises
+    `Unavailable` for the requests it could not take.
+    """
+
+    def __init__(self, workers: int, queue_size: int):
+        self.workers = workers
+        self.pool = self._new_pool()
+        self.slots = threading.BoundedSemaphore(workers + queue_size)
+        self.in_flight: dict[str, Future] = {}
+        self.lock = threading.Lock()
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker)
+
+    def _replace(self, broken: ProcessPoolExecutor) -> None:
+        # Called with the lock held; only the first request to notice the
+        # broken pool replaces it
+        if self.pool is broken:
+            self.pool = self._new_pool()
+            broken.shutdown(wait=False, cancel_futures=True)
+
+    def warm_up(self) -> None:
+        # Submitting one task per worker makes the pool start all processes
+        for future in [self.pool.submit(_warm) for _ in range(self.workers)]:
+            future.result()
+
+    def submit(self, cv: CV, doc_type: str) -> Future:
+        key = hashlib.sha256(
+            f"{doc_type}\0{cv.model_dump_json()}".encode("utf-8")
+        ).hexdigest()
+        with self.lock:
+            future = self.in_flight.get(key)
+            if future is not None:
+                return future
+            if not self.slots.acquire(blocking=False):
+                raise QueueFull()
+            pool = self.pool
+            try:
+                future = pool.submit(render_document, cv, doc_type)
+            except BaseException as e:
+                self.slots.release()
+                if isinstance(e, BrokenProcessPool):
+                    self._replace(pool)
+                    raise Unavailable() from e
+                raise
+            self.in_flight[key] = future
+
+        def release(done: Future) -> None:
+            with self.lock:
+                self.in_flight.pop(key, None)
+                if not done.cancelled() and isinstance(
+                    done.exception(), BrokenProcessPool
+                ):
+                    self._replace(pool)
+            self.slots.release()
+
+        future.add_done_callback(release)
+        return future
+
+    def shutdown(self) -> None:
+        self.pool.shutdown(cancel_futures=True)
+
+
+class RenderRequestHandler(BaseHTTPRequestHandler):
+    server_version = "vita-gen"
+    service: RenderService
+    max_body_size = 10 * 1024 * 1024
+
+    def address_string(self) -> str:
+        # Unix socket clients have no (host, port) address
+        if isinstance(self.client_address, tuple):
+            return super().address_string()
+        return "unix"
+
+    def _send_json(self, status: int, payload: dict, headers: Optional[dict] = None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok", "workers": self.service.workers})
+        else:
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        doc_type = self.path[len(RENDER_PREFIX) :]
+        if not self.path.startswith(RENDER_PREFIX) or doc_type not in DOCUMENT_TYPES:
+            paths = ", ".join(RENDER_PREFIX + name for name in DOCUMENT_TYPES)
+            self._send_json(404, {"error": f"Use one of {paths}"})
+            return
+
+        length = self.headers.get("Content-Length")
+        if length is None:
+            self._send_json(411, {"error": "Content-Length is required"})
+            return
+        try:
+            size = int(length)
+        except ValueError:
+            size = -1
+        if size < 0:
+            self._send_json(400, {"error": "Invalid Content-Length"})
+            return
+        if size > self.max_body_size:
+            self._send_json(413, {"error": "Request body too large"})
+            return
+
+        try:
+            cv = CV.model_validate_json(self.rfile.read(size))
+        except ValidationError as e:
+            self._send_json(
+                422, {"error": "Invalid CV data", "details": json.loads(e.json())}
+            )
+            return
+
+        if doc_type == "cover_letter" and not cv.cover_letter:
+            self._send_json(422, {"error": "No cover letter data found"})
+            return
+
+        try:
+            future = self.service.submit(cv, doc_type)
+        except QueueFull:
+            self._send_json(
+                429, {"error": "Render queue is full"}, {"Retry-After": "1"}
+            )
+            return
+        except Unavailable:
+            self._send_json(
+                503, {"error": "Render workers are restarting"}, {"Retry-After": "1"}
+            )
+            return
+
+        try:
+            pdf = future.result()
+        except BrokenProcessPool:
+            self._send_json(503, {"error": "Render worker died"}, {"Retry-After": "1"})
+            return
+        except Exception as e:
+            self._send_json(500, {"error": f"Rendering failed: {e}"})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/pdf")
+        self.send_header("Content-Length", str(len(pdf)))
+        self.end_headers()
+        self.wfile.write(pdf)
+
+
+class UnixHTTPServer(ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+def serve(
+    host: str,
+    port: int,
+    socket_path: Optional[str],
+    workers: int,
+    queue_size: int,
+) -> None:
+    service = RenderService(workers, queue_size)
+    handler = type("Handler", (RenderRequestHandler,), {"service": service})
+
+    print(f"Starting {workers} render worker(s)...")
+    service.warm_up()
+
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        httpd = UnixHTTPServer(socket_path, handler)
+        print(f"Serving on unix socket {socket_path}")
+    else:
+        httpd = ThreadingHTTPServer((host, port), handler)
+        print(f"Serving on http://{host}:{port}")
+
+    def stop(signum, frame):
+        raise KeyboardInterrupt()
+
+    # Shut down cleanly when stopped by a process manager
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        service.shutdown()
+        if socket_path and os.path.exists(socket_path):
+            os.unlink(socket_path)
@@ -0,0 +1,84 @@
+from dataclasses import dataclass
+from typing import List, Sequence
+
+from fpdf import FPDF
+
+from .layout import Layout
+
+
+@dataclass
+class Part:
+    """A document laid out by its own renderer, e.g. the CV of an application."""
+
+    title: str
+    doc_type: str
+    renderer: FPDF
+    layout: Layout
+
+
+def plain_text(parts: Sequence[Part]) -> str:
+    """
+    The text of the laid-out documents in reading order, e.g. for applicant
+    tracking systems.
+
+    Lines are broken as in the PDF. Headings, entries and paragraphs are
+    separated by a blank line.
+    """
+    paragraphs: List[List[str]] = []
+    for part in parts:
+        previous = None
+        for placement in part.layout.placements:
+            block = placement.block
+            if not block.text:
+                continue
+            # Lines of an entry continue its header, e.g. "experience_line"
+            # after "experience"
+            continues = previous is not None and (
+                block.kind == previous.kind or block.kind == f"{previous.kind}_line"
+            )
+            if not paragraphs or not continues or block.space_before:
+                paragraphs.append([])
+            paragraphs[-1].extend(block.text)
+            previous = block
+    return "\n\n".join("\n".join(lines) for lines in paragraphs) + "\n"
+
+
+def layout_json(parts: Sequence[Part]) -> dict:
+    """
+    Every block of the laid-out documents with its page and position.
+
+    Positions and sizes are in mm from the top left corner of the page.
+    Pages are counted from 1 across all documents of the file.
+    """
+    documents = []
+    first_page = 1
+    for part in parts:
+        renderer = part.renderer
+        blocks = []
+        for placement in part.layout.placements:
+            block = placement.block
+            entry = {
+                "kind": block.kind,
+                "page": first_page + placement.page,
+                "x": round(renderer.l_margin + block.indent, 2),
+                "y": round(placement.y, 2),
+                "width": round(renderer.epw - block.indent, 2),
+                "height": round(block.height, 2),
+                "text": list(block.text),
+            }
+            if placement.overflow:
+                entry["overflow"] = True
+            blocks.append(entry)
+        documents.append(
+            {
+                "type": part.doc_type,
+                "first_page": first_page,
+                "pages": part.layout.pages,
+                "page_width": round(renderer.w, 2),
+                "page_height": round(renderer.h, 2),
+                "scale": renderer.scale,
+                "blocks": blocks,
+            }
+        )
+        first_page += part.layout.pages
+    return {"unit": "mm", "pages": first_page - 1, "documents": documents}
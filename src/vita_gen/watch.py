@@ -0,0 +1,96 @@
+from typing import Callable, Iterable, List, Optional
+import os
+import time
+
+from .jobs import BuildReport, ConfigSelection, discover_configs
+
+
+def _stamp(path: str) -> Optional[tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _snapshot(paths: Iterable[str]) -> dict[str, Optional[tuple[int, int]]]:
+    return {path: _stamp(path) for path in paths}
+
+
+def watch_configs(
+    config: str,
+    rebuild: Callable[[List[str]], BuildReport],
+    interval: float = 0.05,
+    debounce: float = 0.05,
+    selection: Optional[ConfigSelection] = None,
+) -> None:
+    """
+    Re-render documents whenever a config or one of its images changes.
+
+    Files are polled every `interval` seconds. After a change, polling
+    continues until nothing has changed for `debounce` seconds, so a burst of
+    saves triggers a single rebuild. Only configs that changed or that
+    reference a changed image are rebuilt, and the build manifest further
+    limits that to the documents whose inputs differ.
+    """
+    # Maps each image or signature path to the configs that reference it
+    assets: dict[str, set[str]] = {}
+
+    def run(configs: List[str]) -> None:
+        report = rebuild(configs)
+        for referencing in assets.values():
+            referencing.difference_update(configs)
+        for result in report.results:
+            for path in result.assets:
+                assets.setdefault(path, set()).add(result.job.config_path)
+        report.print_summary()
+
+    def watched() -> List[str]:
+        referenced = [path for path, users in assets.items() if users]
+        return discover_configs(config, selection) + referenced
+
+    def settled_stamps(snapshot: dict) -> dict:
+        # Keep the stamps taken before a rebuild so that files written while
+        # it was running trigger another rebuild; only newly referenced
+        # files are stamped now
+        return {**_snapshot(watched()), **snapshot}
+
+    initial = _snapshot(discover_configs(config, selection))
+    run(list(initial))
+    stamps = settled_stamps(initial)
+    print(f"Watching {config} for changes (Ctrl+C to stop)...")
+
+    try:
+        while True:
+            time.sleep(interval)
+            current = _snapshot(watched())
+            if current == stamps:
+                continue
+
+            # Wait for the burst of saves to settle
+            while True:
+                time.sleep(debounce)
+                settled = _snapshot(watched())
+                if settled == current:
+                    break
+                current = settled
+
+            changed = {
+                path
+                for path in current.keys() | stamps.keys()
+                if current.get(path) != stamps.get(path)
+            }
+            configs = set(discover_configs(config, selection))
+            affected = changed & configs
+            for path in changed:
+                affected.update(assets.get(path, ()))
+            affected = sorted(path for path in affected if current.get(path))
+
+            if affected:
+                start = time.perf_counter()
+                run(affected)
+                elapsed = (time.perf_counter() - start) * 1000
+                print(f"Rebuilt {len(affected)} config(s) in {elapsed:.0f} ms")
+            stamps = settled_stamps(current)
+    except KeyboardInterrupt:
+        print("Stopped watching.")
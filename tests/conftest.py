@@ -0,0 +1,61 @@
+import pytest
+import yaml
+
+from vita_gen.models import CV
+
+
+def make_cv(bullets: int = 4) -> CV:
+    point = (
+        "Built and ran the data pipeline that feeds the reporting of every "
+        "team, with tests, reviews and a release every week"
+    )
+    return CV.model_validate(
+        {
+            "person": {
+                "name": "JANE DOE",
+                "title": "Software Engineer",
+                "address": "1 Main Street, 12345 Town",
+                "phone": "+49 123 4567890",
+                "email": "jane@example.com",
+                "linkedin": "linkedin.com/in/janedoe/",
+                "birth_date": "01. January 1990",
+            },
+            "experiences": [
+                {
+                    "start_date": "01/2020",
+                    "end_date": "12/2024",
+                    "title": "Engineer",
+                    "company": "Acme",
+                    "description": [f"{point} ({index})." for index in range(bullets)],
+                }
+            ],
+            "education": [
+                {
+                    "start_date": "10/2014",
+                    "end_date": "09/2019",
+                    "degree": "Computer Science (M.Sc.)",
+                    "institution": "Tech University",
+                }
+            ],
+            "skills": [{"name": "Languages", "skills": "Python, SQL, Go"}],
+            "languages": "English, German",
+            "cover_letter": {
+                "company": {"name": "Globex", "address": "2 Side Street, Town"},
+                "title": "Application as Software Engineer",
+                "text": "Dear team,\n\nI would like to join Globex.\n\nBest regards",
+            },
+        }
+    )
+
+
+def write_config(path, cv: CV, **fields) -> str:
+    """Write `cv` as a YAML config, with top-level `fields` added."""
+    data = {**cv.model_dump(mode="json", exclude_none=True), **fields}
+    with open(path, "w", encoding="utf-8") as f:
+        yaml.safe_dump(data, f, allow_unicode=True)
+    return str(path)
+
+
+@pytest.fixture
+def cv() -> CV:
+    return make_cv()
@@ -0,0 +1,63 @@
+import io
+import json
+
+import pytest
+
+from vita_gen.batch import read_journal, run_batch
+
+from conftest import make_cv, write_config
+
+
+class InterruptedResults(io.StringIO):
+    """Status output of a run that is stopped after `lines` documents."""
+
+    def __init__(self, lines: int):
+        super().__init__()
+        self.lines = lines
+
+    def write(self, text: str) -> int:
+        if self.getvalue().count("\n") == self.lines:
+            raise KeyboardInterrupt
+        return super().write(text)
+
+
+def test_resume_skips_done_records_and_retries_failed_ones(tmp_path):
+    configs = tmp_path / "configs"
+    configs.mkdir()
+    write_config(configs / "a.yaml", make_cv())
+    write_config(configs / "c.yaml", make_cv())
+    records = [
+        {"id": "a", "config": str(configs / "a.yaml")},
+        # Fails until its config is written
+        {"id": "b", "config": str(configs / "b.yaml")},
+        {"config": str(configs / "c.yaml")},
+    ]
+    jobs_path = tmp_path / "jobs.jsonl"
+    with open(jobs_path, "w", encoding="utf-8") as f:
+        for record in records:
+            name = record["config"][-6]
+            record.update(type="cv", output=str(tmp_path / "out" / f"{name}.pdf"))
+            f.write(json.dumps(record) + "\n")
+    journal = str(tmp_path / "jobs.jsonl.done")
+
+    def batch(results):
+        return run_batch(str(jobs_path), results, journal, log=lambda message: None)
+
+    # Stopped while reporting the third document, after it was written
+    interrupted = InterruptedResults(lines=2)
+    with pytest.raises(KeyboardInterrupt):
+        batch(interrupted)
+    statuses = [json.loads(line) for line in interrupted.getvalue().splitlines()]
+    assert [status["status"] for status in statuses] == ["written", "failed"]
+    assert read_journal(journal) == {"a"}
+
+    write_config(configs / "b.yaml", make_cv())
+    results = io.StringIO()
+    report = batch(results)
+    assert (report.resumed, report.documents, report.failed) == (1, 2, 0)
+    statuses = [json.loads(line) for line in results.getvalue().splitlines()]
+    assert [status["line"] for status in statuses] == [2, 3]
+    assert len(read_journal(journal)) == 3
+
+    report = batch(io.StringIO())
+    assert (report.resumed, report.documents) == (3, 0)
@@ -0,0 +1,75 @@
+import os
+
+from vita_gen.isolation import JobLimits
+from vita_gen.jobs import Overrides, build, discover_configs, plan_jobs
+
+from conftest import make_cv, write_config
+
+
+def _build(config_dir, output, doc_type="both", **options):
+    return build(
+        discover_configs(str(config_dir)),
+        str(output),
+        doc_type,
+        Overrides(),
+        True,
+        **options,
+    )
+
+
+def test_undeclared_locale_fails_per_document(tmp_path):
+    configs = tmp_path / "configs"
+    configs.mkdir()
+    write_config(configs / "plain.yaml", make_cv())
+    write_config(
+        configs / "localized.yaml",
+        make_cv(),
+        locales={"en": {"closing": "Kind regards"}, "de": {"closing": "Grüße"}},
+    )
+
+    report = _build(configs, tmp_path / "out", locales=["fr"])
+
+    failed = {(r.job.config_path, r.job.doc_type) for r in report.failed}
+    localized = str(configs / "localized.yaml")
+    assert failed == {(localized, "cv"), (localized, "cover_letter")}
+    assert all("Locale 'fr' is not defined" in r.error for r in report.failed)
+    # Configs without locales render as they are
+    assert os.path.exists(tmp_path / "out" / "cv_plain.pdf")
+
+
+def test_duplicate_of_timed_out_document_is_held_to_the_limit(tmp_path):
+    # Two overlays of one base config share their CV, which takes far
+    # longer to render than the time limit
+    configs = tmp_path / "configs"
+    (configs / "base").mkdir(parents=True)
+    write_config(configs / "base" / "cv.yaml", make_cv(bullets=2000))
+    for name in ("a", "b"):
+        overlay = f"extends: base/cv.yaml\ncover_letter:\n  title: To {name}\n"
+        (configs / f"{name}.yaml").write_text(overlay)
+
+    report = _build(configs, tmp_path / "out", "cv", limits=JobLimits(timeout=0.2))
+
+    assert [r.job.output_path for r in report.failed] == [
+        str(tmp_path / "out" / "cv_a.pdf"),
+        str(tmp_path / "out" / "cv_b.pdf"),
+    ]
+    assert all("time limit" in r.error for r in report.failed)
+    assert not os.listdir(tmp_path / "out")
+
+
+def test_only_overlays_and_locales_are_loaded_while_planning(tmp_path):
+    (tmp_path / "base").mkdir()
+    base = write_config(tmp_path / "base" / "cv.yaml", make_cv())
+    plain = write_config(tmp_path / "plain.yaml", make_cv())
+    localized = write_config(
+        tmp_path / "localized.yaml", make_cv(), locales={"en": {"closing": "Best"}}
+    )
+    overlay = tmp_path / "overlay.yaml"
+    overlay.write_text("extends: base/cv.yaml\n")
+
+    configs = [plain, localized, str(overlay)]
+    planned = list(plan_jobs(configs, str(tmp_path), "cv", Overrides(), True))
+
+    assert [job.cv is not None for job in planned] == [False, True, True]
+    assert planned[1].locale == "en"
+    assert os.path.samefile(planned[2].base_config, base)
@@ -0,0 +1,76 @@
+import io
+
+import pytest
+from pypdf import PdfReader
+
+from vita_gen.api import render_document
+from vita_gen.bundle import Bookmark, PdfConcatenator, UnsupportedPdf, _pdf_text
+
+from conftest import make_cv
+
+
+def test_combined_pdf_round_trip(cv):
+    documents = [
+        render_document(cv, "cv"),
+        render_document(cv, "cover_letter"),
+        render_document(make_cv(bullets=60), "application"),
+    ]
+    stream = io.BytesIO()
+    pdf = PdfConcatenator(stream)
+    expected_pages = []
+    for index, document in enumerate(documents):
+        expected_pages.append(len(PdfReader(io.BytesIO(document)).pages))
+        page, bookmarks = pdf.append(document)
+        pdf.bookmarks.append(Bookmark(_pdf_text(f"Document {index}"), page, bookmarks))
+    pdf.close()
+
+    combined = PdfReader(io.BytesIO(stream.getvalue()), strict=True)
+    assert len(combined.pages) == sum(expected_pages)
+    text = [page.extract_text() for page in combined.pages]
+    assert "JANE DOE" in text[0]
+    assert "Globex" in text[expected_pages[0]]
+    assert "(59)" in "".join(text[expected_pages[0] + expected_pages[1] :])
+
+    # Items are followed by the list of their children, if they have any
+    outline = combined.outline
+    items = [item for item in outline if not isinstance(item, list)]
+    assert [item.title for item in items] == ["Document 0", "Document 1", "Document 2"]
+    first_pages = [combined.get_destination_page_number(item) for item in items]
+    assert first_pages == [0, expected_pages[0], expected_pages[0] + expected_pages[1]]
+    # The application brings bookmarks for its cover letter and CV
+    assert isinstance(outline[-1], list) and len(outline[-1]) == 2
+
+
+def _unsupported(document: bytes) -> str:
+    with pytest.raises(UnsupportedPdf) as error:
+        PdfConcatenator(io.BytesIO()).append(document)
+    return str(error.value)
+
+
+def test_rejects_incremental_updates(cv):
+    document = render_document(cv, "cv")
+    update = document[document.rindex(b"\nxref\n") + 1 :]
+    assert "Incremental" in _unsupported(document + update)
+
+
+def test_rejects_xref_streams(cv):
+    document = render_document(cv, "cv")
+    start = document.rindex(b"startxref")
+    # Point startxref at an object, as a cross-reference stream would be
+    offset = document.index(b"1 0 obj")
+    fake = document[:start] + b"startxref\n%d\n%%%%EOF\n" % offset
+    assert "Cross-reference streams" in _unsupported(fake)
+
+
+def test_rejects_object_streams(cv):
+    document = render_document(cv, "cv")
+    # Keep the length of the document, so that the xref offsets stay valid
+    fake = document.replace(b"/Type /Pages", b"/Type/ObjStm", 1)
+    assert "Object streams" in _unsupported(fake)
+
+
+def test_rejects_without_writing(cv):
+    stream = io.BytesIO()
+    with pytest.raises(UnsupportedPdf):
+        PdfConcatenator(stream).append(b"%PDF-1.7\nstartxref\n0\n%%EOF\n")
+    assert stream.getvalue() == b""
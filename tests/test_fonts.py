@@ -0,0 +1,37 @@
+from datetime import datetime, timezone
+
+import fpdf.output
+from fontTools import subset as ftsubset
+
+from vita_gen import font_registry, font_subsets
+from vita_gen.api import render_document
+from vita_gen.output_options import OutputOptions
+
+OPTIONS = OutputOptions(creation_date=datetime(2024, 1, 1, tzinfo=timezone.utc))
+
+
+def test_cached_subsets_match_fpdf(cv, monkeypatch):
+    cached = [render_document(cv, "cv", options=OPTIONS) for _ in range(2)]
+    # Without the patch, fpdf2 subsets and compresses every font itself
+    monkeypatch.setattr(font_subsets, "_supported", lambda: False)
+    assert render_document(cv, "cv", options=OPTIONS) == cached[0] == cached[1]
+
+
+def test_subsetter_is_only_patched_while_writing(cv):
+    with font_subsets.cached_subsetting():
+        assert fpdf.output.ftsubset is not ftsubset
+        with font_subsets.cached_subsetting():
+            pass
+        # Still in place for the outer document
+        assert fpdf.output.ftsubset is not ftsubset
+    assert fpdf.output.ftsubset is ftsubset
+
+    render_document(cv, "cv")
+    assert fpdf.output.ftsubset is ftsubset
+    assert fpdf.output.PDFFontStream.__module__ == "fpdf.output"
+
+
+def test_copied_fonts_match_add_font(cv, monkeypatch):
+    copied = render_document(cv, "application", options=OPTIONS)
+    monkeypatch.setattr(font_registry, "_COPYABLE", False)
+    assert render_document(cv, "application", options=OPTIONS) == copied
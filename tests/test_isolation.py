@@ -0,0 +1,100 @@
+import multiprocessing
+import os
+import signal
+import time
+
+import pytest
+
+from vita_gen import jobs
+from vita_gen.isolation import JobLimits
+from vita_gen.jobs import BuildReport, Overrides, plan_jobs, run_jobs
+
+from conftest import make_cv, write_config
+
+# Jobs that misbehave are patched into the workers, which inherit the
+# patched module when they are forked
+needs_fork = pytest.mark.skipif(
+    multiprocessing.get_start_method() != "fork",
+    reason="workers must inherit monkeypatched functions",
+)
+
+
+def _jobs(tmp_path, *configs):
+    paths = [write_config(tmp_path / f"{name}.yaml", cv) for name, cv in configs]
+    return list(
+        plan_jobs(paths, str(tmp_path / "out"), "cv", Overrides(), multiple=True)
+    )
+
+
+def _errors(results):
+    return {os.path.basename(r.job.config_path): r.error for r in results}
+
+
+def test_timeout_fails_only_the_slow_document(tmp_path, capsys):
+    render_jobs = _jobs(tmp_path, ("slow", make_cv(bullets=2000)), ("fast", make_cv()))
+    os.makedirs(tmp_path / "out")
+
+    results = list(run_jobs(render_jobs, limits=JobLimits(timeout=0.2)))
+
+    errors = _errors(results)
+    assert "exceeded the time limit of 0.2 s" in errors["slow.yaml"]
+    assert errors["fast.yaml"] is None
+    assert os.path.exists(tmp_path / "out" / "cv_fast.pdf")
+
+    BuildReport(results=results, workers=1).print_summary()
+    summary = capsys.readouterr().out
+    assert "1 failed" in summary
+    assert "slow.yaml (cv): Error rendering CV" in summary
+
+
+@needs_fork
+def test_stuck_job_is_killed(tmp_path, monkeypatch):
+    run_job = jobs.run_job
+
+    def stuck(job, log=print):
+        if job.config_path.endswith("stuck.yaml"):
+            # Like native code that never returns to the interpreter
+            signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGALRM})
+            time.sleep(60)
+        return run_job(job, log)
+
+    monkeypatch.setattr(jobs, "run_job", stuck)
+    monkeypatch.setattr(jobs, "_KILL_GRACE", 0.5)
+    render_jobs = _jobs(tmp_path, ("stuck", make_cv()), ("fine", make_cv()))
+    os.makedirs(tmp_path / "out")
+
+    start = time.monotonic()
+    results = list(run_jobs(render_jobs, limits=JobLimits(timeout=0.5)))
+
+    assert time.monotonic() - start < 30
+    errors = _errors(results)
+    assert errors["stuck.yaml"].startswith("Killed")
+    assert errors["fine.yaml"] is None
+
+
+@needs_fork
+def test_dead_worker_is_replaced(tmp_path, monkeypatch):
+    run_job = jobs.run_job
+
+    def crashing(job, log=print):
+        if job.config_path.endswith("crash.yaml"):
+            os._exit(1)
+        return run_job(job, log)
+
+    monkeypatch.setattr(jobs, "run_job", crashing)
+    render_jobs = _jobs(
+        tmp_path, ("first", make_cv()), ("crash", make_cv()), ("last", make_cv())
+    )
+    os.makedirs(tmp_path / "out")
+
+    results = list(run_jobs(render_jobs, workers=2))
+
+    assert [os.path.basename(r.job.config_path) for r in results] == [
+        "first.yaml",
+        "crash.yaml",
+        "last.yaml",
+    ]
+    errors = _errors(results)
+    assert errors["crash.yaml"].startswith("Worker died while rendering")
+    assert errors["first.yaml"] is None and errors["last.yaml"] is None
+    assert os.path.exists(tmp_path / "out" / "cv_last.pdf")
@@ -0,0 +1,52 @@
+import os
+
+from vita_gen import manifest
+from vita_gen.jobs import Overrides, build, discover_configs
+
+from conftest import make_cv, write_config
+
+
+def _build(configs, output, **options):
+    report = build(
+        discover_configs(str(configs)),
+        str(output),
+        "both",
+        Overrides(),
+        True,
+        **options,
+    )
+    assert not report.failed
+    return {
+        os.path.basename(r.job.output_path): "skipped" if r.skipped else "written"
+        for r in report.results
+    }
+
+
+def test_only_changed_documents_are_rebuilt(tmp_path, monkeypatch):
+    configs = tmp_path / "configs"
+    configs.mkdir()
+    write_config(configs / "a.yaml", make_cv())
+    write_config(configs / "b.yaml", make_cv(bullets=2))
+    output = tmp_path / "out"
+
+    assert set(_build(configs, output).values()) == {"written"}
+    assert set(_build(configs, output).values()) == {"skipped"}
+
+    # Only CV fields change, so b's cover letter stays as it is
+    write_config(configs / "b.yaml", make_cv(bullets=3))
+    assert _build(configs, output) == {
+        "cv_a.pdf": "skipped",
+        "cl_a.pdf": "skipped",
+        "cv_b.pdf": "written",
+        "cl_b.pdf": "skipped",
+    }
+
+    # A deleted output is written again
+    os.remove(output / "cl_a.pdf")
+    assert _build(configs, output)["cl_a.pdf"] == "written"
+
+    assert set(_build(configs, output, force=True).values()) == {"written"}
+
+    monkeypatch.setattr(manifest, "RENDERER_VERSION", manifest.RENDERER_VERSION + 1)
+    assert set(_build(configs, output).values()) == {"written"}
+    assert set(_build(configs, output).values()) == {"skipped"}
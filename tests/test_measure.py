@@ -0,0 +1,103 @@
+from datetime import datetime, timezone
+import io
+import random
+
+import pytest
+from fpdf import FPDF
+from fpdf.enums import MethodReturnValue
+from pypdf import PdfReader
+
+from vita_gen.font_registry import add_fonts
+from vita_gen import measure
+from vita_gen.measure import _break_lines, draw_wrapped, wrap
+
+WIDTH = 80
+
+TEXTS = [
+    "Lead development of high-performance microservices using Python and "
+    "FastAPI, with reviews, tests and weekly releases for every team.",
+    "Tabs\tbetween\twords are stretched like spaces when a line is justified "
+    "by multi_cell, and so are the words around them.",
+    "Non-breaking spaces and thin spaces join words that wrap "
+    "onto the next line together with the rest of the paragraph.",
+    "A paragraph that ends early.\nAnd one that follows it and runs on for "
+    "long enough to wrap onto a second line.\n",
+    "Averylongwordwithoutanyspacesthatdoesnotfitonalineandmustbebrokensomewhere "
+    "before the text goes on.",
+]
+
+
+def _output(draw) -> bytes:
+    pdf = FPDF()
+    add_fonts(pdf)
+    pdf.set_creation_date(datetime(2024, 1, 1, tzinfo=timezone.utc))
+    pdf.add_page()
+    pdf.set_font("Roboto", size=11)
+    draw(pdf)
+    # Where the next line would start
+    pdf.cell(0, 5, "end")
+    return bytes(pdf.output())
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_draw_wrapped_matches_multi_cell(text):
+    expected = _output(lambda pdf: pdf.multi_cell(WIDTH, 5, text, align="J"))
+
+    def drawn(pdf):
+        draw_wrapped(pdf, wrap(pdf, text, WIDTH), WIDTH, 5)
+
+    assert _output(drawn) == expected
+    # Again from the wrap cache
+    assert _output(drawn) == expected
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_draw_wrapped_without_fpdf_internals(monkeypatch, text):
+    # As on another fpdf2 release: justified lines are drawn a word at a
+    # time, with the words and the position after them as multi_cell has
+    monkeypatch.setattr(measure, "_INTERNALS", False)
+    monkeypatch.setattr(measure, "_wrapped", measure.OrderedDict())
+
+    def drawn(draw) -> tuple:
+        pdf = FPDF()
+        add_fonts(pdf)
+        pdf.add_page()
+        pdf.set_font("Roboto", size=11)
+        draw(pdf)
+        end = (pdf.x, pdf.y)
+        page = PdfReader(io.BytesIO(bytes(pdf.output()))).pages[0]
+        return end, page.extract_text().split()
+
+    expected = drawn(lambda pdf: pdf.multi_cell(WIDTH, 5, text, align="J"))
+    actual = drawn(lambda pdf: draw_wrapped(pdf, wrap(pdf, text, WIDTH), WIDTH, 5))
+    assert actual[0] == pytest.approx(expected[0])
+    assert actual[1] == expected[1]
+
+
+def _random_texts(count: int) -> list:
+    words = ["a", "of", "data", "pipeline", "reporting", "Überblick", "x" * 40]
+    separators = [" ", " ", " ", "  ", "\t", "\u00a0", "\u2009", "\n", "\n\n"]
+    generator = random.Random(0)
+    texts = ["", " ", "\n", "word\n\n", "  leading and trailing  "]
+    for _ in range(count):
+        parts = []
+        for _ in range(generator.randint(1, 40)):
+            parts += [generator.choice(words), generator.choice(separators)]
+        texts.append("".join(parts[: generator.randint(1, len(parts))]))
+    return texts
+
+
+@pytest.mark.parametrize("size", [7, 10.5, 14])
+def test_break_lines_matches_multi_cell(size):
+    pdf = FPDF()
+    add_fonts(pdf)
+    pdf.add_page()
+    pdf.set_font("Roboto", size=size)
+    for text in TEXTS + _random_texts(150):
+        # A line that fills the cell exactly, where rounding matters most
+        exact = pdf.get_string_width(" ".join(text.split()[:5])) + 2 * pdf.c_margin
+        for width in (30, 55.5, 80, 170, exact):
+            expected = pdf.multi_cell(
+                width, 5, text, dry_run=True, output=MethodReturnValue.LINES
+            )
+            assert _break_lines(pdf, text, width) == expected, (text, width)
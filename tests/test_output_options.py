@@ -0,0 +1,34 @@
+import pytest
+from fpdf.image_parsing import SETTINGS
+from fpdf.syntax import PDFContentStream
+from PIL import Image
+
+from vita_gen.api import render_document
+from vita_gen.output_options import OutputOptions, deflate_level
+
+
+def test_deflate_level_restores_fpdf_settings():
+    before = PDFContentStream._COMPRESSION_LEVEL, SETTINGS.compression_level
+    with deflate_level(1):
+        assert PDFContentStream._COMPRESSION_LEVEL == SETTINGS.compression_level == 1
+    assert (PDFContentStream._COMPRESSION_LEVEL, SETTINGS.compression_level) == before
+
+
+def test_profiles_change_compression(cv):
+    sizes = {
+        profile: len(render_document(cv, "cv", options=OutputOptions(profile=profile)))
+        for profile in ("fast", "small")
+    }
+    assert sizes["small"] < sizes["fast"]
+
+
+def test_max_kb_error_says_whether_images_were_shrunk(cv, tmp_path):
+    options = OutputOptions(max_kb=1)
+    with pytest.raises(ValueError, match="has no images to shrink"):
+        render_document(cv, "cv", options=options)
+
+    image = tmp_path / "photo.png"
+    Image.effect_noise((200, 200), 100).convert("RGB").save(image)
+    cv.person.image_path = str(image)
+    with pytest.raises(ValueError, match="even at the lowest image quality"):
+        render_document(cv, "cv", options=options)
@@ -0,0 +1,18 @@
+from fpdf.output import OutputProducer
+
+from vita_gen import profiling
+from vita_gen.api import render_document
+
+
+def test_fpdf_is_only_instrumented_while_profiling(cv):
+    add_fonts = OutputProducer._add_fonts
+    profiling.enable()
+    try:
+        assert OutputProducer._add_fonts is not add_fonts
+        render_document(cv, "cv")
+    finally:
+        events = profiling.disable()
+
+    names = {event["name"] for event in events}
+    assert {"pdf.output", "pdf.font_subsetting", "pdf.image_embedding"} <= names
+    assert OutputProducer._add_fonts is add_fonts
@@ -0,0 +1,96 @@
+import json
+import os
+
+from vita_gen.jobs import ConfigSelection, Overrides, build, discover_configs
+from vita_gen.manifest import MANIFEST_NAME, merge_manifests
+
+from conftest import make_cv, write_config
+
+
+def _tree(root, count=30):
+    for index in range(count):
+        folder = root / f"team{index % 3}"
+        folder.mkdir(parents=True, exist_ok=True)
+        (folder / f"config{index:02}.yaml").write_text("")
+    (root / "top.yaml").write_text("")
+    return str(root)
+
+
+def test_shards_partition_the_configs(tmp_path):
+    root = _tree(tmp_path / "configs")
+    everything = discover_configs(root, ConfigSelection(recursive=True))
+    assert len(everything) == 31
+
+    shards = []
+    for index in range(1, 5):
+        selection = ConfigSelection(recursive=True, shard=(index, 4))
+        shard = discover_configs(root, selection)
+        # The same on every run and machine
+        assert discover_configs(root, selection) == shard
+        shards.append(shard)
+
+    assert all(shards)
+    assert sum(len(shard) for shard in shards) == len(everything)
+    assert sorted(sum(shards, [])) == sorted(everything)
+    # Each shard keeps the order of the full walk
+    for shard in shards:
+        assert shard == [path for path in everything if path in shard]
+
+
+def test_shards_respect_include_and_exclude(tmp_path):
+    root = _tree(tmp_path / "configs")
+    options = dict(recursive=True, include=("team*/*",), exclude=("team1/*",))
+    selected = discover_configs(root, ConfigSelection(**options))
+    sharded = [
+        discover_configs(root, ConfigSelection(**options, shard=(index, 3)))
+        for index in (1, 2, 3)
+    ]
+    assert sorted(sum(sharded, [])) == sorted(selected)
+
+
+def test_merged_manifest_covers_every_shard(tmp_path):
+    configs = tmp_path / "configs"
+    (configs / "acme").mkdir(parents=True)
+    for name in ("a", "b", "c", "acme/d", "acme/e"):
+        write_config(configs / f"{name}.yaml", make_cv())
+    output = tmp_path / "out"
+
+    def run(shard=None):
+        selection = ConfigSelection(recursive=True, shard=shard)
+        return build(
+            discover_configs(str(configs), selection),
+            str(output),
+            "cv",
+            Overrides(),
+            True,
+            config_root=str(configs),
+            shard=shard,
+        )
+
+    digests = {}
+    for shard in ((1, 2), (2, 2)):
+        for result in run(shard).results:
+            digests[os.path.relpath(result.job.output_path, output)] = result.digest
+
+    merged = merge_manifests(str(output))
+    assert sorted(merged) == [
+        str(output / MANIFEST_NAME),
+        str(output / "acme" / MANIFEST_NAME),
+    ]
+    documents = {}
+    for path in merged:
+        with open(path, encoding="utf-8") as f:
+            folder = os.path.relpath(os.path.dirname(path), output)
+            for name, digest in json.load(f)["documents"].items():
+                documents[os.path.normpath(os.path.join(folder, name))] = digest
+    assert documents == digests
+    assert len(documents) == 5
+    assert not [
+        name
+        for _, _, files in os.walk(output)
+        for name in files
+        if name.startswith(".vita-gen-manifest.shard-")
+    ]
+
+    # A full build after the merge finds every document up to date
+    assert run().skipped == 5